@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from src.config.config_loader import DEFAULT_ARCHIVE_VOLUME_SIZE, Rule
+
+
+@dataclass(frozen=True)
+class ActionSpec:
+    kind: str = "move"
+    archive_format: str = "tar.gz"
+    archive_volume_size: int = DEFAULT_ARCHIVE_VOLUME_SIZE
+    reflink_fallback: str = "copy"
+
+
+MOVE = ActionSpec()
+
+
+def action_spec_for(rule: Rule | None) -> ActionSpec:
+    if rule is None or rule.action == "move":
+        return MOVE
+    return ActionSpec(
+        kind=rule.action,
+        archive_format=rule.archive_format,
+        archive_volume_size=rule.archive_volume_size,
+        reflink_fallback=rule.reflink_fallback,
+    )
+
+
+@dataclass(frozen=True)
+class MoveAction:
+    src: Path
+    dst: Path
+    rule_name: str
+    duplicate_strategy: str
+    spec: ActionSpec = field(default=MOVE)
+
+    @property
+    def action(self) -> str:
+        return self.spec.kind
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime
+import os
+from pathlib import Path
+import shutil
+import tarfile
+from typing import Callable, Iterable
+import zipfile
+
+ARCHIVE_SUFFIXES = {"tar": ".tar", "tar.gz": ".tar.gz", "zip": ".zip"}
+DEFAULT_ARCHIVE_WORKERS = min(4, os.cpu_count() or 1)
+COMPRESS_LEVEL = 6
+
+
+@dataclass(frozen=True)
+class ArchiveMember:
+    src: Path
+    arcname: str
+    size: int
+
+
+def plan_volumes(members: Iterable[ArchiveMember], volume_size: int) -> list[list[ArchiveMember]]:
+    volumes: list[list[ArchiveMember]] = []
+    current: list[ArchiveMember] = []
+    current_size = 0
+
+    for m in members:
+        if current and current_size + m.size > volume_size:
+            volumes.append(current)
+            current = []
+            current_size = 0
+        current.append(m)
+        current_size += m.size
+
+    if current:
+        volumes.append(current)
+    return volumes
+
+
+def _reserve_name(path: Path) -> bool:
+    try:
+        os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+    except FileExistsError:
+        return False
+    return True
+
+
+def volume_paths(
+    dst_dir: Path,
+    archive_format: str,
+    count: int,
+    *,
+    reserve: bool = False,
+    taken: set[Path] | None = None,
+) -> list[Path]:
+    # With reserve, each name is held by an empty placeholder created with O_EXCL until write_volume replaces
+    # it, so groups or runs sharing dst_dir never write the same volume. taken covers names handed out in
+    # this pass when nothing is created on disk (dry runs).
+    suffix = ARCHIVE_SUFFIXES[archive_format]
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    taken = set() if taken is None else taken
+    paths: list[Path] = []
+    n = 1
+    while len(paths) < count:
+        candidate = dst_dir / f"archive_{stamp}_{n:04d}{suffix}"
+        n += 1
+        if candidate in taken:
+            continue
+        if _reserve_name(candidate) if reserve else not candidate.exists():
+            paths.append(candidate)
+            taken.add(candidate)
+    return paths
+
+
+def write_volume(path: Path, archive_format: str, members: list[ArchiveMember]) -> Path:
+    # Write under a temporary name so a crash never leaves a truncated volume behind the final name.
+    partial = path.with_name(path.name + ".partial")
+    try:
+        if archive_format == "zip":
+            with zipfile.ZipFile(partial, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=COMPRESS_LEVEL) as zf:
+                for m in members:
+                    zf.write(m.src, arcname=m.arcname)
+        else:
+            mode = "w:gz" if archive_format == "tar.gz" else "w"
+            kwargs = {"compresslevel": COMPRESS_LEVEL} if archive_format == "tar.gz" else {}
+            with tarfile.open(partial, mode, **kwargs) as tf:
+                for m in members:
+                    tf.add(m.src, arcname=m.arcname, recursive=False)
+        partial.replace(path)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+    return path
+
+
+def write_volumes(
+    jobs: list[tuple[Path, str, list[ArchiveMember]]],
+    *,
+    on_volume_done: Callable[[Path, list[ArchiveMember]], None],
+    workers: int = DEFAULT_ARCHIVE_WORKERS,
+) -> None:
+    if not jobs:
+        return
+
+    # zlib releases the GIL while compressing, so volumes compress in parallel on a thread pool.
+    # Completion callbacks run on the calling thread to keep ledger writes sequential.
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(write_volume, path, fmt, members): members for path, fmt, members in jobs}
+        for future in as_completed(futures):
+            on_volume_done(future.result(), futures[future])
+
+
+def archive_member_size(archive: Path, member: str) -> int | None:
+    # None when the volume is missing, unreadable (an unfilled placeholder) or lacks the member.
+    try:
+        if archive.name.endswith(".zip"):
+            with zipfile.ZipFile(archive) as zf:
+                return zf.getinfo(member).file_size
+        with tarfile.open(archive, "r:*") as tf:
+            return tf.getmember(member).size
+    except (OSError, KeyError, zipfile.BadZipFile, tarfile.TarError):
+        return None
+
+
+def extract_member(archive: Path, member: str, target: Path) -> None:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    if archive.name.endswith(".zip"):
+        with zipfile.ZipFile(archive) as zf, zf.open(member) as fsrc, target.open("wb") as fdst:
+            shutil.copyfileobj(fsrc, fdst)
+        return
+
+    with tarfile.open(archive, "r:*") as tf:
+        info = tf.getmember(member)
+        fsrc = tf.extractfile(info)
+        if fsrc is None:
+            raise FileNotFoundError(f"Archive member is not a regular file: {member} in {archive}")
+        with fsrc, target.open("wb") as fdst:
+            shutil.copyfileobj(fsrc, fdst)
+    os.utime(target, (info.mtime, info.mtime))
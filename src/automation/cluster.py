@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import time
+from typing import Callable, Iterable
+import uuid
+
+from src.automation.compact_plan import CompactPlan
+
+DEFAULT_LEASE_SECONDS = 60.0
+
+
+def _weight(node: str, name: str) -> int:
+    raw = f"{node}\0{name}".encode("utf-8", "surrogateescape")
+    return int.from_bytes(hashlib.blake2b(raw, digest_size=8).digest(), "big")
+
+
+def owner(name: str, members: list[str]) -> str:
+    # Rendezvous hashing: when a node joins or leaves, only the names it wins (or won) change hands.
+    return max(members, key=lambda node: (_weight(node, name), node))
+
+
+def _read_json(path: Path) -> dict | None:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+class ClusterNode:
+    def __init__(
+        self,
+        lease_dir: Path,
+        node_id: str,
+        *,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if not node_id or "/" in node_id or "\\" in node_id:
+            raise ValueError(f"Invalid cluster node id: {node_id!r}")
+        if lease_seconds <= 0:
+            raise ValueError("lease_seconds must be positive")
+        self.node_id = node_id
+        self.lease_seconds = lease_seconds
+        self.clock = clock
+        self.members_dir = lease_dir / "members"
+        self.claims_dir = lease_dir / "claims"
+        self._last_heartbeat: float | None = None
+        self._claims_ready = False
+        # Claims this node holds right now, renewed by keepalive() while a long batch is in progress.
+        self.held: set[Path] = set()
+        self._renewed = clock()
+
+    def heartbeat(self) -> None:
+        now = self.clock()
+        self.members_dir.mkdir(parents=True, exist_ok=True)
+        lease = self.members_dir / f"{self.node_id}.json"
+        tmp = lease.with_name(f".{lease.name}.{uuid.uuid4().hex}")
+        tmp.write_text(json.dumps(self._fresh_claim()), encoding="utf-8")
+        os.replace(tmp, lease)
+        self._last_heartbeat = now
+
+    def _heartbeat_if_due(self) -> None:
+        if self._last_heartbeat is not None and self.clock() - self._last_heartbeat >= self.lease_seconds / 3:
+            self.heartbeat()
+
+    def leave(self) -> None:
+        (self.members_dir / f"{self.node_id}.json").unlink(missing_ok=True)
+        self._last_heartbeat = None
+
+    def members(self) -> list[str]:
+        now = self.clock()
+        live = {self.node_id}
+        if self.members_dir.is_dir():
+            with os.scandir(self.members_dir) as it:
+                for e in it:
+                    if e.name.startswith(".") or not e.name.endswith(".json"):
+                        continue
+                    lease = _read_json(Path(e.path))
+                    if lease is not None and lease.get("expires", 0) > now:
+                        live.add(str(lease.get("node", e.name[:-5])))
+        return sorted(live)
+
+    def shard(self, plan: CompactPlan, members: list[str] | None = None) -> CompactPlan:
+        members = self.members() if members is None else members
+        if members == [self.node_id]:
+            return plan
+        mine = [i for i in range(len(plan)) if owner(plan.name(i), members) == self.node_id]
+        logging.info(
+            "action=cluster_shard node=%s members=%s planned=%s owned=%s",
+            self.node_id,
+            len(members),
+            len(plan),
+            len(mine),
+        )
+        return plan.subset(mine)
+
+    def _claim_path(self, src: Path) -> Path:
+        # Keyed by the name within the inbox, like shard(): hosts may mount the shared inbox at different paths.
+        key = hashlib.sha1(os.fsencode(src.name)).hexdigest()
+        return self.claims_dir / key
+
+    def _write_claim(self, path: Path, claim: dict | None) -> bool:
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(claim, f)
+        return True
+
+    def _fresh_claim(self) -> dict:
+        return {"node": self.node_id, "expires": self.clock() + self.lease_seconds}
+
+    def _create_claim(self, path: Path) -> bool:
+        return self._write_claim(path, self._fresh_claim())
+
+    def acquire(self, src: Path) -> bool:
+        if not self._claims_ready:
+            self.claims_dir.mkdir(parents=True, exist_ok=True)
+            self._claims_ready = True
+        path = self._claim_path(src)
+        if self._create_claim(path):
+            self.held.add(src)
+            return True
+
+        held = _read_json(path)
+        if held is None:
+            # Released (or still being written) between our create and read; retry once.
+            return self._claimed(src, self._create_claim(path))
+        if held.get("node") == self.node_id:
+            # Our own claim from a run that crashed before releasing it; extend it for this attempt.
+            self._refresh_claim(path)
+            self.held.add(src)
+            return True
+        if held.get("expires", 0) > self.clock():
+            logging.info(
+                "action=cluster_claimed_elsewhere node=%s holder=%s src=%s", self.node_id, held.get("node"), src
+            )
+            return False
+
+        # Take over an expired claim. Renaming it aside is atomic, so of several nodes racing for the
+        # same expired claim only one moves it; the others then lose the exclusive create below.
+        tomb = path.with_name(f"{path.name}.expired.{uuid.uuid4().hex}")
+        try:
+            os.rename(path, tomb)
+        except FileNotFoundError:
+            return self._claimed(src, self._create_claim(path))
+        taken = _read_json(tomb)
+        tomb.unlink(missing_ok=True)
+        if taken != held:
+            # Another node replaced the expired claim just before our rename; give its claim back.
+            if taken is not None:
+                self._write_claim(path, taken)
+            return False
+        logging.warning("action=cluster_takeover node=%s previous=%s src=%s", self.node_id, held.get("node"), src)
+        return self._claimed(src, self._create_claim(path))
+
+    def _claimed(self, src: Path, ok: bool) -> bool:
+        if ok:
+            self.held.add(src)
+        return ok
+
+    def _refresh_claim(self, path: Path) -> None:
+        tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex}")
+        self._write_claim(tmp, self._fresh_claim())
+        os.replace(tmp, path)
+
+    def holds(self, src: Path) -> bool:
+        return src in self.held
+
+    def keepalive(self) -> None:
+        # Called between moves: a throttled batch can outlast the lease, and files still waiting in it
+        # must not look abandoned to the other nodes.
+        now = self.clock()
+        if now - self._renewed < self.lease_seconds / 3:
+            return
+        self.heartbeat()
+        for src in list(self.held):
+            path = self._claim_path(src)
+            claim = _read_json(path)
+            if claim is None or claim.get("node") != self.node_id or claim.get("expires", 0) <= now:
+                # Already expired, so another node may be taking it over; renewing now could clobber its claim.
+                self.held.discard(src)
+                logging.warning("action=cluster_claim_lost node=%s src=%s", self.node_id, src)
+                continue
+            self._refresh_claim(path)
+        self._renewed = now
+
+    def release(self, sources: Iterable[Path]) -> None:
+        for src in sources:
+            self._claim_path(src).unlink(missing_ok=True)
+            self.held.discard(src)
+        self._heartbeat_if_due()
@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+from array import array
+import os
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from src.automation.actions import MOVE, ActionSpec
+
+
+class _Interner:
+    def __init__(self) -> None:
+        self.values: list = []
+        self._ids: dict = {}
+
+    def id_for(self, value) -> int:
+        i = self._ids.get(value)
+        if i is None:
+            i = len(self.values)
+            self._ids[value] = i
+            self.values.append(value)
+        return i
+
+
+class CompactMove:
+    __slots__ = ("_plan", "_i")
+
+    def __init__(self, plan: CompactPlan, i: int) -> None:
+        self._plan = plan
+        self._i = i
+
+    @property
+    def src(self) -> Path:
+        return self._plan.src_path(self._i)
+
+    @property
+    def dst(self) -> Path:
+        return self._plan.dst_path(self._i)
+
+    @property
+    def rule_name(self) -> str:
+        return self._plan.rule_names[self._plan.rule_ids[self._i]]
+
+    @property
+    def duplicate_strategy(self) -> str:
+        return self._plan.strategies[self._plan.strategy_ids[self._i]]
+
+    @property
+    def spec(self) -> ActionSpec:
+        return self._plan.specs[self._plan.spec_ids[self._i]]
+
+    @property
+    def action(self) -> str:
+        return self.spec.kind
+
+    def __repr__(self) -> str:
+        return (
+            f"CompactMove(src={self.src!r}, dst={self.dst!r}, rule_name={self.rule_name!r}, "
+            f"duplicate_strategy={self.duplicate_strategy!r})"
+        )
+
+
+class CompactPlan:
+    def __init__(self) -> None:
+        self._dirs = _Interner()
+        self._rules = _Interner()
+        self._strategies = _Interner()
+        self._specs = _Interner()
+        self._dir_paths: list[Path] = []
+
+        self.src_dir_ids = array("I")
+        self.dst_dir_ids = array("I")
+        self.rule_ids = array("I")
+        self.strategy_ids = array("B")
+        self.spec_ids = array("B")
+        self.name_ends = array("Q")
+        self.names = bytearray()
+        # Destination filenames only differ from the source name in rare cases, so keep them sparse.
+        self.dst_name_overrides: dict[int, str] = {}
+
+    @property
+    def dirs(self) -> list[str]:
+        return self._dirs.values
+
+    @property
+    def rule_names(self) -> list[str]:
+        return self._rules.values
+
+    @property
+    def strategies(self) -> list[str]:
+        return self._strategies.values
+
+    @property
+    def specs(self) -> list[ActionSpec]:
+        return self._specs.values
+
+    def _dir_id(self, directory: str) -> int:
+        i = self._dirs.id_for(directory)
+        if i == len(self._dir_paths):
+            self._dir_paths.append(Path(directory))
+        return i
+
+    def append(
+        self,
+        src_dir: str,
+        name: str,
+        dst_dir: str,
+        rule_name: str,
+        duplicate_strategy: str,
+        *,
+        dst_name: str | None = None,
+        spec: ActionSpec = MOVE,
+    ) -> None:
+        if dst_name is not None and dst_name != name:
+            self.dst_name_overrides[len(self.rule_ids)] = dst_name
+
+        self.src_dir_ids.append(self._dir_id(src_dir))
+        self.dst_dir_ids.append(self._dir_id(dst_dir))
+        self.rule_ids.append(self._rules.id_for(rule_name))
+        self.strategy_ids.append(self._strategies.id_for(duplicate_strategy))
+        self.spec_ids.append(self._specs.id_for(spec))
+        self.names += name.encode("utf-8", "surrogateescape")
+        self.name_ends.append(len(self.names))
+
+    @classmethod
+    def from_actions(cls, actions: Iterable) -> CompactPlan:
+        plan = cls()
+        for a in actions:
+            plan.append(
+                str(a.src.parent),
+                a.src.name,
+                str(a.dst.parent),
+                a.rule_name,
+                a.duplicate_strategy,
+                dst_name=a.dst.name,
+                spec=a.spec,
+            )
+        return plan
+
+    @classmethod
+    def from_columns(
+        cls,
+        *,
+        dirs: list[str],
+        rule_names: list[str],
+        strategies: list[str],
+        specs: list[ActionSpec],
+        src_dir_ids: array,
+        dst_dir_ids: array,
+        rule_ids: array,
+        strategy_ids: array,
+        spec_ids: array,
+        name_ends: array,
+        names: bytearray,
+        dst_name_overrides: dict[int, str],
+    ) -> CompactPlan:
+        plan = cls()
+        for d in dirs:
+            plan._dir_id(d)
+        for r in rule_names:
+            plan._rules.id_for(r)
+        for s in strategies:
+            plan._strategies.id_for(s)
+        for spec in specs:
+            plan._specs.id_for(spec)
+        plan.src_dir_ids = src_dir_ids
+        plan.dst_dir_ids = dst_dir_ids
+        plan.rule_ids = rule_ids
+        plan.strategy_ids = strategy_ids
+        plan.spec_ids = spec_ids
+        plan.name_ends = name_ends
+        plan.names = names
+        plan.dst_name_overrides = dst_name_overrides
+        return plan
+
+    def subset(self, indices: Iterable[int]) -> CompactPlan:
+        plan = CompactPlan()
+        for i in indices:
+            plan.append(
+                self.dirs[self.src_dir_ids[i]],
+                self.name(i),
+                self.dirs[self.dst_dir_ids[i]],
+                self.rule_names[self.rule_ids[i]],
+                self.strategies[self.strategy_ids[i]],
+                dst_name=self.dst_name_overrides.get(i),
+                spec=self.specs[self.spec_ids[i]],
+            )
+        return plan
+
+    def slice(self, start: int, stop: int | None = None) -> CompactPlan:
+        # Column slices, unlike subset(), never touch entries one by one in Python.
+        stop = len(self) if stop is None else min(stop, len(self))
+        start = min(start, stop)
+        base = self.name_ends[start - 1] if start else 0
+        end = self.name_ends[stop - 1] if stop else 0
+        return CompactPlan.from_columns(
+            dirs=list(self.dirs),
+            rule_names=list(self.rule_names),
+            strategies=list(self.strategies),
+            specs=list(self.specs),
+            src_dir_ids=self.src_dir_ids[start:stop],
+            dst_dir_ids=self.dst_dir_ids[start:stop],
+            rule_ids=self.rule_ids[start:stop],
+            strategy_ids=self.strategy_ids[start:stop],
+            spec_ids=self.spec_ids[start:stop],
+            name_ends=array("Q", [e - base for e in self.name_ends[start:stop]]),
+            names=self.names[base:end],
+            dst_name_overrides={i - start: n for i, n in self.dst_name_overrides.items() if start <= i < stop},
+        )
+
+    def __len__(self) -> int:
+        return len(self.rule_ids)
+
+    def __getitem__(self, i: int) -> CompactMove:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return CompactMove(self, i)
+
+    def __iter__(self) -> Iterator[CompactMove]:
+        for i in range(len(self)):
+            yield CompactMove(self, i)
+
+    def name(self, i: int) -> str:
+        start = self.name_ends[i - 1] if i else 0
+        return self.names[start:self.name_ends[i]].decode("utf-8", "surrogateescape")
+
+    def dst_name(self, i: int) -> str:
+        override = self.dst_name_overrides.get(i)
+        return self.name(i) if override is None else override
+
+    def src_path(self, i: int) -> Path:
+        return self._dir_paths[self.src_dir_ids[i]] / self.name(i)
+
+    def dst_path(self, i: int) -> Path:
+        return self._dir_paths[self.dst_dir_ids[i]] / self.dst_name(i)
+
+    def src_strings(self) -> list[str]:
+        dirs = self.dirs
+        return [os.path.join(dirs[self.src_dir_ids[i]], self.name(i)) for i in range(len(self))]
+
+    def to_rows(self, *, limit: int | None = None) -> list[dict[str, str]]:
+        count = len(self) if limit is None else min(limit, len(self))
+        dirs = self.dirs
+        return [
+            {
+                "src": os.path.join(dirs[self.src_dir_ids[i]], self.name(i)),
+                "dst": os.path.join(dirs[self.dst_dir_ids[i]], self.dst_name(i)),
+                "rule": self.rule_names[self.rule_ids[i]],
+                "duplicate_strategy": self.strategies[self.strategy_ids[i]],
+                "action": self.specs[self.spec_ids[i]].kind,
+            }
+            for i in range(count)
+        ]
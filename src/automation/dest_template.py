@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from datetime import datetime
+import os
+from string import Formatter
+
+TEMPLATE_FIELDS = ("name", "stem", "ext", "mtime")
+_MTIME_CACHE_SIZE = 4096
+
+_formatter = Formatter()
+# Stand-in values for a trial render at load time, so a template that can never format fails there.
+_SAMPLE_VALUES = {"name": "sample.txt", "stem": "sample", "ext": "txt", "mtime": datetime(2000, 1, 1)}
+
+
+def is_template(folder: str) -> bool:
+    return "{" in folder
+
+
+def _split(folder: str) -> list[str]:
+    return [p for p in folder.replace("\\", "/").split("/") if p]
+
+
+def template_fields(folder: str) -> set[str]:
+    fields: set[str] = set()
+    for part in _split(folder):
+        try:
+            parsed = list(_formatter.parse(part))
+        except ValueError as e:
+            raise ValueError(f"Invalid destination template {folder!r}: {e}") from None
+        for _literal, field, _spec, _conversion in parsed:
+            if field is None:
+                continue
+            root = field.split("[", 1)[0]
+            # Attribute access would let a config reach arbitrary object internals; indexing is enough.
+            if "." in root or root not in TEMPLATE_FIELDS:
+                raise ValueError(
+                    f"Invalid destination template {folder!r}: unknown field {{{field}}} "
+                    f"(allowed: {', '.join(TEMPLATE_FIELDS)})"
+                )
+            fields.add(root)
+        try:
+            part.format_map(_SAMPLE_VALUES)
+        except (IndexError, KeyError):
+            # Depends on the file, e.g. {name[12]}; rendered as "_" when it does not fit.
+            pass
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid destination template {folder!r}: {e}") from None
+    return fields
+
+
+def static_prefix(folder: str) -> str:
+    parts: list[str] = []
+    for part in _split(folder):
+        if is_template(part):
+            break
+        parts.append(part)
+    return os.path.join(*parts) if parts else ""
+
+
+def _safe_component(value: str) -> str:
+    value = value.replace("/", "_").replace("\\", "_").strip()
+    return "_" if value in ("", ".", "..") else value
+
+
+class DestinationTemplate:
+    def __init__(self, folder: str) -> None:
+        self.folder = folder
+        self.needs_mtime = "mtime" in template_fields(folder)
+        self._parts = [(part, is_template(part)) for part in _split(folder)]
+        self._mtime_cache: dict[int, datetime] = {}
+
+    def render(self, name: str, mtime_ns: int | None = None) -> str:
+        stem, _dot, ext = name.rpartition(".")
+        if not stem:
+            stem, ext = name, ""
+        values = {"name": name, "stem": stem, "ext": ext.lower()}
+        if self.needs_mtime:
+            # Whole seconds are all a date template can show, and files from the same batch share them.
+            seconds = (mtime_ns or 0) // 1_000_000_000
+            when = self._mtime_cache.get(seconds)
+            if when is None:
+                if len(self._mtime_cache) >= _MTIME_CACHE_SIZE:
+                    self._mtime_cache.clear()
+                when = self._mtime_cache[seconds] = datetime.fromtimestamp(seconds)
+            values["mtime"] = when
+
+        rendered: list[str] = []
+        for part, templated in self._parts:
+            if not templated:
+                rendered.append(part)
+                continue
+            try:
+                rendered.append(_safe_component(part.format_map(values)))
+            except (IndexError, KeyError, TypeError, ValueError):
+                # e.g. {name[3]} on a two-letter name.
+                rendered.append("_")
+        return os.path.join(*rendered)
@@ -1,79 +1,264 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
 from datetime import datetime
 import logging
+import os
 from pathlib import Path
-import shutil
+from typing import Callable, Iterable
+import uuid
 
-from src.automation.rules_engine import resolve_destination_folder, select_rule
-from src.automation.undo_manager import LedgerEntry, append_ledger_entry
-from src.config.config_loader import Config
+from src.automation.actions import ActionSpec, MoveAction, action_spec_for
+from src.automation.archiver import (
+    ArchiveMember,
+    archive_member_size,
+    plan_volumes,
+    volume_paths,
+    write_volumes,
+)
+from src.automation.cluster import ClusterNode
+from src.automation.compact_plan import CompactMove, CompactPlan
+from src.automation.dest_template import DestinationTemplate, is_template
+from src.automation.fs_backend import OS_FILESYSTEM, FileSystem, OSFileSystem
+from src.automation.history_catalog import HistoryCatalog, HistoryRecord
+from src.automation.ignore_rules import ignore_rules_for
+from src.automation.intent_journal import DEFAULT_BATCH_SIZE, IntentJournal
+from src.automation.linker import LINK_ACTIONS, already_linked, link_file
+from src.automation.parallel_planner import select_rules_parallel
+from src.automation.quarantine import Quarantine, quarantine_root
+from src.automation.retry import Retrier, RetryEntry
+from src.automation.rule_stats import RuleStats, adaptive_order
+from src.automation.rules_engine import CompiledRuleSet, compile_rules, resolve_destination_folder, sorted_rules
+from src.automation.settle_tracker import SettleTracker
+from src.automation.throttle import IOThrottle
+from src.automation.undo_manager import (
+    LedgerEntry,
+    append_ledger_entries,
+    append_ledger_entry,
+    read_recent_ledger_entries,
+)
+from src.config.config_loader import Config, Rule
 
 
-@dataclass(frozen=True)
-class MoveAction:
-    src: Path
-    dst: Path
-    rule_name: str
-    duplicate_strategy: str
+_HISTORY_FLUSH_EVERY = 500
+# Filesystems such as FAT store mtimes in two-second steps.
+_MTIME_SLACK_NS = 2_000_000_000
 
+# none: leave write-back to the OS. batch: fsync every directory a batch touched, then the ledger, once per
+# batch. strict: the same after every single move.
+DURABILITY_LEVELS = ("none", "batch", "strict")
 
-def plan_moves(cfg: Config) -> list[MoveAction]:
+
+def _scan_file_names(
+    cfg: Config,
+    fs: FileSystem = OS_FILESYSTEM,
+    settle: SettleTracker | None = None,
+) -> list[str]:
     source = cfg.source_dir
-    if not source.exists() or not source.is_dir():
+    if not fs.is_dir(source):
         raise FileNotFoundError(f"source_dir not found or not a directory: {source}")
 
-    actions: list[MoveAction] = []
+    ignore = ignore_rules_for(cfg.ignore)
+    if cfg.settle_seconds <= 0:
+        found = fs.scandir_files(source)
+        names = [n for n in found if not ignore.is_ignored(n)]
+        ignored = len(found) - len(names)
+    else:
+        # Ignored names are dropped before the settle check so partial downloads are never tracked.
+        stats = fs.scan_file_stats(source)
+        kept = [entry for entry in stats if not ignore.is_ignored(entry[0])]
+        ignored = len(stats) - len(kept)
+        settle = settle if settle is not None else SettleTracker()
+        names = settle.settled(source, kept, cfg.settle_seconds)
+        if settle.deferred:
+            logging.info("action=skip_unsettled source=%s files=%s", source, settle.deferred)
+
+    if ignored:
+        logging.info("action=skip_ignored source=%s files=%s", source, ignored)
+    return names
+
+
+def _select_rules(
+    cfg: Config,
+    names: list[str],
+    processes: int,
+    rule_stats: RuleStats | None = None,
+) -> list[Rule | None]:
+    if processes > 1:
+        if rule_stats is not None:
+            # Workers compile their own rule sets, so their hit counts would never reach rule_stats.
+            raise ValueError("Adaptive rule ordering cannot be combined with parallel planning")
+        return select_rules_parallel(cfg, names, processes=processes)
+
+    if rule_stats is not None:
+        ruleset = CompiledRuleSet(cfg, order=adaptive_order(sorted_rules(cfg), rule_stats), track=True)
+        selected = [ruleset.select(n) for n in names]
+        rule_stats.absorb(ruleset)
+        return selected
+
+    ruleset = compile_rules(cfg)
+    return [ruleset.select(n) for n in names]
+
 
-    for p in source.iterdir():
-        if not p.is_file():
-            continue
+def _template_for(folder: str, templates: dict[str, DestinationTemplate | None]) -> DestinationTemplate | None:
+    if folder not in templates:
+        templates[folder] = DestinationTemplate(folder) if is_template(folder) else None
+    return templates[folder]
 
-        rule = select_rule(p, cfg)
+
+def _render_folder(template: DestinationTemplate, source: Path, name: str, fs: FileSystem) -> str | None:
+    mtime_ns = None
+    if template.needs_mtime:
+        try:
+            mtime_ns = fs.stat(source / name).st_mtime_ns
+        except FileNotFoundError:
+            # Another cluster node (or the user) moved it after the scan; there is nothing left to plan.
+            logging.info("action=skip_vanished src=%s", source / name)
+            return None
+    return template.render(name, mtime_ns)
+
+
+def plan_moves(
+    cfg: Config,
+    *,
+    processes: int = 0,
+    fs: FileSystem = OS_FILESYSTEM,
+    rule_stats: RuleStats | None = None,
+    settle: SettleTracker | None = None,
+) -> list[MoveAction]:
+    source = cfg.source_dir
+    names = _scan_file_names(cfg, fs, settle)
+    rules = _select_rules(cfg, names, processes, rule_stats)
+
+    actions: list[MoveAction] = []
+    templates: dict[str, DestinationTemplate | None] = {}
+
+    for name, rule in zip(names, rules):
         dest_folder_name, rule_name = resolve_destination_folder(rule, cfg)
         duplicate_strategy = cfg.default_duplicate_strategy if rule is None else rule.duplicate_strategy
 
+        template = _template_for(dest_folder_name, templates)
+        if template is not None:
+            rendered = _render_folder(template, source, name, fs)
+            if rendered is None:
+                continue
+            dest_folder_name = rendered
+
         dst_dir = source / dest_folder_name
-        dst = dst_dir / p.name
+        dst = dst_dir / name
 
         actions.append(
             MoveAction(
-                src=p,
+                src=source / name,
                 dst=dst,
                 rule_name=rule_name,
                 duplicate_strategy=duplicate_strategy,
+                spec=action_spec_for(rule),
             )
         )
 
     return actions
 
 
-def _unique_renamed_path(dst: Path) -> Path:
+def plan_moves_compact(
+    cfg: Config,
+    *,
+    processes: int = 0,
+    fs: FileSystem = OS_FILESYSTEM,
+    rule_stats: RuleStats | None = None,
+    settle: SettleTracker | None = None,
+) -> CompactPlan:
+    source = str(cfg.source_dir)
+    names = _scan_file_names(cfg, fs, settle)
+    rules = _select_rules(cfg, names, processes, rule_stats)
+
+    plan = CompactPlan()
+    targets: dict[int, tuple[str, str, str, ActionSpec, DestinationTemplate | None]] = {}
+    templates: dict[str, DestinationTemplate | None] = {}
+
+    for name, rule in zip(names, rules):
+        target = targets.get(id(rule))
+        if target is None:
+            dest_folder_name, rule_name = resolve_destination_folder(rule, cfg)
+            duplicate_strategy = cfg.default_duplicate_strategy if rule is None else rule.duplicate_strategy
+            target = (
+                os.path.join(source, dest_folder_name),
+                rule_name,
+                duplicate_strategy,
+                action_spec_for(rule),
+                _template_for(dest_folder_name, templates),
+            )
+            targets[id(rule)] = target
+
+        dst_dir, rule_name, duplicate_strategy, spec, template = target
+        if template is not None:
+            rendered = _render_folder(template, cfg.source_dir, name, fs)
+            if rendered is None:
+                continue
+            dst_dir = os.path.join(source, rendered)
+        plan.append(source, name, dst_dir, rule_name, duplicate_strategy, spec=spec)
+
+    return plan
+
+
+def _unique_renamed_path(dst: Path, fs: FileSystem = OS_FILESYSTEM) -> Path:
     stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     candidate = dst.with_name(f"{dst.stem}_{stamp}{dst.suffix}")
-    if not candidate.exists():
+    if not fs.exists(candidate):
         return candidate
 
     i = 1
     while True:
         candidate = dst.with_name(f"{dst.stem}_{stamp}_{i}{dst.suffix}")
-        if not candidate.exists():
+        if not fs.exists(candidate):
             return candidate
         i += 1
 
 
-def execute_moves(
-    actions: list[MoveAction],
-    *,
-    dry_run: bool,
-    ledger_path: Path | None = None,
-) -> None:
-    for a in actions:
+class _MoveExecutor:
+    def __init__(
+        self,
+        *,
+        dry_run: bool,
+        ledger_path: Path | None,
+        catalog: HistoryCatalog | None,
+        throttle: IOThrottle | None,
+        quarantine_path: Path | None = None,
+        fs: FileSystem = OS_FILESYSTEM,
+        claims: ClusterNode | None = None,
+        check_sources: bool = False,
+        retrier: Retrier | None = None,
+        durability: str = "none",
+    ) -> None:
+        self.fs = fs
+        self.dry_run = dry_run
+        self.ledger_path = ledger_path
+        self.catalog = catalog
+        self.throttle = throttle
+        self.quarantine_path = quarantine_path
+        self.quarantines: dict[Path, Quarantine] = {}
+        self.claims = claims
+        # Plans carried over from an earlier run may name files that have since gone.
+        self.check_sources = check_sources
+        self.retrier = Retrier() if retrier is None else retrier
+        self.durability = durability
+        # Ledger entries wait here until the renames they describe are on disk.
+        self.ledger_buffer: list[LedgerEntry] = []
+        self.dirty_dirs: set[Path] = set()
+        self.dirty_files: list[Path] = []
+        self.fsyncs = 0
+        self._same_device: dict[tuple[Path, Path], bool] = {}
+        self.history: list[HistoryRecord] = []
+        self.pending_archives: list[tuple[int, MoveAction | CompactMove]] = []
+        # Journal batch numbers past the end of the plan, used by retry rounds and archive writes.
+        self.extra_batch = 0
+
+    def resolve(self, a: MoveAction | CompactMove) -> Path | None:
         dst = a.dst
-        src = a.src
+        if self.fs.exists(dst):
+            if a.action in LINK_ACTIONS and already_linked(self.fs, a.src, dst):
+                logging.info("action=skip_linked rule=%s src=%s dst=%s", a.rule_name, a.src, dst)
+                return None
 
-        if dst.exists():
             if a.duplicate_strategy == "skip":
                 logging.info(
                     "action=skip_duplicate rule=%s src=%s dst=%s",
@@ -81,37 +266,695 @@ def execute_moves(
                     a.src,
                     dst,
                 )
-                continue
+                return None
 
             if a.duplicate_strategy == "rename":
-                dst = _unique_renamed_path(dst)
+                dst = _unique_renamed_path(dst, self.fs)
+        return dst
+
+    def claim(self, a: MoveAction | CompactMove) -> bool:
+        if not self.claims.acquire(a.src):
+            return False
+        if not self.fs.exists(a.src):
+            # Another node moved it between our scan and our claim.
+            logging.info("action=cluster_gone rule=%s src=%s", a.rule_name, a.src)
+            self.claims.release([a.src])
+            return False
+        return True
 
-            if a.duplicate_strategy == "overwrite":
-                if not dry_run and dst.exists():
-                    dst.unlink()
+    def move(self, a: MoveAction | CompactMove, dst: Path) -> None:
+        src = a.src
 
-        dst.parent.mkdir(parents=True, exist_ok=True)
+        quarantined = None
+        if a.duplicate_strategy == "overwrite" and not self.dry_run and self.fs.exists(dst):
+            if self.quarantine_path is None:
+                self.fs.unlink(dst)
+            else:
+                quarantined = self.quarantine_for(a).stash(dst)
+                logging.info("action=quarantine rule=%s dst=%s quarantine=%s", a.rule_name, dst, quarantined)
 
         logging.info(
-            "action=move rule=%s src=%s dst=%s duplicate_strategy=%s",
+            "action=%s rule=%s src=%s dst=%s duplicate_strategy=%s",
+            a.action,
             a.rule_name,
-            a.src,
+            src,
             dst,
             a.duplicate_strategy,
         )
-        if dry_run:
-            continue
+        if self.dry_run:
+            return
+
+        try:
+            size = self.fs.stat(src).st_size if self.catalog is not None else 0
+            if a.action in LINK_ACTIONS:
+                if self.throttle is not None:
+                    self.throttle.acquire_op()
+                performed = link_file(self.fs, src, dst, a.action, reflink_fallback=a.spec.reflink_fallback)
+            else:
+                self.fs.move(src, dst, throttle=self.throttle)
+                performed = a.action
+        except OSError:
+            self.discard_partial(a, dst)
+            if quarantined is not None:
+                # The overwritten file goes back where it was, so a retry or the next run stashes it again
+                # and the ledger entry that finally moves over it points at the right quarantine path.
+                self.unstash(a, dst, quarantined)
+            raise
+
+        if performed is None:
+            logging.info("action=skip_reflink_unsupported rule=%s src=%s dst=%s", a.rule_name, src, dst)
+            if quarantined is not None:
+                self.unstash(a, dst, quarantined)
+            return
+        if self.durability != "none":
+            if a.action in LINK_ACTIONS and performed in ("copy", "reflink"):
+                self.dirty_files.append(dst)
+            elif a.action not in LINK_ACTIONS and not self.same_device(src.parent, dst.parent):
+                # Across devices the move was a copy, and its data is not on disk yet.
+                self.dirty_files.append(dst)
+        self.record(a, dst, size=size, action=performed, quarantined=quarantined)
+
+    def quarantine_for(self, a: MoveAction | CompactMove) -> Quarantine:
+        # Plans only hold top-level inbox files, so a source's parent is its config's source_dir.
+        root = quarantine_root(self.quarantine_path, Path(a.src).parent)
+        quarantine = self.quarantines.get(root)
+        if quarantine is None:
+            quarantine = self.quarantines[root] = Quarantine(root, fs=self.fs)
+        return quarantine
+
+    def unstash(self, a: MoveAction | CompactMove, dst: Path, quarantined: Path) -> None:
+        try:
+            Quarantine.restore(quarantined, dst, fs=self.fs)
+        except OSError as e:
+            logging.warning(
+                "action=unquarantine_failed rule=%s dst=%s quarantine=%s error=%s", a.rule_name, dst, quarantined, e
+            )
+            return
+        logging.info("action=unquarantine rule=%s dst=%s quarantine=%s", a.rule_name, dst, quarantined)
+
+    def same_device(self, a: Path, b: Path) -> bool:
+        key = (a, b)
+        same = self._same_device.get(key)
+        if same is None:
+            same = self._same_device[key] = self.fs.same_device(a, b)
+        return same
+
+    def sync(self) -> None:
+        # Renames and copies reach disk before the ledger says they happened, so after a power cut the
+        # ledger never claims a move for a file that is back in the inbox.
+        for path in self.dirty_files:
+            self.fs.fsync(path)
+        for d in sorted(self.dirty_dirs):
+            self.fs.fsync_dir(d)
+        self.fsyncs += len(self.dirty_files) + len(self.dirty_dirs)
+        self.dirty_files.clear()
+        self.dirty_dirs.clear()
 
-        shutil.move(str(src), str(dst))
+        if self.ledger_buffer:
+            append_ledger_entries(self.ledger_path, self.ledger_buffer, fsync=True)
+            self.fsyncs += 1
+            self.ledger_buffer.clear()
 
-        if ledger_path is not None:
-            append_ledger_entry(
-                ledger_path,
-                LedgerEntry(
+    def attempt(self, actions: list[MoveAction] | CompactPlan, i: int, dst: Path, retry: RetryEntry | None) -> bool:
+        # Returns False while the move waits in the retry queue, so its claim has to stay held.
+        a = actions[i]
+        try:
+            self.move(a, dst)
+        except OSError as e:
+            return not self.retrier.failed((i, dst), e, retry)
+        if retry is not None:
+            self.retrier.succeeded(retry)
+        return True
+
+    def discard_partial(self, a: MoveAction | CompactMove, dst: Path) -> None:
+        # dst was free (or cleared for overwrite) before the attempt, so while the source is still
+        # there anything at dst is a partial copy from the failed attempt.
+        try:
+            if self.fs.exists(a.src) and (self.fs.exists(dst) or self.fs.is_symlink(dst)):
+                self.fs.unlink(dst)
+        except OSError as e:
+            logging.warning("action=discard_partial_failed src=%s dst=%s error=%s", a.src, dst, e)
+
+    def record(
+        self,
+        a: MoveAction | CompactMove,
+        dst: Path,
+        *,
+        size: int,
+        member: str | None = None,
+        action: str | None = None,
+        quarantined: Path | None = None,
+    ) -> None:
+        src = a.src
+        ts = datetime.now().isoformat(timespec="seconds")
+        # ts only has one-second resolution, so the ledger and catalog share an id to tell entries apart.
+        entry_id = uuid.uuid4().hex
+
+        if self.durability != "none":
+            self.dirty_dirs.update((src.parent, dst.parent))
+            if quarantined is not None:
+                self.dirty_dirs.add(quarantined.parent)
+
+        if self.ledger_path is not None:
+            entry = LedgerEntry(
+                src=str(src),
+                dst=str(dst),
+                ts=ts,
+                rule_name=a.rule_name,
+                duplicate_strategy=a.duplicate_strategy,
+                action=action or a.action,
+                member=member,
+                quarantine=None if quarantined is None else str(quarantined),
+                entry_id=entry_id,
+            )
+            if self.durability == "none":
+                append_ledger_entry(self.ledger_path, entry)
+            else:
+                self.ledger_buffer.append(entry)
+
+        if self.catalog is not None:
+            self.history.append(
+                HistoryRecord(
                     src=str(src),
                     dst=str(dst),
-                    ts=datetime.now().isoformat(timespec="seconds"),
+                    ts=ts,
                     rule_name=a.rule_name,
                     duplicate_strategy=a.duplicate_strategy,
-                ),
+                    bytes=size,
+                    entry_id=entry_id,
+                )
             )
+            if len(self.history) >= _HISTORY_FLUSH_EVERY:
+                self.flush_history()
+
+        if self.durability == "strict":
+            self.sync()
+
+    def flush_history(self) -> None:
+        if self.catalog is not None and self.history:
+            self.catalog.record_moves(self.history)
+            self.history.clear()
+
+    def prepare_dirs(self, actions: list[MoveAction] | CompactPlan) -> None:
+        # Every target directory is known once the plan exists, so create each one once up front
+        # instead of calling mkdir(parents=True) per file.
+        if self.dry_run:
+            return
+        if isinstance(actions, CompactPlan):
+            dirs = {Path(actions.dirs[i]) for i in set(actions.dst_dir_ids)}
+        else:
+            dirs = {a.dst.parent for a in actions}
+        for d in sorted(dirs):
+            if self.durability != "none":
+                # A new directory only survives a crash once the directory holding its entry is synced.
+                p = d
+                while p.parent != p and not self.fs.exists(p):
+                    self.dirty_dirs.add(p.parent)
+                    p = p.parent
+            self.fs.mkdir(d)
+        if dirs:
+            logging.info("action=prepare_dirs dirs=%s", len(dirs))
+
+    def run_batches(
+        self,
+        actions: list[MoveAction] | CompactPlan,
+        batches: Iterable[int],
+        *,
+        batch_size: int,
+        journal: IntentJournal | None,
+        stop: Callable[[], bool] | None = None,
+        retry_batch: int | None = None,
+    ) -> int:
+        processed = 0
+        self.extra_batch = (len(actions) + batch_size - 1) // batch_size if retry_batch is None else retry_batch
+        for k in batches:
+            # Retries that have waited out their backoff ride along with the next batch and its journal intent.
+            resolved = self.retry_targets(actions, self.retrier.due())
+            claimed: list[Path] = []
+            for i in range(k * batch_size, min((k + 1) * batch_size, len(actions))):
+                if self.claims is not None:
+                    if not self.claim(actions[i]):
+                        continue
+                    if actions[i].action != "archive":
+                        claimed.append(actions[i].src)
+                elif self.check_sources and not self.fs.exists(actions[i].src):
+                    logging.info("action=skip_missing rule=%s src=%s", actions[i].rule_name, actions[i].src)
+                    continue
+                if actions[i].action == "archive":
+                    self.pending_archives.append((i, actions[i]))
+                    continue
+                dst = self.resolve(actions[i])
+                if dst is not None:
+                    resolved.append((i, dst, None))
+
+            self.run_resolved(actions, k, resolved, claimed, journal)
+            processed = min((k + 1) * batch_size, len(actions))
+            # Checked after each batch, so even an exhausted budget moves one batch forward.
+            if stop is not None and stop():
+                break
+
+        # Whatever is still backing off is retried once every healthy file has moved, each round journaled
+        # under a batch number past the end of the plan. Out of budget, it is left queued for the caller.
+        while len(self.retrier) and not (stop is not None and stop()):
+            due = self.retry_targets(actions, self.retrier.wait())
+            self.run_resolved(actions, self.extra_batch, due, [], journal)
+            self.extra_batch += 1
+        return processed
+
+    def retry_targets(
+        self,
+        actions: list[MoveAction] | CompactPlan,
+        due: list[RetryEntry],
+    ) -> list[tuple[int, Path, RetryEntry | None]]:
+        resolved: list[tuple[int, Path, RetryEntry | None]] = []
+        for r in due:
+            i, dst = r.item
+            a = actions[i]
+            if a.duplicate_strategy != "overwrite" and self.fs.exists(dst):
+                # Another file took the name while this one was backing off.
+                dst = self.resolve(a)
+                if dst is None:
+                    if self.claims is not None:
+                        self.claims.release([a.src])
+                    continue
+            resolved.append((i, dst, r))
+        return resolved
+
+    def resume_retries(
+        self,
+        actions: list[MoveAction] | CompactPlan,
+        k: int,
+        retries: list[tuple[int, str]],
+        journal: IntentJournal,
+    ) -> None:
+        # Moves still backing off when the run stopped; the batches that queued them are already marked done.
+        resolved: list[tuple[int, Path, RetryEntry | None]] = []
+        claimed: list[Path] = []
+        for i, dst_raw in retries:
+            a = actions[i]
+            if self.claims is not None:
+                if not self.claims.acquire(a.src):
+                    continue
+                claimed.append(a.src)
+            if not self.fs.exists(a.src):
+                logging.info("action=skip_missing rule=%s src=%s", a.rule_name, a.src)
+                continue
+            dst = Path(dst_raw)
+            if a.duplicate_strategy != "overwrite" and self.fs.exists(dst):
+                dst = self.resolve(a)
+                if dst is None:
+                    continue
+            resolved.append((i, dst, None))
+        logging.info("action=resume_retries moves=%s", len(resolved))
+        self.run_resolved(actions, k, resolved, claimed, journal)
+
+    def run_resolved(
+        self,
+        actions: list[MoveAction] | CompactPlan,
+        k: int,
+        resolved: list[tuple[int, Path, RetryEntry | None]],
+        claimed: list[Path],
+        journal: IntentJournal | None,
+    ) -> None:
+        if journal is not None:
+            journal.record_intent(k, [(i, str(dst)) for i, dst, _retry in resolved])
+        queued: dict[int, Path] = {}
+        finished: list[Path] = []
+        for i, dst, retry in resolved:
+            if not self.still_claimed(actions[i]):
+                continue
+            if not self.attempt(actions, i, dst, retry):
+                queued[i] = dst
+            elif retry is not None:
+                finished.append(actions[i].src)
+        self.sync()
+        if journal is not None:
+            self.flush_history()
+            # Queued retries run under a later batch number; listing them here lets --resume find them.
+            journal.mark_done(k, [(i, str(dst)) for i, dst in queued.items()])
+        if self.claims is not None:
+            queued_src = {actions[i].src for i in queued}
+            self.claims.release([p for p in claimed if p not in queued_src] + finished)
+
+    def still_claimed(self, a: MoveAction | CompactMove) -> bool:
+        if self.claims is None:
+            return True
+        self.claims.keepalive()
+        return self.claims.holds(a.src)
+
+    def run_archives(self, journal: IntentJournal | None = None) -> None:
+        if self.pending_archives and not isinstance(self.fs, OSFileSystem):
+            raise ValueError("archive actions need the OS filesystem backend")
+
+        archived = self.pending_archives
+        self.pending_archives = []
+        groups: dict[tuple[Path, ActionSpec], list[tuple[int, MoveAction | CompactMove]]] = {}
+        for i, a in archived:
+            groups.setdefault((a.dst.parent, a.spec), []).append((i, a))
+
+        by_src: dict[Path, tuple[int, MoveAction | CompactMove]] = {}
+        jobs: list[tuple[Path, str, list[ArchiveMember]]] = []
+        # Groups with different specs can share a directory, so names are handed out across all of them.
+        taken: set[Path] = set()
+        for (dst_dir, spec), group in groups.items():
+            members: list[ArchiveMember] = []
+            for i, a in group:
+                src = a.src
+                try:
+                    size = src.stat().st_size
+                except FileNotFoundError:
+                    logging.warning("action=archive_missing rule=%s src=%s", a.rule_name, src)
+                    continue
+                by_src[src] = (i, a)
+                members.append(ArchiveMember(src=src, arcname=src.name, size=size))
+
+            volumes = plan_volumes(members, spec.archive_volume_size)
+            if not volumes:
+                continue
+            if not self.dry_run:
+                dst_dir.mkdir(parents=True, exist_ok=True)
+            paths = volume_paths(dst_dir, spec.archive_format, len(volumes), reserve=not self.dry_run, taken=taken)
+            for path, volume in zip(paths, volumes):
+                logging.info(
+                    "action=archive_volume volume=%s members=%s bytes=%s",
+                    path,
+                    len(volume),
+                    sum(m.size for m in volume),
+                )
+                jobs.append((path, spec.archive_format, volume))
+
+        if self.dry_run:
+            return
+
+        batch = self.extra_batch
+        if journal is not None and jobs:
+            journal.record_intent(batch, [(by_src[m.src][0], str(path)) for path, _fmt, volume in jobs for m in volume])
+
+        written: set[Path] = set()
+
+        def on_volume_done(path: Path, volume: list[ArchiveMember]) -> None:
+            written.add(path)
+            if self.durability != "none":
+                # The sources are about to go, so the only remaining copy has to be on disk first.
+                self.fs.fsync(path)
+                self.fs.fsync_dir(path.parent)
+                self.fsyncs += 2
+            for m in volume:
+                a = by_src[m.src][1]
+                if not self.still_claimed(a):
+                    # The volume holds a spare copy; the source now belongs to whichever node took it over.
+                    continue
+                logging.info("action=archive rule=%s src=%s dst=%s member=%s", a.rule_name, m.src, path, m.arcname)
+                self.record(a, path, size=m.size, member=m.arcname)
+                m.src.unlink()
+            if self.durability != "none":
+                self.dirty_dirs.update(m.src.parent for m in volume)
+
+        try:
+            write_volumes(jobs, on_volume_done=on_volume_done)
+        except BaseException:
+            for path, _fmt, _volume in jobs:
+                if path not in written:
+                    path.unlink(missing_ok=True)
+            raise
+        self.sync()
+        if journal is not None and jobs:
+            self.flush_history()
+            journal.mark_done(batch)
+            self.extra_batch += 1
+        if self.claims is not None:
+            self.claims.release(a.src for _i, a in archived)
+
+    def reconcile(
+        self,
+        actions: list[MoveAction] | CompactPlan,
+        moves: list[tuple[int, str]],
+        started_ns: int | None = None,
+    ) -> None:
+        ledgered: set[tuple[str, str]] = set()
+        if self.ledger_path is not None:
+            ledgered = {(e["src"], e["dst"]) for e in read_recent_ledger_entries(self.ledger_path, len(moves))}
+
+        for i, dst_raw in moves:
+            a = actions[i]
+            dst = Path(dst_raw)
+            if (str(a.src), dst_raw) in ledgered:
+                if a.action == "archive" and a.src.exists():
+                    # Ledgered only once its volume was complete; the crash came before the source was removed.
+                    a.src.unlink()
+                continue
+            if self.claims is not None and not self.claims.acquire(a.src):
+                # Our claim from before the crash expired and another node took the file over.
+                continue
+            if a.action == "archive":
+                if self.reconcile_archive(i, a, dst):
+                    # Queued for run_archives, which releases the claim once the member is written.
+                    continue
+            else:
+                self.reconcile_one(a, dst, started_ns)
+            if self.claims is not None:
+                self.claims.release([a.src])
+        self.sync()
+
+    def reconcile_archive(self, i: int, a: MoveAction | CompactMove, volume: Path) -> bool:
+        # Returns True when the member has to be archived again.
+        size = archive_member_size(volume, a.src.name)
+        if size is not None:
+            logging.info("action=reconcile_record rule=%s src=%s dst=%s", a.rule_name, a.src, volume)
+            self.record(a, volume, size=size, member=a.src.name)
+            a.src.unlink(missing_ok=True)
+            return False
+
+        # The volume never got its final contents: drop the placeholder and any partial write.
+        volume.with_name(volume.name + ".partial").unlink(missing_ok=True)
+        if volume.exists() and volume.stat().st_size == 0:
+            volume.unlink()
+        if not a.src.exists():
+            logging.warning("action=reconcile_missing rule=%s src=%s dst=%s", a.rule_name, a.src, volume)
+            return False
+        logging.info("action=reconcile_archive_again rule=%s src=%s", a.rule_name, a.src)
+        self.pending_archives.append((i, a))
+        return True
+
+    def reconcile_one(self, a: MoveAction | CompactMove, dst: Path, started_ns: int | None = None) -> None:
+        if a.action in LINK_ACTIONS:
+            # Links and clones leave the source in place, so recreating our own is cheap and also replaces a
+            # partially written clone. Anything else at dst goes through the rule's duplicate strategy.
+            if not self.fs.exists(a.src):
+                logging.warning("action=reconcile_missing rule=%s src=%s dst=%s", a.rule_name, a.src, dst)
+                return
+            if self.fs.exists(dst) or self.fs.is_symlink(dst):
+                ours = already_linked(self.fs, a.src, dst) or (
+                    not self.fs.is_symlink(dst) and self.partial_copy(a.src, dst, started_ns)
+                )
+                if ours:
+                    logging.info("action=reconcile_partial rule=%s src=%s dst=%s", a.rule_name, a.src, dst)
+                    self.fs.unlink(dst)
+                else:
+                    logging.info("action=reconcile_taken rule=%s src=%s dst=%s", a.rule_name, a.src, dst)
+                    dst = self.resolve(a)
+                    if dst is None:
+                        return
+            self.move(a, dst)
+            return
+
+        src_exists = self.fs.exists(a.src)
+        if not src_exists and self.fs.exists(dst):
+            logging.info("action=reconcile_record rule=%s src=%s dst=%s", a.rule_name, a.src, dst)
+            self.record(a, dst, size=self.fs.stat(dst).st_size if self.catalog is not None else 0)
+            return
+
+        if not src_exists:
+            logging.warning("action=reconcile_missing rule=%s src=%s dst=%s", a.rule_name, a.src, dst)
+            return
+
+        if self.fs.exists(dst) and a.duplicate_strategy != "overwrite":
+            if self.partial_copy(a.src, dst, started_ns):
+                logging.info("action=reconcile_partial rule=%s src=%s dst=%s", a.rule_name, a.src, dst)
+                self.fs.unlink(dst)
+            else:
+                # Another file took the name between the crash and this resume; it is not ours to delete.
+                logging.info("action=reconcile_taken rule=%s src=%s dst=%s", a.rule_name, a.src, dst)
+                dst = self.resolve(a)
+                if dst is None:
+                    return
+        self.move(a, dst)
+
+    def partial_copy(self, src: Path, dst: Path, started_ns: int | None) -> bool:
+        # A cross-device copy interrupted by the crash is no larger than its source and was written after the
+        # intent; a finished copy whose source was never removed already carries the source's mtime.
+        s, d = self.fs.stat(src), self.fs.stat(dst)
+        if d.st_size > s.st_size:
+            return False
+        if d.st_size == s.st_size and d.st_mtime_ns == s.st_mtime_ns:
+            return True
+        return started_ns is not None and d.st_mtime_ns >= started_ns - _MTIME_SLACK_NS
+
+
+def _finish_execution(executor: _MoveExecutor) -> None:
+    # Also reached when a move raised: the moves that did happen still get their ledger entries.
+    executor.sync()
+    executor.flush_history()
+    if executor.catalog is not None:
+        executor.catalog.close()
+    executor.retrier.log_summary()
+    if executor.durability != "none":
+        logging.info("action=durability_summary level=%s fsyncs=%s", executor.durability, executor.fsyncs)
+
+    throttle = executor.throttle
+    if throttle is not None:
+        logging.info(
+            "action=throttle_summary ops=%s bytes=%s throttled_seconds=%.3f rate_factor=%.2f",
+            throttle.ops,
+            throttle.bytes,
+            throttle.throttled_seconds,
+            throttle.factor,
+        )
+
+
+def _make_executor(
+    *,
+    dry_run: bool,
+    ledger_path: Path | None,
+    catalog_path: Path | None,
+    throttle: IOThrottle | None,
+    quarantine_path: Path | None = None,
+    fs: FileSystem = OS_FILESYSTEM,
+    claims: ClusterNode | None = None,
+    check_sources: bool = False,
+    retrier: Retrier | None = None,
+    durability: str = "none",
+) -> _MoveExecutor:
+    if durability not in DURABILITY_LEVELS:
+        raise ValueError(f"Unknown durability level: {durability} (expected one of {', '.join(DURABILITY_LEVELS)})")
+    return _MoveExecutor(
+        dry_run=dry_run,
+        ledger_path=ledger_path,
+        catalog=None if dry_run or catalog_path is None else HistoryCatalog(catalog_path),
+        throttle=throttle if throttle is not None and throttle.enabled else None,
+        quarantine_path=quarantine_path,
+        fs=fs,
+        claims=None if dry_run else claims,
+        check_sources=check_sources,
+        retrier=retrier,
+        durability=durability,
+    )
+
+
+def execute_moves(
+    actions: Iterable[MoveAction] | CompactPlan,
+    *,
+    dry_run: bool,
+    ledger_path: Path | None = None,
+    catalog_path: Path | None = None,
+    throttle: IOThrottle | None = None,
+    journal_path: Path | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    quarantine_path: Path | None = None,
+    fs: FileSystem = OS_FILESYSTEM,
+    claims: ClusterNode | None = None,
+    stop: Callable[[], bool] | None = None,
+    check_sources: bool = False,
+    retrier: Retrier | None = None,
+    durability: str = "none",
+) -> int:
+    if not isinstance(actions, (list, CompactPlan)):
+        actions = list(actions)
+
+    journal = None
+    if not dry_run and journal_path is not None:
+        plan = actions if isinstance(actions, CompactPlan) else CompactPlan.from_actions(actions)
+        journal = IntentJournal.start(journal_path, plan, batch_size=batch_size)
+
+    executor = _make_executor(
+        dry_run=dry_run,
+        ledger_path=ledger_path,
+        catalog_path=catalog_path,
+        throttle=throttle,
+        quarantine_path=quarantine_path,
+        fs=fs,
+        claims=claims,
+        check_sources=check_sources,
+        retrier=retrier,
+        durability=durability,
+    )
+    try:
+        executor.prepare_dirs(actions)
+        batch_count = (len(actions) + batch_size - 1) // batch_size
+        processed = executor.run_batches(
+            actions, range(batch_count), batch_size=batch_size, journal=journal, stop=stop
+        )
+        executor.run_archives(journal)
+    except BaseException:
+        if journal is not None:
+            journal.close()
+        raise
+    finally:
+        _finish_execution(executor)
+
+    # Stopping early is only ever at a batch boundary, so nothing is in flight and the caller owns the rest.
+    if journal is not None:
+        journal.complete()
+    return processed
+
+
+def resume_moves(
+    journal_path: Path,
+    *,
+    ledger_path: Path | None = None,
+    catalog_path: Path | None = None,
+    throttle: IOThrottle | None = None,
+    quarantine_path: Path | None = None,
+    fs: FileSystem = OS_FILESYSTEM,
+    claims: ClusterNode | None = None,
+    retrier: Retrier | None = None,
+    durability: str = "none",
+) -> int:
+    state = IntentJournal.load(journal_path)
+    journal = IntentJournal.reopen(journal_path, state)
+    pending = state.pending_batches()
+    logging.info(
+        "action=resume journal=%s batches_done=%s in_flight=%s batches_pending=%s",
+        journal_path,
+        len(state.done),
+        state.in_flight is not None,
+        len(pending),
+    )
+
+    executor = _make_executor(
+        dry_run=False,
+        ledger_path=ledger_path,
+        catalog_path=catalog_path,
+        throttle=throttle,
+        quarantine_path=quarantine_path,
+        fs=fs,
+        claims=claims,
+        retrier=retrier,
+        durability=durability,
+    )
+    try:
+        executor.prepare_dirs(state.plan)
+        if state.in_flight is not None:
+            batch, moves = state.in_flight
+            executor.reconcile(state.plan, moves, state.in_flight_ns)
+            executor.flush_history()
+            journal.mark_done(batch)
+
+        # Retry rounds from the interrupted run may already have used batch numbers past the end of the plan.
+        used = set(state.done) | {state.batch_count - 1}
+        if state.in_flight is not None:
+            used.add(state.in_flight[0])
+        retry_batch = max(used) + 1
+        if state.retries:
+            executor.resume_retries(state.plan, retry_batch, state.retries, journal)
+            retry_batch += 1
+        executor.run_batches(state.plan, pending, batch_size=state.batch_size, journal=journal, retry_batch=retry_batch)
+        executor.run_archives(journal)
+    except BaseException:
+        journal.close()
+        raise
+    finally:
+        _finish_execution(executor)
+
+    journal.complete()
+    return len(pending)
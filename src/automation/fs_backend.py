@@ -0,0 +1,505 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from collections import Counter
+from dataclasses import dataclass
+import errno
+import itertools
+import os
+from pathlib import Path
+import random
+import shutil
+import threading
+import time
+from typing import Callable
+
+from src.automation import linker
+from src.automation.throttle import IOThrottle, throttled_move
+
+
+class FileSystem(ABC):
+    @abstractmethod
+    def scandir_files(self, directory: Path) -> list[str]:
+        ...
+
+    @abstractmethod
+    def list_dir(self, directory: Path) -> list[tuple[str, bool]]:
+        ...
+
+    def scan_file_stats(self, directory: Path) -> list[tuple[str, int, int]]:
+        stats = []
+        for name in self.scandir_files(directory):
+            try:
+                st = self.stat(directory / name)
+            except FileNotFoundError:
+                continue
+            stats.append((name, st.st_size, st.st_mtime_ns))
+        return stats
+
+    @abstractmethod
+    def exists(self, path: Path) -> bool:
+        ...
+
+    @abstractmethod
+    def is_dir(self, path: Path) -> bool:
+        ...
+
+    @abstractmethod
+    def is_symlink(self, path: Path) -> bool:
+        ...
+
+    @abstractmethod
+    def stat(self, path: Path):
+        ...
+
+    @abstractmethod
+    def mkdir(self, path: Path) -> None:
+        ...
+
+    @abstractmethod
+    def unlink(self, path: Path) -> None:
+        ...
+
+    @abstractmethod
+    def rmdir(self, path: Path) -> None:
+        ...
+
+    @abstractmethod
+    def rename(self, src: Path, dst: Path) -> None:
+        ...
+
+    @abstractmethod
+    def move(self, src: Path, dst: Path, *, throttle: IOThrottle | None = None) -> None:
+        ...
+
+    @abstractmethod
+    def copy(self, src: Path, dst: Path) -> None:
+        ...
+
+    @abstractmethod
+    def link(self, src: Path, dst: Path) -> None:
+        ...
+
+    @abstractmethod
+    def symlink(self, target: Path, dst: Path) -> None:
+        ...
+
+    @abstractmethod
+    def samefile(self, a: Path, b: Path) -> bool:
+        ...
+
+    @abstractmethod
+    def fsync(self, path: Path) -> None:
+        ...
+
+    @abstractmethod
+    def fsync_dir(self, directory: Path) -> None:
+        ...
+
+    def same_device(self, a: Path, b: Path) -> bool:
+        return True
+
+    def reflink(self, src: Path, dst: Path) -> None:
+        raise linker.ReflinkUnsupported(errno.EOPNOTSUPP, "reflink is not supported by this backend", str(src))
+
+
+class OSFileSystem(FileSystem):
+    def scandir_files(self, directory: Path) -> list[str]:
+        with os.scandir(directory) as it:
+            return [e.name for e in it if e.is_file()]
+
+    def list_dir(self, directory: Path) -> list[tuple[str, bool]]:
+        with os.scandir(directory) as it:
+            return [(e.name, e.is_dir(follow_symlinks=False)) for e in it]
+
+    def scan_file_stats(self, directory: Path) -> list[tuple[str, int, int]]:
+        stats = []
+        with os.scandir(directory) as it:
+            for e in it:
+                try:
+                    if not e.is_file():
+                        continue
+                    st = e.stat()
+                except FileNotFoundError:
+                    continue
+                stats.append((e.name, st.st_size, st.st_mtime_ns))
+        return stats
+
+    def exists(self, path: Path) -> bool:
+        return path.exists()
+
+    def is_dir(self, path: Path) -> bool:
+        return path.is_dir()
+
+    def is_symlink(self, path: Path) -> bool:
+        return path.is_symlink()
+
+    def stat(self, path: Path) -> os.stat_result:
+        return path.stat()
+
+    def mkdir(self, path: Path) -> None:
+        path.mkdir(parents=True, exist_ok=True)
+
+    def unlink(self, path: Path) -> None:
+        path.unlink()
+
+    def rmdir(self, path: Path) -> None:
+        path.rmdir()
+
+    def rename(self, src: Path, dst: Path) -> None:
+        os.rename(src, dst)
+
+    def move(self, src: Path, dst: Path, *, throttle: IOThrottle | None = None) -> None:
+        if throttle is None:
+            shutil.move(str(src), str(dst))
+        else:
+            throttled_move(src, dst, throttle)
+
+    def copy(self, src: Path, dst: Path) -> None:
+        shutil.copy2(src, dst)
+
+    def link(self, src: Path, dst: Path) -> None:
+        os.link(src, dst)
+
+    def symlink(self, target: Path, dst: Path) -> None:
+        os.symlink(target, dst)
+
+    def samefile(self, a: Path, b: Path) -> bool:
+        return os.path.samefile(a, b)
+
+    def fsync(self, path: Path) -> None:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def fsync_dir(self, directory: Path) -> None:
+        # Windows cannot open a directory for fsync, and NTFS journals directory changes itself.
+        if os.name != "nt":
+            self.fsync(directory)
+
+    def same_device(self, a: Path, b: Path) -> bool:
+        return os.stat(a).st_dev == os.stat(b).st_dev
+
+    def reflink(self, src: Path, dst: Path) -> None:
+        linker.reflink(src, dst)
+
+
+OS_FILESYSTEM = OSFileSystem()
+
+
+@dataclass(frozen=True)
+class MemoryStat:
+    st_size: int
+    st_mtime_ns: int
+    st_ctime_ns: int
+    st_ino: int
+    st_nlink: int
+    st_dev: int = 1
+
+
+class _Inode:
+    __slots__ = ("ino", "data", "mtime_ns", "ctime_ns", "nlink")
+
+    def __init__(self, ino: int, data: bytes, mtime_ns: int) -> None:
+        self.ino = ino
+        self.data = data
+        self.mtime_ns = mtime_ns
+        self.ctime_ns = mtime_ns
+        self.nlink = 1
+
+
+def _missing(path: str) -> FileNotFoundError:
+    return FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), path)
+
+
+class MemoryFileSystem(FileSystem):
+    def __init__(
+        self,
+        *,
+        latency: float | dict[str, float] = 0.0,
+        sleep: Callable[[float], None] | None = None,
+        clock: Callable[[], int] = time.time_ns,
+        faults: dict[str, float] | None = None,
+        fault_errnos: tuple[int, ...] = (errno.EBUSY,),
+        seed: int = 0,
+    ) -> None:
+        # Latency is per operation name ("*" for the default). Without a sleep function it is only
+        # accumulated in latency_seconds, so slow-storage runs can be measured without waiting.
+        self._latency = latency if isinstance(latency, dict) else {"*": latency}
+        # Faults are a failure probability per operation name; a failing call raises one of
+        # fault_errnos before touching any state, like a transient error from real storage.
+        self.faults = dict(faults or {})
+        self._fault_errnos = fault_errnos
+        self._rng = random.Random(seed)
+        self._sleep = sleep
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._inos = itertools.count(1)
+        self._files: dict[str, _Inode] = {}
+        self._symlinks: dict[str, str] = {}
+        self._dirs: dict[str, dict[str, None]] = {os.sep: {}}
+        self.op_counts: Counter[str] = Counter()
+        self.faults_injected: Counter[str] = Counter()
+        self.latency_seconds = 0.0
+
+    def _op(self, name: str) -> None:
+        delay = self._latency.get(name, self._latency.get("*", 0.0))
+        rate = self.faults.get(name, 0.0)
+        with self._lock:
+            self.op_counts[name] += 1
+            self.latency_seconds += delay
+            code = self._rng.choice(self._fault_errnos) if rate and self._rng.random() < rate else None
+            if code is not None:
+                self.faults_injected[name] += 1
+        if delay and self._sleep is not None:
+            self._sleep(delay)
+        if code is not None:
+            raise OSError(code, os.strerror(code), name)
+
+    def reset_counts(self) -> None:
+        with self._lock:
+            self.op_counts.clear()
+            self.faults_injected.clear()
+            self.latency_seconds = 0.0
+
+    @staticmethod
+    def _key(path: Path | str) -> str:
+        return os.path.normpath(os.path.abspath(str(path)))
+
+    def _resolve(self, key: str) -> str:
+        seen = 0
+        while key in self._symlinks:
+            target = self._symlinks[key]
+            key = self._key(target if os.path.isabs(target) else os.path.join(os.path.dirname(key), target))
+            seen += 1
+            if seen > 40:
+                raise OSError(errno.ELOOP, os.strerror(errno.ELOOP), key)
+        return key
+
+    def _lexists(self, key: str) -> bool:
+        return key in self._files or key in self._dirs or key in self._symlinks
+
+    def _attach(self, key: str) -> None:
+        parent = self._resolve(os.path.dirname(key))
+        children = self._dirs.get(parent)
+        if children is None:
+            raise _missing(os.path.dirname(key))
+        children[os.path.basename(key)] = None
+
+    def _detach(self, key: str) -> None:
+        parent = self._resolve(os.path.dirname(key))
+        self._dirs[parent].pop(os.path.basename(key), None)
+
+    def _drop_link(self, key: str) -> None:
+        if key in self._symlinks:
+            del self._symlinks[key]
+        else:
+            self._files.pop(key).nlink -= 1
+        self._detach(key)
+
+    def write_file(self, path: Path | str, data: bytes = b"", *, mtime_ns: int | None = None) -> None:
+        self._op("write")
+        key = self._key(path)
+        with self._lock:
+            if key in self._dirs:
+                raise IsADirectoryError(errno.EISDIR, os.strerror(errno.EISDIR), key)
+            if key in self._files or key in self._symlinks:
+                self._drop_link(key)
+            self._attach(key)
+            stamp = self._clock() if mtime_ns is None else mtime_ns
+            self._files[key] = _Inode(next(self._inos), bytes(data), stamp)
+
+    def read_bytes(self, path: Path | str) -> bytes:
+        self._op("read")
+        with self._lock:
+            inode = self._files.get(self._resolve(self._key(path)))
+            if inode is None:
+                raise _missing(str(path))
+            return inode.data
+
+    def scandir_files(self, directory: Path) -> list[str]:
+        self._op("scandir")
+        with self._lock:
+            base = self._resolve(self._key(directory))
+            children = self._dirs.get(base)
+            if children is None:
+                raise _missing(str(directory))
+            return [n for n in children if self._resolve(os.path.join(base, n)) in self._files]
+
+    def list_dir(self, directory: Path) -> list[tuple[str, bool]]:
+        self._op("scandir")
+        with self._lock:
+            base = self._resolve(self._key(directory))
+            children = self._dirs.get(base)
+            if children is None:
+                raise _missing(str(directory))
+            return [(n, os.path.join(base, n) in self._dirs) for n in children]
+
+    def exists(self, path: Path) -> bool:
+        self._op("stat")
+        with self._lock:
+            key = self._resolve(self._key(path))
+            return key in self._files or key in self._dirs
+
+    def is_dir(self, path: Path) -> bool:
+        self._op("stat")
+        with self._lock:
+            return self._resolve(self._key(path)) in self._dirs
+
+    def is_symlink(self, path: Path) -> bool:
+        self._op("lstat")
+        with self._lock:
+            return self._key(path) in self._symlinks
+
+    def stat(self, path: Path) -> MemoryStat:
+        self._op("stat")
+        with self._lock:
+            inode = self._files.get(self._resolve(self._key(path)))
+            if inode is None:
+                raise _missing(str(path))
+            return MemoryStat(
+                st_size=len(inode.data),
+                st_mtime_ns=inode.mtime_ns,
+                st_ctime_ns=inode.ctime_ns,
+                st_ino=inode.ino,
+                st_nlink=inode.nlink,
+            )
+
+    def mkdir(self, path: Path) -> None:
+        self._op("mkdir")
+        with self._lock:
+            missing: list[str] = []
+            key = self._key(path)
+            while self._resolve(key) not in self._dirs:
+                if self._lexists(key):
+                    raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), key)
+                missing.append(key)
+                key = os.path.dirname(key)
+            for key in reversed(missing):
+                self._attach(key)
+                self._dirs[key] = {}
+
+    def unlink(self, path: Path) -> None:
+        self._op("unlink")
+        key = self._key(path)
+        with self._lock:
+            if key in self._dirs:
+                raise IsADirectoryError(errno.EISDIR, os.strerror(errno.EISDIR), key)
+            if key not in self._files and key not in self._symlinks:
+                raise _missing(key)
+            self._drop_link(key)
+
+    def rmdir(self, path: Path) -> None:
+        self._op("rmdir")
+        key = self._key(path)
+        with self._lock:
+            children = self._dirs.get(key)
+            if children is None:
+                raise _missing(key)
+            if children:
+                raise OSError(errno.ENOTEMPTY, os.strerror(errno.ENOTEMPTY), key)
+            del self._dirs[key]
+            self._detach(key)
+
+    def _rename(self, src: Path, dst: Path) -> None:
+        s, d = self._key(src), self._key(dst)
+        with self._lock:
+            if s in self._dirs:
+                raise IsADirectoryError(errno.EISDIR, "renaming directories is not supported", s)
+            if not self._lexists(s):
+                raise _missing(s)
+            if d in self._dirs:
+                raise IsADirectoryError(errno.EISDIR, os.strerror(errno.EISDIR), d)
+            if s == d:
+                return
+            if d in self._files or d in self._symlinks:
+                self._drop_link(d)
+            self._attach(d)
+            if s in self._symlinks:
+                self._symlinks[d] = self._symlinks.pop(s)
+            else:
+                inode = self._files.pop(s)
+                inode.ctime_ns = self._clock()
+                self._files[d] = inode
+            self._detach(s)
+
+    def rename(self, src: Path, dst: Path) -> None:
+        self._op("rename")
+        self._rename(src, dst)
+
+    def move(self, src: Path, dst: Path, *, throttle: IOThrottle | None = None) -> None:
+        if throttle is not None:
+            throttle.acquire_op()
+        self._op("rename")
+        self._rename(src, dst)
+
+    def copy(self, src: Path, dst: Path) -> None:
+        self._op("copy")
+        with self._lock:
+            inode = self._files.get(self._resolve(self._key(src)))
+            if inode is None:
+                raise _missing(str(src))
+            d = self._key(dst)
+            if d in self._files or d in self._symlinks:
+                self._drop_link(d)
+            self._attach(d)
+            self._files[d] = _Inode(next(self._inos), inode.data, inode.mtime_ns)
+
+    def reflink(self, src: Path, dst: Path) -> None:
+        self._op("reflink")
+        with self._lock:
+            inode = self._files.get(self._resolve(self._key(src)))
+            if inode is None:
+                raise _missing(str(src))
+            d = self._key(dst)
+            if self._lexists(d):
+                raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), d)
+            self._attach(d)
+            self._files[d] = _Inode(next(self._inos), inode.data, inode.mtime_ns)
+
+    def link(self, src: Path, dst: Path) -> None:
+        self._op("link")
+        with self._lock:
+            inode = self._files.get(self._resolve(self._key(src)))
+            if inode is None:
+                raise _missing(str(src))
+            d = self._key(dst)
+            if self._lexists(d):
+                raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), d)
+            self._attach(d)
+            inode.nlink += 1
+            self._files[d] = inode
+
+    def symlink(self, target: Path, dst: Path) -> None:
+        self._op("symlink")
+        with self._lock:
+            d = self._key(dst)
+            if self._lexists(d):
+                raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), d)
+            self._attach(d)
+            self._symlinks[d] = str(target)
+
+    def samefile(self, a: Path, b: Path) -> bool:
+        self._op("stat")
+        with self._lock:
+            ka, kb = self._resolve(self._key(a)), self._resolve(self._key(b))
+            if ka in self._dirs or kb in self._dirs:
+                return ka == kb
+            ia, ib = self._files.get(ka), self._files.get(kb)
+            if ia is None or ib is None:
+                raise _missing(str(a if ia is None else b))
+            return ia is ib
+
+    def fsync(self, path: Path) -> None:
+        self._op("fsync")
+        with self._lock:
+            if self._resolve(self._key(path)) not in self._files:
+                raise _missing(str(path))
+
+    def fsync_dir(self, directory: Path) -> None:
+        self._op("fsync_dir")
+        with self._lock:
+            if self._resolve(self._key(directory)) not in self._dirs:
+                raise _missing(str(directory))
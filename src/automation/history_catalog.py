@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import json
+from pathlib import Path
+import sqlite3
+from typing import Iterable, Iterator
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS moves (
+    id INTEGER PRIMARY KEY,
+    ts TEXT NOT NULL,
+    day TEXT NOT NULL,
+    src TEXT NOT NULL,
+    dst TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    dst_name TEXT NOT NULL,
+    dst_dir TEXT NOT NULL,
+    rule_name TEXT NOT NULL,
+    duplicate_strategy TEXT NOT NULL,
+    bytes INTEGER NOT NULL DEFAULT 0,
+    undone_ts TEXT,
+    entry_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_moves_filename ON moves(filename);
+CREATE INDEX IF NOT EXISTS idx_moves_dst_name ON moves(dst_name);
+CREATE INDEX IF NOT EXISTS idx_moves_dst ON moves(dst);
+CREATE INDEX IF NOT EXISTS idx_moves_dst_dir_ts ON moves(dst_dir, ts);
+CREATE INDEX IF NOT EXISTS idx_moves_rule_ts ON moves(rule_name, ts);
+CREATE INDEX IF NOT EXISTS idx_moves_ts ON moves(ts);
+CREATE TABLE IF NOT EXISTS daily_rule_stats (
+    day TEXT NOT NULL,
+    rule_name TEXT NOT NULL,
+    moves INTEGER NOT NULL DEFAULT 0,
+    bytes INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, rule_name)
+) WITHOUT ROWID;
+"""
+
+# One row per ledger entry id, so importing a ledger that was already recorded (or importing it twice) adds nothing.
+# Ledgers written before entries had ids import as rows without one, which the index does not constrain.
+_UNIQUE_ENTRY_IDS = "CREATE UNIQUE INDEX IF NOT EXISTS idx_moves_entry_id ON moves(entry_id)"
+
+_INSERT_MOVE = (
+    "INSERT{conflict} INTO moves (ts, day, src, dst, filename, dst_name, dst_dir, rule_name, "
+    "duplicate_strategy, bytes, undone_ts, entry_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+_UPSERT_DAILY = """
+INSERT INTO daily_rule_stats (day, rule_name, moves, bytes) VALUES (?, ?, ?, ?)
+ON CONFLICT(day, rule_name) DO UPDATE SET
+    moves = moves + excluded.moves,
+    bytes = bytes + excluded.bytes
+"""
+
+
+@dataclass(frozen=True)
+class HistoryRecord:
+    src: str
+    dst: str
+    ts: str
+    rule_name: str
+    duplicate_strategy: str
+    bytes: int = 0
+    undone_ts: str | None = None
+    entry_id: str | None = None
+
+
+@dataclass(frozen=True)
+class DailyRuleStat:
+    day: str
+    rule_name: str
+    moves: int
+    bytes: int
+
+
+class HistoryCatalog:
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+
+    def _migrate(self) -> None:
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(moves)")}
+        with self._conn:
+            if "entry_id" not in columns:
+                self._conn.execute("ALTER TABLE moves ADD COLUMN entry_id TEXT")
+            # Keyed on (ts, src, dst), this index dropped real moves repeated within the same second.
+            self._conn.execute("DROP INDEX IF EXISTS idx_moves_entry")
+            self._conn.execute(_UNIQUE_ENTRY_IDS)
+
+    def __enter__(self) -> HistoryCatalog:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def record_moves(self, records: Iterable[HistoryRecord]) -> int:
+        return self._insert_moves(records, skip_known=False)
+
+    def _insert_moves(self, records: Iterable[HistoryRecord], *, skip_known: bool) -> int:
+        sql = _INSERT_MOVE.format(conflict=" OR IGNORE" if skip_known else "")
+        inserted = 0
+        daily: dict[tuple[str, str], list[int]] = {}
+        with self._conn:
+            for r in records:
+                src = Path(r.src)
+                dst = Path(r.dst)
+                day = r.ts[:10]
+                cur = self._conn.execute(
+                    sql,
+                    (
+                        r.ts,
+                        day,
+                        r.src,
+                        r.dst,
+                        src.name,
+                        dst.name,
+                        str(dst.parent),
+                        r.rule_name,
+                        r.duplicate_strategy,
+                        r.bytes,
+                        r.undone_ts,
+                        r.entry_id,
+                    ),
+                )
+                # Rollups only count rows that were new, so a repeated import leaves them as they were.
+                if cur.rowcount != 1:
+                    continue
+                inserted += 1
+                if r.undone_ts is None:
+                    totals = daily.setdefault((day, r.rule_name), [0, 0])
+                    totals[0] += 1
+                    totals[1] += r.bytes
+
+            self._conn.executemany(
+                _UPSERT_DAILY,
+                [(day, rule, n, size) for (day, rule), (n, size) in daily.items()],
+            )
+        return inserted
+
+    def mark_undone(
+        self,
+        src: str,
+        dst: str,
+        *,
+        ts: str,
+        entry_id: str | None = None,
+        entry_ts: str | None = None,
+    ) -> bool:
+        where = "dst = ? AND src = ? AND undone_ts IS NULL"
+        params: tuple[str, ...] = (dst, src)
+        if entry_id is not None:
+            where += " AND entry_id = ?"
+            params += (entry_id,)
+        elif entry_ts is not None:
+            where += " AND ts = ?"
+            params += (entry_ts,)
+        with self._conn:
+            row = self._conn.execute(
+                f"SELECT id, day, rule_name, bytes FROM moves WHERE {where} ORDER BY id DESC LIMIT 1",
+                params,
+            ).fetchone()
+            if row is None:
+                return False
+
+            move_id, day, rule_name, size = row
+            self._conn.execute("UPDATE moves SET undone_ts = ? WHERE id = ?", (ts, move_id))
+            self._conn.execute(
+                "UPDATE daily_rule_stats SET moves = moves - 1, bytes = bytes - ? "
+                "WHERE day = ? AND rule_name = ?",
+                (size, day, rule_name),
+            )
+        return True
+
+    def find_moves(
+        self,
+        *,
+        name: str | None = None,
+        rule_name: str | None = None,
+        destination: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+        include_undone: bool = True,
+        limit: int = 50,
+    ) -> list[HistoryRecord]:
+        clauses: list[str] = []
+        params: list[object] = []
+
+        if name is not None:
+            clauses.append("(filename = ? OR dst_name = ?)")
+            params.extend([name, name])
+        if rule_name is not None:
+            clauses.append("rule_name = ?")
+            params.append(rule_name)
+        if destination is not None:
+            clauses.append("dst_dir = ?")
+            params.append(destination)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(until)
+        if not include_undone:
+            clauses.append("undone_ts IS NULL")
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        params.append(limit)
+        rows = self._conn.execute(
+            "SELECT src, dst, ts, rule_name, duplicate_strategy, bytes, undone_ts, entry_id "
+            f"FROM moves {where} ORDER BY ts DESC, id DESC LIMIT ?",
+            params,
+        ).fetchall()
+        return [HistoryRecord(*row) for row in rows]
+
+    def daily_rule_stats(
+        self,
+        *,
+        rule_name: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+    ) -> list[DailyRuleStat]:
+        clauses: list[str] = []
+        params: list[object] = []
+
+        if rule_name is not None:
+            clauses.append("rule_name = ?")
+            params.append(rule_name)
+        if since is not None:
+            clauses.append("day >= ?")
+            params.append(since[:10])
+        if until is not None:
+            clauses.append("day < ?")
+            params.append(until[:10])
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._conn.execute(
+            f"SELECT day, rule_name, moves, bytes FROM daily_rule_stats {where} ORDER BY day DESC, rule_name",
+            params,
+        ).fetchall()
+        return [DailyRuleStat(*row) for row in rows]
+
+    def import_ledger(self, ledger_path: Path) -> int:
+        if not ledger_path.exists():
+            raise FileNotFoundError(f"Ledger file not found: {ledger_path}")
+
+        records: list[HistoryRecord] = []
+        undos: list[dict] = []
+        with ledger_path.open("r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                payload = json.loads(line)
+                if payload.get("type") == "undo":
+                    undos.append(payload)
+                    continue
+                records.append(
+                    HistoryRecord(
+                        src=payload["src"],
+                        dst=payload["dst"],
+                        ts=payload["ts"],
+                        rule_name=payload.get("rule_name", ""),
+                        duplicate_strategy=payload.get("duplicate_strategy", ""),
+                        bytes=int(payload.get("bytes", 0)),
+                        entry_id=payload.get("entry_id"),
+                    )
+                )
+        imported = self._insert_moves(self._unrecorded_legacy(records), skip_known=True)
+        for undo in undos:
+            # Matching on the entry itself keeps re-imports from undoing a later move of the same file.
+            self.mark_undone(
+                undo["src"], undo["dst"], ts=undo["ts"], entry_id=undo.get("entry_id"), entry_ts=undo["entry_ts"]
+            )
+        return imported
+
+    def _unrecorded_legacy(self, records: list[HistoryRecord]) -> Iterator[HistoryRecord]:
+        # Entries without an id can only be told apart by count: the catalog already holds the first n lines that
+        # share a (ts, src, dst), and any beyond that are real repeats within the same second.
+        seen: dict[tuple[str, str, str], int] = {}
+        for r in records:
+            if r.entry_id is not None:
+                yield r
+                continue
+            key = (r.ts, r.src, r.dst)
+            if key not in seen:
+                seen[key] = -self._conn.execute(
+                    "SELECT COUNT(*) FROM moves WHERE ts = ? AND src = ? AND dst = ? AND entry_id IS NULL", key
+                ).fetchone()[0]
+            seen[key] += 1
+            if seen[key] > 0:
+                yield r
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import os
+import re
+
+# Partial downloads from browsers and download tools; a config can re-include any of them with "!".
+IN_PROGRESS_PATTERNS = ("*.crdownload", "*.part", "*.partial", "*.download")
+
+_CASE_FOLD = os.path.normcase("A") == "a"
+_FLAGS = re.DOTALL | (re.IGNORECASE if _CASE_FOLD else 0)
+
+
+@dataclass(frozen=True)
+class _IgnorePattern:
+    regex: re.Pattern
+    negated: bool
+    dir_only: bool
+    anchored: bool
+    # Literal text every match ends with ("" when the pattern ends in a wildcard).
+    suffix: str
+
+
+def _translate(pattern: str) -> str:
+    out: list[str] = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith("**/", i) and (i == 0 or pattern[i - 1] == "/"):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i) and i + 2 == n and (i == 0 or pattern[i - 1] == "/"):
+            out.append(".*")
+            i += 2
+        elif c == "*":
+            out.append("[^/]*")
+            i += 1
+        elif c == "?":
+            out.append("[^/]")
+            i += 1
+        elif c == "[":
+            j = pattern.find("]", i + 2 if pattern[i + 1:i + 2] in ("!", "^", "]") else i + 1)
+            if j < 0:
+                out.append(re.escape(c))
+                i += 1
+                continue
+            body = pattern[i + 1:j]
+            if body[:1] in ("!", "^"):
+                body = "^" + body[1:]
+            out.append("[" + body.replace("\\", "\\\\") + "]")
+            i = j + 1
+        elif c == "\\" and i + 1 < n:
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(c))
+            i += 1
+    return "".join(out)
+
+
+def _compile(raw: str) -> _IgnorePattern | None:
+    line = raw.rstrip()
+    if not line or line.startswith("#"):
+        return None
+    negated = line.startswith("!")
+    if negated or line.startswith("\\!") or line.startswith("\\#"):
+        line = line[1:]
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+
+    # As in .gitignore, a pattern with a slash is anchored at source_dir and matched against the
+    # relative path; one without matches the last component at any depth.
+    anchored = "/" in line
+    line = line.lstrip("/")
+    try:
+        regex = re.compile(_translate(line) + r"\Z", _FLAGS)
+    except re.error as e:
+        raise ValueError(f"Invalid ignore pattern {raw!r}: {e}") from None
+    tail = re.split(r"[*?\[\]\\]", line)[-1]
+    return _IgnorePattern(
+        regex=regex,
+        negated=negated,
+        dir_only=dir_only,
+        anchored=anchored,
+        suffix=(tail.lower() if _CASE_FOLD else tail) if line.endswith(tail) else "",
+    )
+
+
+class IgnoreRules:
+    def __init__(self, patterns: list[str] | tuple[str, ...]) -> None:
+        self.patterns = [p for p in (_compile(raw) for raw in patterns) if p is not None]
+        # Most names match nothing; when every pattern ends in literal text, one endswith() call
+        # rejects them before any regex runs.
+        self._suffixes: dict[bool, tuple[str, ...] | None] = {}
+        for is_dir in (False, True):
+            suffixes = [p.suffix for p in self.patterns if is_dir or not p.dir_only]
+            self._suffixes[is_dir] = None if "" in suffixes else tuple(suffixes)
+
+    def is_ignored(self, rel_path: str, *, is_dir: bool = False) -> bool:
+        if os.sep != "/":
+            rel_path = rel_path.replace(os.sep, "/")
+        suffixes = self._suffixes[is_dir]
+        if suffixes is not None and not (rel_path.lower() if _CASE_FOLD else rel_path).endswith(suffixes):
+            return False
+        name = rel_path.rpartition("/")[2]
+        # The last matching pattern decides, so later "!" lines re-include earlier matches.
+        for p in reversed(self.patterns):
+            if p.dir_only and not is_dir:
+                continue
+            if p.regex.match(rel_path if p.anchored else name):
+                return not p.negated
+        return False
+
+
+_cache: list[tuple[tuple[str, ...], IgnoreRules]] = []
+
+
+def ignore_rules_for(ignore: tuple[str, ...] | list[str]) -> IgnoreRules:
+    key = (*IN_PROGRESS_PATTERNS, *ignore)
+    for cached_key, rules in _cache:
+        if cached_key == key:
+            return rules
+    rules = IgnoreRules(key)
+    _cache.insert(0, (key, rules))
+    del _cache[8:]
+    return rules
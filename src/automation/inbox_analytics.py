@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+import os
+from pathlib import Path
+import time
+
+import numpy as np
+
+from src.automation.rule_index import path_suffix
+from src.automation.rules_engine import compile_rules, resolve_destination_folder
+from src.automation.run_state import DirFingerprint, fingerprint_dir
+from src.config.config_loader import Config
+
+SIZE_BUCKETS = [
+    ("< 1 KB", 1024),
+    ("1-100 KB", 100 * 1024),
+    ("100 KB-1 MB", 1024**2),
+    ("1-10 MB", 10 * 1024**2),
+    ("10-100 MB", 100 * 1024**2),
+    ("100 MB-1 GB", 1024**3),
+    ("> 1 GB", None),
+]
+AGE_BUCKETS = [
+    ("< 1 day", 1),
+    ("1-7 days", 7),
+    ("1-4 weeks", 30),
+    ("1-3 months", 90),
+    ("3-12 months", 365),
+    ("> 1 year", None),
+]
+NO_EXTENSION = "(none)"
+_DAY = 86400.0
+_CACHE_SIZE = 8
+
+
+@dataclass(frozen=True)
+class InboxColumns:
+    names: list[str]
+    ext_ids: array
+    extensions: list[str]
+    sizes: array
+    mtimes: array
+
+
+@dataclass(frozen=True)
+class Bucket:
+    label: str
+    files: int
+    bytes: int
+
+
+@dataclass(frozen=True)
+class InboxAnalytics:
+    files: int
+    bytes: int
+    size_histogram: list[Bucket]
+    age_histogram: list[Bucket]
+    top_extensions: list[Bucket]
+    unmatched_extensions: list[Bucket]
+    destinations: list[Bucket]
+
+
+def scan_columns(source_dir: Path) -> InboxColumns:
+    names: list[str] = []
+    ext_ids = array("I")
+    ext_index: dict[str, int] = {}
+    sizes = array("q")
+    mtimes = array("d")
+
+    with os.scandir(source_dir) as it:
+        for e in it:
+            try:
+                if not e.is_file():
+                    continue
+                st = e.stat()
+            except OSError:
+                continue
+            ext = path_suffix(e.name).lower() or NO_EXTENSION
+            i = ext_index.get(ext)
+            if i is None:
+                i = ext_index[ext] = len(ext_index)
+            names.append(e.name)
+            ext_ids.append(i)
+            sizes.append(st.st_size)
+            mtimes.append(st.st_mtime)
+
+    return InboxColumns(names=names, ext_ids=ext_ids, extensions=list(ext_index), sizes=sizes, mtimes=mtimes)
+
+
+def _histogram(values: np.ndarray, sizes: np.ndarray, buckets: list[tuple[str, float | None]]) -> list[Bucket]:
+    edges = np.array([limit for _, limit in buckets if limit is not None], dtype=np.float64)
+    idx = np.searchsorted(edges, values, side="right")
+    counts = np.bincount(idx, minlength=len(buckets))
+    totals = np.bincount(idx, weights=sizes, minlength=len(buckets))
+    return [Bucket(label, int(counts[i]), int(totals[i])) for i, (label, _) in enumerate(buckets)]
+
+
+def _grouped(ids: np.ndarray, sizes: np.ndarray, labels: list[str], *, by_bytes: bool, top: int | None) -> list[Bucket]:
+    counts = np.bincount(ids, minlength=len(labels))
+    totals = np.bincount(ids, weights=sizes, minlength=len(labels))
+    order = np.lexsort((counts, totals) if by_bytes else (totals, counts))[::-1]
+    rows = [Bucket(labels[i], int(counts[i]), int(totals[i])) for i in order if counts[i]]
+    return rows if top is None else rows[:top]
+
+
+def compute_analytics(
+    cfg: Config,
+    columns: InboxColumns,
+    *,
+    now: float | None = None,
+    top: int = 15,
+) -> InboxAnalytics:
+    sizes = np.frombuffer(columns.sizes, dtype=np.int64).astype(np.float64)
+    mtimes = np.frombuffer(columns.mtimes, dtype=np.float64)
+    ext_ids = np.frombuffer(columns.ext_ids, dtype=np.uint32).astype(np.intp)
+    ages = ((now if now is not None else time.time()) - mtimes) / _DAY
+
+    # Rule selection is per name; everything after it is array arithmetic over rule positions.
+    ruleset = compile_rules(cfg)
+    select = ruleset.select_position
+    fallback = len(ruleset.rules)
+    positions = np.fromiter(
+        (pos if pos >= 0 else fallback for pos in map(select, columns.names)),
+        dtype=np.intp,
+        count=len(columns.names),
+    )
+
+    dest_labels: list[str] = []
+    dest_of_rule = np.empty(fallback + 1, dtype=np.intp)
+    for pos, rule in enumerate([*ruleset.rules, None]):
+        folder, _rule_name = resolve_destination_folder(rule, cfg)
+        if folder not in dest_labels:
+            dest_labels.append(folder)
+        dest_of_rule[pos] = dest_labels.index(folder)
+
+    unmatched = positions == fallback
+    return InboxAnalytics(
+        files=len(columns.names),
+        bytes=int(sizes.sum()),
+        size_histogram=_histogram(sizes, sizes, SIZE_BUCKETS),
+        age_histogram=_histogram(ages, sizes, AGE_BUCKETS),
+        top_extensions=_grouped(ext_ids, sizes, columns.extensions, by_bytes=True, top=top),
+        unmatched_extensions=_grouped(
+            ext_ids[unmatched], sizes[unmatched], columns.extensions, by_bytes=False, top=top
+        ),
+        destinations=_grouped(dest_of_rule[positions], sizes, dest_labels, by_bytes=True, top=None),
+    )
+
+
+_cache: dict[str, tuple[DirFingerprint, Config, InboxAnalytics]] = {}
+
+
+def inbox_analytics(cfg: Config) -> InboxAnalytics:
+    # Rescanning only when the directory fingerprint moves keeps reruns of the dashboard instant;
+    # in-place edits to existing files do not change it and are picked up on the next rename or add.
+    key = str(cfg.source_dir.resolve())
+    current = fingerprint_dir(cfg.source_dir)
+    if current is None:
+        raise FileNotFoundError(f"source_dir not found or not a directory: {cfg.source_dir}")
+
+    cached = _cache.get(key)
+    if cached is not None and cached[0] == current and cached[1] is cfg:
+        return cached[2]
+
+    result = compute_analytics(cfg, scan_columns(cfg.source_dir))
+    _cache[key] = (current, cfg, result)
+    while len(_cache) > _CACHE_SIZE:
+        _cache.pop(next(iter(_cache)))
+    return result
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+import json
+import os
+from pathlib import Path
+import time
+
+from src.automation.compact_plan import CompactPlan
+from src.automation.plan_store import load_plan, save_plan
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def journal_plan_path(journal_path: Path) -> Path:
+    return journal_path.with_name(journal_path.name + ".plan")
+
+
+@dataclass(frozen=True)
+class JournalState:
+    plan: CompactPlan
+    batch_size: int
+    done: set[int]
+    in_flight: tuple[int, list[tuple[int, str]]] | None
+    # When the in-flight intent was written (time.time_ns), for telling our partial copies from newer files.
+    in_flight_ns: int | None
+    # Moves left backing off by batches that were already marked done.
+    retries: list[tuple[int, str]]
+
+    @property
+    def batch_count(self) -> int:
+        return (len(self.plan) + self.batch_size - 1) // self.batch_size
+
+    def pending_batches(self) -> list[int]:
+        skip = set(self.done)
+        if self.in_flight is not None:
+            skip.add(self.in_flight[0])
+        return [k for k in range(self.batch_count) if k not in skip]
+
+
+class IntentJournal:
+    def __init__(self, path: Path, batch_size: int) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self._f = path.open("a", encoding="utf-8")
+
+    @classmethod
+    def start(cls, path: Path, plan: CompactPlan, *, batch_size: int = DEFAULT_BATCH_SIZE) -> IntentJournal:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        save_plan(journal_plan_path(path), plan, fingerprints=[None] * len(plan))
+        path.write_text("", encoding="utf-8")
+
+        journal = cls(path, batch_size)
+        journal._write(
+            {
+                "type": "start",
+                "ts": datetime.now().isoformat(timespec="seconds"),
+                "batch_size": batch_size,
+                "count": len(plan),
+            }
+        )
+        return journal
+
+    @classmethod
+    def reopen(cls, path: Path, state: JournalState) -> IntentJournal:
+        return cls(path, state.batch_size)
+
+    @staticmethod
+    def exists(path: Path) -> bool:
+        return path.exists() and journal_plan_path(path).exists()
+
+    @staticmethod
+    def load(path: Path) -> JournalState:
+        if not IntentJournal.exists(path):
+            raise FileNotFoundError(f"No interrupted run found at: {path}")
+
+        plan = load_plan(journal_plan_path(path)).actions
+        batch_size = DEFAULT_BATCH_SIZE
+        done: set[int] = set()
+        intents: dict[int, list[tuple[int, str]]] = {}
+        intent_ns: dict[int, int] = {}
+        retries: dict[int, str] = {}
+        last_intent: int | None = None
+
+        with path.open("r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final write from the crash; everything before it is intact.
+                    break
+
+                kind = record.get("type")
+                if kind == "start":
+                    batch_size = int(record["batch_size"])
+                elif kind == "intent":
+                    last_intent = int(record["batch"])
+                    intents[last_intent] = [(int(i), str(dst)) for i, dst in record["moves"]]
+                    if "ts_ns" in record:
+                        intent_ns[last_intent] = int(record["ts_ns"])
+                    for i, _dst in intents[last_intent]:
+                        retries.pop(i, None)
+                elif kind == "done":
+                    done.add(int(record["batch"]))
+                    retries.update((int(i), str(dst)) for i, dst in record.get("retries", []))
+
+        in_flight = None
+        if last_intent is not None and last_intent not in done:
+            in_flight = (last_intent, intents[last_intent])
+
+        return JournalState(
+            plan=plan,
+            batch_size=batch_size,
+            done=done,
+            in_flight=in_flight,
+            in_flight_ns=None if in_flight is None else intent_ns.get(in_flight[0]),
+            retries=sorted(retries.items()),
+        )
+
+    def _write(self, record: dict) -> None:
+        self._f.write(json.dumps(record, sort_keys=True) + "\n")
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def record_intent(self, batch: int, moves: list[tuple[int, str]]) -> None:
+        self._write(
+            {"type": "intent", "batch": batch, "moves": [[i, dst] for i, dst in moves], "ts_ns": time.time_ns()}
+        )
+
+    def mark_done(self, batch: int, retries: list[tuple[int, str]] | None = None) -> None:
+        record: dict = {"type": "done", "batch": batch}
+        if retries:
+            record["retries"] = [[i, dst] for i, dst in retries]
+        self._write(record)
+
+    def complete(self) -> None:
+        self._f.close()
+        journal_plan_path(self.path).unlink(missing_ok=True)
+        self.path.unlink(missing_ok=True)
+
+    def close(self) -> None:
+        self._f.close()
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Sequence
+
+from src.automation.rules_engine import CompiledRuleSet, compile_rules
+from src.config.config_loader import Config, Rule
+
+DEFAULT_BATCH_SIZE = 4096
+
+_worker_ruleset: CompiledRuleSet | None = None
+
+
+def _init_worker(cfg: Config) -> None:
+    global _worker_ruleset
+    _worker_ruleset = CompiledRuleSet(cfg)
+
+
+def _select_batch(packed_names: str) -> bytes:
+    assert _worker_ruleset is not None
+    select_position = _worker_ruleset.select_position
+    # Filenames cannot contain NUL, so a batch travels as one string and comes back as packed ints.
+    return array("i", [select_position(n) for n in packed_names.split("\0")]).tobytes()
+
+
+def select_rules_parallel(
+    cfg: Config,
+    names: Sequence[str],
+    *,
+    processes: int,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> list[Rule | None]:
+    ruleset = compile_rules(cfg)
+    if processes <= 1 or len(names) <= batch_size:
+        return [ruleset.select(n) for n in names]
+
+    batches = ["\0".join(names[i:i + batch_size]) for i in range(0, len(names), batch_size)]
+    rules = ruleset.rules
+    selected: list[Rule | None] = []
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(cfg,)) as pool:
+        # map() yields in submission order, so the result matches the serial planner exactly.
+        for raw in pool.map(_select_batch, batches):
+            positions = array("i")
+            positions.frombytes(raw)
+            selected.extend(None if pos < 0 else rules[pos] for pos in positions)
+
+    return selected
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+import json
+import os
+from pathlib import Path
+import struct
+from typing import Sequence
+import zlib
+
+from src.automation.actions import ActionSpec, MoveAction
+from src.automation.compact_plan import CompactPlan
+
+PLAN_MAGIC = b"PATPLAN\x01"
+PLAN_VERSION = 3
+
+_HEADER_LEN = struct.Struct("<I")
+_VERIFY_WORKERS = 8
+_VERIFY_CHUNK = 2048
+
+Fingerprint = tuple[int, int, int]
+
+
+@dataclass(frozen=True)
+class StoredPlan:
+    actions: CompactPlan
+    sizes: array
+    mtimes: array
+    inodes: array
+    meta: dict = field(default_factory=dict)
+
+    def fingerprint(self, i: int) -> Fingerprint | None:
+        if self.sizes[i] < 0:
+            return None
+        return (self.sizes[i], self.mtimes[i], self.inodes[i])
+
+
+def _fingerprint(path: str | Path) -> Fingerprint | None:
+    try:
+        st = os.stat(path, follow_symlinks=False)
+    except OSError:
+        return None
+    return (st.st_size, st.st_mtime_ns, st.st_ino)
+
+
+def _fingerprint_chunk(paths: Sequence[str | Path]) -> list[Fingerprint | None]:
+    return [_fingerprint(p) for p in paths]
+
+
+def collect_fingerprints(
+    paths: Sequence[str | Path],
+    *,
+    workers: int = _VERIFY_WORKERS,
+) -> list[Fingerprint | None]:
+    if len(paths) <= _VERIFY_CHUNK or workers <= 1:
+        return _fingerprint_chunk(paths)
+
+    chunks = [paths[i:i + _VERIFY_CHUNK] for i in range(0, len(paths), _VERIFY_CHUNK)]
+    result: list[Fingerprint | None] = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for part in pool.map(_fingerprint_chunk, chunks):
+            result.extend(part)
+    return result
+
+
+def save_plan(
+    path: Path,
+    actions: Sequence[MoveAction] | CompactPlan,
+    *,
+    fingerprints: Sequence[Fingerprint | None] | None = None,
+    meta: dict | None = None,
+) -> int:
+    plan = actions if isinstance(actions, CompactPlan) else CompactPlan.from_actions(actions)
+    if fingerprints is None:
+        fingerprints = collect_fingerprints(plan.src_strings())
+
+    sizes = array("q")
+    mtimes = array("q")
+    inodes = array("Q")
+    for fp in fingerprints:
+        size, mtime_ns, ino = fp if fp is not None else (-1, -1, 0)
+        sizes.append(size)
+        mtimes.append(mtime_ns)
+        inodes.append(ino)
+
+    columns = [
+        plan.src_dir_ids,
+        plan.dst_dir_ids,
+        plan.rule_ids,
+        plan.strategy_ids,
+        plan.spec_ids,
+        plan.name_ends,
+        sizes,
+        mtimes,
+        inodes,
+    ]
+    header = {
+        "version": PLAN_VERSION,
+        "count": len(plan),
+        "dirs": plan.dirs,
+        "rules": plan.rule_names,
+        "strategies": plan.strategies,
+        "specs": [asdict(spec) for spec in plan.specs],
+        "dst_names": {str(i): n for i, n in plan.dst_name_overrides.items()},
+        "columns": [[c.typecode, len(c)] for c in columns],
+        "names": len(plan.names),
+        "meta": meta or {},
+    }
+    header_raw = json.dumps(header, ensure_ascii=False).encode("utf-8")
+
+    body = [_HEADER_LEN.pack(len(header_raw)), header_raw]
+    body.extend(c.tobytes() for c in columns)
+    body.append(bytes(plan.names))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb") as f:
+        f.write(PLAN_MAGIC)
+        f.write(zlib.compress(b"".join(body), 6))
+    tmp.replace(path)
+
+    return len(plan)
+
+
+def load_plan(path: Path) -> StoredPlan:
+    raw = path.read_bytes()
+    if not raw.startswith(PLAN_MAGIC):
+        raise ValueError(f"Not a plan file: {path}")
+
+    body = memoryview(zlib.decompress(raw[len(PLAN_MAGIC):]))
+    (header_len,) = _HEADER_LEN.unpack_from(body, 0)
+    pos = _HEADER_LEN.size
+    header = json.loads(bytes(body[pos:pos + header_len]).decode("utf-8"))
+    pos += header_len
+
+    if header.get("version") != PLAN_VERSION:
+        raise ValueError(f"Unsupported plan file version: {header.get('version')}")
+
+    columns: list[array] = []
+    for typecode, length in header["columns"]:
+        col = array(typecode)
+        nbytes = col.itemsize * length
+        col.frombytes(body[pos:pos + nbytes])
+        pos += nbytes
+        columns.append(col)
+    names = bytearray(body[pos:pos + header["names"]])
+
+    src_dir_ids, dst_dir_ids, rule_ids, strategy_ids, spec_ids, name_ends, sizes, mtimes, inodes = columns
+    plan = CompactPlan.from_columns(
+        dirs=header["dirs"],
+        rule_names=header["rules"],
+        strategies=header["strategies"],
+        specs=[ActionSpec(**spec) for spec in header["specs"]],
+        src_dir_ids=src_dir_ids,
+        dst_dir_ids=dst_dir_ids,
+        rule_ids=rule_ids,
+        strategy_ids=strategy_ids,
+        spec_ids=spec_ids,
+        name_ends=name_ends,
+        names=names,
+        dst_name_overrides={int(i): n for i, n in header["dst_names"].items()},
+    )
+
+    return StoredPlan(actions=plan, sizes=sizes, mtimes=mtimes, inodes=inodes, meta=header.get("meta", {}))
+
+
+def verify_plan(stored: StoredPlan) -> tuple[CompactPlan, CompactPlan]:
+    current = collect_fingerprints(stored.actions.src_strings())
+
+    valid: list[int] = []
+    stale: list[int] = []
+    for i, actual in enumerate(current):
+        expected = stored.fingerprint(i)
+        if expected is not None and expected == actual:
+            valid.append(i)
+        else:
+            stale.append(i)
+    return stored.actions.subset(valid), stored.actions.subset(stale)
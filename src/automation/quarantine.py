@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+import errno
+import hashlib
+import logging
+import os
+from pathlib import Path
+import shutil
+
+from src.automation.fs_backend import OS_FILESYSTEM, FileSystem
+
+_DAY_FORMAT = "%Y%m%d"
+
+# The default quarantine. Relative roots live under the source directory of the file being moved, which is
+# almost always the device its destination is on, so a stash is a rename rather than a full copy.
+SOURCE_QUARANTINE = Path(".quarantine")
+
+
+def quarantine_root(root: Path, source_dir: Path) -> Path:
+    return root if root.is_absolute() else source_dir / root
+
+
+def on_other_device(root: Path, source_dir: Path) -> bool:
+    # The quarantine may not exist yet; its nearest existing ancestor is where it will be created.
+    existing = root
+    while not existing.exists() and existing != existing.parent:
+        existing = existing.parent
+    try:
+        return os.stat(existing).st_dev != os.stat(source_dir).st_dev
+    except OSError:
+        return False
+
+
+def quarantine_key(st: os.stat_result) -> str:
+    # Device, inode, size and mtime identify one version of a file's contents without reading them.
+    raw = f"{st.st_dev}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns}".encode("ascii")
+    return hashlib.sha1(raw).hexdigest()
+
+
+class Quarantine:
+    def __init__(self, root: Path, *, fs: FileSystem = OS_FILESYSTEM) -> None:
+        self.root = root
+        self.fs = fs
+
+    def stash(self, path: Path, *, today: date | None = None) -> Path:
+        fs = self.fs
+        st = fs.stat(path)
+        day_dir = self.root / (today or date.today()).strftime(_DAY_FORMAT)
+        target = day_dir / f"{quarantine_key(st)}{path.suffix}"
+        fs.mkdir(day_dir)
+
+        if fs.exists(target):
+            # Same inode and version already stashed today: the target is another link to it.
+            fs.unlink(path)
+            return target
+
+        try:
+            fs.rename(path, target)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            logging.warning("action=quarantine_copy src=%s quarantine=%s reason=cross_device", path, target)
+            fs.copy(path, target)
+            fs.unlink(path)
+        return target
+
+    @staticmethod
+    def restore(quarantined: Path, dst: Path, *, fs: FileSystem = OS_FILESYSTEM) -> None:
+        if fs.exists(dst) or fs.is_symlink(dst):
+            raise FileExistsError(f"Cannot restore quarantined file over an existing path: {dst}")
+        fs.mkdir(dst.parent)
+        fs.move(quarantined, dst)
+
+    def _day_dirs(self) -> list[tuple[date, Path]]:
+        if not self.root.is_dir():
+            return []
+        days: list[tuple[date, Path]] = []
+        with os.scandir(self.root) as it:
+            for e in it:
+                if not e.is_dir(follow_symlinks=False):
+                    continue
+                try:
+                    day = datetime.strptime(e.name, _DAY_FORMAT).date()
+                except ValueError:
+                    continue
+                days.append((day, Path(e.path)))
+        days.sort()
+        return days
+
+    def collect_garbage(
+        self,
+        *,
+        max_bytes: int | None = None,
+        max_age_days: int | None = None,
+        today: date | None = None,
+    ) -> tuple[int, int]:
+        removed = 0
+        freed = 0
+        cutoff = None if max_age_days is None else (today or date.today()) - timedelta(days=max_age_days)
+
+        entries: list[tuple[Path, int]] = []
+        for day, day_dir in self._day_dirs():
+            files = []
+            with os.scandir(day_dir) as it:
+                for e in it:
+                    if e.is_file(follow_symlinks=False):
+                        files.append((Path(e.path), e.stat(follow_symlinks=False).st_size))
+
+            if cutoff is not None and day < cutoff:
+                removed += len(files)
+                freed += sum(size for _, size in files)
+                shutil.rmtree(day_dir, ignore_errors=True)
+                continue
+            entries.extend(sorted(files))
+
+        if max_bytes is not None:
+            total = sum(size for _, size in entries)
+            for path, size in entries:
+                if total <= max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+                removed += 1
+                freed += size
+
+            for _day, day_dir in self._day_dirs():
+                try:
+                    day_dir.rmdir()
+                except OSError:
+                    pass
+
+        if removed:
+            logging.info("action=quarantine_gc root=%s removed=%s bytes=%s", self.root, removed, freed)
+        return removed, freed
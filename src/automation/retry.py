@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass
+import errno
+import heapq
+import itertools
+import logging
+import time
+from typing import Callable
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    attempts: int
+    base_delay: float
+    max_delay: float = 30.0
+    multiplier: float = 2.0
+
+    def delay(self, attempt: int) -> float:
+        return min(self.max_delay, self.base_delay * self.multiplier ** attempt)
+
+
+# Errors that usually clear up on their own: a file held open by a scanner or sync client, an NFS handle
+# invalidated by a server-side rename, a lock released a moment later.
+DEFAULT_RETRY_POLICIES: dict[int, RetryPolicy] = {
+    errno.EBUSY: RetryPolicy(attempts=5, base_delay=0.5),
+    errno.ETXTBSY: RetryPolicy(attempts=5, base_delay=0.5),
+    errno.EAGAIN: RetryPolicy(attempts=5, base_delay=0.2),
+    errno.EACCES: RetryPolicy(attempts=3, base_delay=1.0),
+    errno.EPERM: RetryPolicy(attempts=3, base_delay=1.0),
+    errno.ESTALE: RetryPolicy(attempts=4, base_delay=0.2),
+    errno.EIO: RetryPolicy(attempts=2, base_delay=1.0),
+}
+
+# Every remaining file would fail the same way, so these still abort the run.
+FATAL_ERRNOS = frozenset({errno.ENOSPC, errno.EROFS, errno.EDQUOT})
+
+
+def errno_name(code: int | None) -> str:
+    return errno.errorcode.get(code, str(code)) if code is not None else "UNKNOWN"
+
+
+@dataclass(frozen=True)
+class RetryEntry:
+    item: object
+    attempt: int
+    error: str
+
+
+class Retrier:
+    def __init__(
+        self,
+        policies: dict[int, RetryPolicy] | None = None,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.policies = DEFAULT_RETRY_POLICIES if policies is None else policies
+        self.clock = clock
+        self.sleep = sleep
+        self._queue: list[tuple[float, int, RetryEntry]] = []
+        self._seq = itertools.count()
+        self.retries: Counter[str] = Counter()
+        self.recovered: Counter[str] = Counter()
+        self.failures: Counter[str] = Counter()
+        self.examples: dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    @property
+    def failed_count(self) -> int:
+        return sum(self.failures.values())
+
+    def failed(self, item: object, error: OSError, previous: RetryEntry | None = None) -> bool:
+        # Returns True when the item was queued for another attempt rather than given up on.
+        if error.errno in FATAL_ERRNOS:
+            raise error
+        attempt = 0 if previous is None else previous.attempt + 1
+        name = errno_name(error.errno)
+        policy = self.policies.get(error.errno)
+        if policy is not None and attempt + 1 < policy.attempts:
+            self.retries[name] += 1
+            ready = self.clock() + policy.delay(attempt)
+            heapq.heappush(self._queue, (ready, next(self._seq), RetryEntry(item, attempt, name)))
+            return True
+
+        self.failures[name] += 1
+        self.examples.setdefault(name, str(error))
+        logging.warning("action=move_failed errno=%s attempts=%s error=%s", name, attempt + 1, error)
+        return False
+
+    def succeeded(self, entry: RetryEntry) -> None:
+        self.recovered[entry.error] += 1
+
+    def due(self) -> list[RetryEntry]:
+        now = self.clock()
+        ready = []
+        while self._queue and self._queue[0][0] <= now:
+            ready.append(heapq.heappop(self._queue)[2])
+        return ready
+
+    def wait(self) -> list[RetryEntry]:
+        # Only called once every healthy file has been handled.
+        if not self._queue:
+            return []
+        delay = self._queue[0][0] - self.clock()
+        if delay > 0:
+            self.sleep(delay)
+        return self.due()
+
+    def drain(self) -> list[RetryEntry]:
+        # Everything still backing off, for a caller that has run out of time to wait for it.
+        entries = [entry for _ready, _seq, entry in sorted(self._queue)]
+        self._queue.clear()
+        return entries
+
+    def log_summary(self) -> None:
+        for name in sorted(set(self.retries) | set(self.failures)):
+            logging.info(
+                "action=failure_summary errno=%s retries=%s recovered=%s failed=%s example=%s",
+                name,
+                self.retries[name],
+                self.recovered[name],
+                self.failures[name],
+                self.examples.get(name, ""),
+            )
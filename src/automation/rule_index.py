@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+from heapq import merge
+import os
+import re
+from typing import Iterator
+
+from src.config.config_loader import Rule
+
+_GLOB_WILDCARDS = "*?[]"
+_REGEX_QUANTIFIER = re.compile(r"\{\d*(,\d*)?\}")
+
+
+def path_suffix(name: str) -> str:
+    # Same result as PurePath(name).suffix without building a Path.
+    i = name.rfind(".")
+    if 0 < i < len(name) - 1:
+        return name[i:]
+    return ""
+
+
+def glob_literals(pattern: str) -> tuple[str, str]:
+    pattern = os.path.normcase(pattern)
+    first = min((i for i in (pattern.find(c) for c in _GLOB_WILDCARDS) if i >= 0), default=-1)
+    if first < 0:
+        return pattern, pattern
+
+    last = max(pattern.rfind(c) for c in _GLOB_WILDCARDS)
+    return pattern[:first], pattern[last + 1:]
+
+
+def regex_literals(regex: str) -> tuple[str, str]:
+    # Conservative: anything we do not fully understand yields no literal, which keeps the rule
+    # in the always-evaluated bucket instead of risking a missed match.
+    if "|" in regex or "(?" in regex:
+        return "", ""
+
+    tokens: list[str | None] = []
+    anchored_end = False
+    i = 0
+    n = len(regex)
+    while i < n:
+        c = regex[i]
+        if c == "\\":
+            if i + 1 >= n:
+                return "", ""
+            nxt = regex[i + 1]
+            if nxt == "Z" and i + 2 == n:
+                anchored_end = True
+            elif nxt.isalnum():
+                tokens.append(None)
+            else:
+                tokens.append(nxt)
+            i += 2
+            continue
+
+        if c == "[":
+            j = i + 1
+            if j < n and regex[j] == "^":
+                j += 1
+            if j < n and regex[j] == "]":
+                j += 1
+            while j < n and regex[j] != "]":
+                if regex[j] == "\\":
+                    j += 1
+                j += 1
+            tokens.append(None)
+            i = j + 1
+            continue
+
+        if c in "*+?":
+            if tokens:
+                tokens[-1] = None
+            tokens.append(None)
+            i += 1
+            continue
+
+        if c == "{":
+            m = _REGEX_QUANTIFIER.match(regex, i)
+            if m is not None:
+                if tokens:
+                    tokens[-1] = None
+                tokens.append(None)
+                i = m.end()
+                continue
+            tokens.append(c)
+            i += 1
+            continue
+
+        if c == "^" and i == 0:
+            i += 1
+            continue
+
+        if c == "$" and i == n - 1:
+            anchored_end = True
+            i += 1
+            continue
+
+        tokens.append(None if c in ".^$()}" else c)
+        i += 1
+
+    prefix: list[str] = []
+    for t in tokens:
+        if t is None:
+            break
+        prefix.append(t)
+
+    suffix: list[str] = []
+    if anchored_end:
+        for t in reversed(tokens):
+            if t is None:
+                break
+            suffix.append(t)
+        suffix.reverse()
+
+    return "".join(prefix), "".join(suffix)
+
+
+def rule_literals(rule: Rule) -> tuple[str, str]:
+    if rule.regex:
+        return regex_literals(rule.regex)
+    if rule.pattern:
+        return glob_literals(rule.pattern)
+    return "", ""
+
+
+class RuleIndex:
+    def __init__(self, rules: list[Rule]) -> None:
+        self._always: list[int] = []
+        self._by_ext: dict[str, list[int]] = {}
+        self._by_prefix: dict[int, dict[str, list[int]]] = {}
+        self._by_suffix: dict[int, dict[str, list[int]]] = {}
+
+        for pos, rule in enumerate(rules):
+            if not rule.regex and not rule.pattern:
+                for ext in {e.lower() for e in rule.extensions}:
+                    self._by_ext.setdefault(ext, []).append(pos)
+                continue
+
+            prefix, suffix = rule_literals(rule)
+            if not prefix and not suffix:
+                self._always.append(pos)
+            elif len(prefix) >= len(suffix):
+                self._by_prefix.setdefault(len(prefix), {}).setdefault(prefix, []).append(pos)
+            else:
+                self._by_suffix.setdefault(len(suffix), {}).setdefault(suffix, []).append(pos)
+
+        self._prefix_lengths = sorted(self._by_prefix)
+        self._suffix_lengths = sorted(self._by_suffix)
+
+    def candidates(self, name: str) -> Iterator[int]:
+        buckets: list[list[int]] = []
+        if self._always:
+            buckets.append(self._always)
+
+        bucket = self._by_ext.get(path_suffix(name).lower())
+        if bucket is not None:
+            buckets.append(bucket)
+
+        # Candidates only need to be a superset of the real matches, so probing a few extra
+        # spellings (case-folded for globs, and without the trailing newline `$` tolerates) is safe.
+        probes = {name, os.path.normcase(name)}
+        if name.endswith("\n"):
+            probes.add(name[:-1])
+
+        for probe in probes:
+            size = len(probe)
+            for length in self._prefix_lengths:
+                if length > size:
+                    break
+                bucket = self._by_prefix[length].get(probe[:length])
+                if bucket is not None:
+                    buckets.append(bucket)
+            for length in self._suffix_lengths:
+                if length > size:
+                    break
+                bucket = self._by_suffix[length].get(probe[size - length:])
+                if bucket is not None:
+                    buckets.append(bucket)
+
+        if len(buckets) == 1:
+            return iter(buckets[0])
+        return merge(*buckets)
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+import hashlib
+import heapq
+from itertools import groupby
+import json
+import os
+from pathlib import Path
+
+from src.automation.rule_index import rule_literals
+from src.config.config_loader import Rule
+
+# A rule with no timing samples yet is assumed to cost this much per evaluation.
+_DEFAULT_COST_NS = 1000.0
+# Counts are halved past this many evaluations so the order follows recent inboxes.
+_DECAY_AT = 1_000_000
+# Proving disjointness is pairwise, so very large tiers keep their config order.
+_MAX_ADAPTIVE_TIER = 1000
+
+
+@dataclass
+class RuleStat:
+    matcher: str
+    evaluations: int = 0
+    hits: int = 0
+    sampled_ns: int = 0
+    samples: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.evaluations if self.evaluations else 0.0
+
+    @property
+    def cost_ns(self) -> float:
+        return self.sampled_ns / self.samples if self.samples else _DEFAULT_COST_NS
+
+    @property
+    def score(self) -> float:
+        # Evaluating in order of hit probability per unit cost minimises the expected cost of
+        # finding the first match among independent candidates.
+        return self.hit_rate / max(self.cost_ns, 1.0)
+
+
+def matcher_signature(rule: Rule) -> str:
+    raw = json.dumps(
+        [sorted(e.lower() for e in rule.extensions), rule.pattern, rule.regex, rule.priority],
+        sort_keys=True,
+    )
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+class RuleStats:
+    def __init__(self, path: Path | None = None) -> None:
+        self.path = path
+        self._stats: dict[str, RuleStat] = {}
+        if path is not None and path.exists():
+            try:
+                raw = json.loads(path.read_text(encoding="utf-8"))
+                # Files from before stats were keyed by matcher hold name keys, which could mix up rules.
+                self._stats = {key: RuleStat(**values) for key, values in raw.items() if key == values["matcher"]}
+            except (KeyError, OSError, TypeError, ValueError):
+                self._stats = {}
+
+    def get(self, rule: Rule) -> RuleStat:
+        # Keyed by matchers and priority rather than name: unnamed rules are named after their destination, so
+        # names repeat, and stats only carry over while the matchers are unchanged.
+        signature = matcher_signature(rule)
+        stat = self._stats.get(signature)
+        if stat is None:
+            stat = RuleStat(matcher=signature)
+            self._stats[signature] = stat
+        return stat
+
+    def absorb(self, ruleset) -> None:
+        for pos, rule in enumerate(ruleset.rules):
+            stat = self.get(rule)
+            stat.evaluations += ruleset.evaluations[pos]
+            stat.hits += ruleset.hits[pos]
+            stat.sampled_ns += ruleset.sampled_ns[pos]
+            stat.samples += ruleset.samples[pos]
+            if stat.evaluations > _DECAY_AT:
+                stat.evaluations //= 2
+                stat.hits //= 2
+                stat.sampled_ns //= 2
+                stat.samples //= 2
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(
+            json.dumps({key: asdict(s) for key, s in self._stats.items()}, sort_keys=True),
+            encoding="utf-8",
+        )
+        tmp.replace(self.path)
+
+
+def _ext_only(rule: Rule) -> bool:
+    return not rule.regex and not rule.pattern
+
+
+def _literal_ends(rule: Rule) -> list[str]:
+    # Every name the rule matches ends with one of these strings (compared as the glob matcher
+    # sees names); `$` in a regex also accepts one trailing newline. "" means nothing is known.
+    _prefix, suffix = rule_literals(rule)
+    if not suffix:
+        return [""]
+    suffix = os.path.normcase(suffix)
+    return [suffix, suffix + "\n"] if rule.regex else [suffix]
+
+
+def _literal_starts(rule: Rule) -> str:
+    prefix, _suffix = rule_literals(rule)
+    return os.path.normcase(prefix)
+
+
+def _compatible(a: str, b: str, *, at_end: bool) -> bool:
+    if not a or not b:
+        return True
+    return a.endswith(b) or b.endswith(a) if at_end else a.startswith(b) or b.startswith(a)
+
+
+def _suffix_extensions(end: str) -> set[str] | None:
+    # The extensions a name ending in `end` can have, when `end` pins them down.
+    i = end.rfind(".")
+    if i < 0:
+        return None
+    if i == len(end) - 1:
+        return {""}
+    # A leading dot may start the whole name, which path_suffix treats as having no extension.
+    return {end[i:].lower(), ""} if i == 0 else {end[i:].lower()}
+
+
+def rules_disjoint(a: Rule, b: Rule) -> bool:
+    if _ext_only(a) and _ext_only(b):
+        return not ({e.lower() for e in a.extensions} & {e.lower() for e in b.extensions})
+
+    if _ext_only(a) or _ext_only(b):
+        ext_rule, other = (a, b) if _ext_only(a) else (b, a)
+        exts = {e.lower() for e in ext_rule.extensions}
+        for end in _literal_ends(other):
+            possible = _suffix_extensions(end)
+            if possible is None or possible & exts:
+                return False
+        return True
+
+    if not _compatible(_literal_starts(a), _literal_starts(b), at_end=False):
+        return True
+    return all(
+        not _compatible(x, y, at_end=True) for x in _literal_ends(a) for y in _literal_ends(b)
+    )
+
+
+def adaptive_order(rules: list[Rule], stats: RuleStats) -> list[Rule]:
+    # `rules` is already in priority order. Within each tier a rule may only move ahead of another
+    # when the two can never match the same name, so the first match, and thus the winner, is
+    # unchanged for every filename.
+    ordered: list[Rule] = []
+    for _priority, tier_iter in groupby(rules, key=lambda r: r.priority):
+        tier = list(tier_iter)
+        if len(tier) > _MAX_ADAPTIVE_TIER:
+            ordered.extend(tier)
+            continue
+        blockers = [
+            {i for i in range(j) if not rules_disjoint(tier[i], tier[j])} for j in range(len(tier))
+        ]
+        waiting = [len(b) for b in blockers]
+        heap = [(-stats.get(tier[j]).score, j) for j in range(len(tier)) if not waiting[j]]
+        heapq.heapify(heap)
+        while heap:
+            _score, i = heapq.heappop(heap)
+            ordered.append(tier[i])
+            for j in range(i + 1, len(tier)):
+                if i in blockers[j]:
+                    waiting[j] -= 1
+                    if not waiting[j]:
+                        heapq.heappush(heap, (-stats.get(tier[j]).score, j))
+    return ordered
+
+
+@dataclass(frozen=True)
+class RuleOrderEntry:
+    rule: Rule
+    config_position: int
+    stat: RuleStat
+
+
+def explain_order(rules: list[Rule], stats: RuleStats) -> list[RuleOrderEntry]:
+    config_positions = {id(r): i for i, r in enumerate(rules)}
+    return [
+        RuleOrderEntry(rule=r, config_position=config_positions[id(r)], stat=stats.get(r))
+        for r in adaptive_order(rules, stats)
+    ]
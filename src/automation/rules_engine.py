@@ -1,9 +1,14 @@
 from __future__ import annotations
 
 import fnmatch
+import os
 import re
 from pathlib import Path
+import time
+from typing import Callable
 
+from src.automation.dest_template import static_prefix
+from src.automation.rule_index import RuleIndex, path_suffix
 from src.config.config_loader import Config, Rule
 
 
@@ -25,11 +30,86 @@ def rule_matches_file(rule: Rule, file_path: Path) -> bool:
     return ext in rule_exts
 
 
+def compile_matcher(rule: Rule) -> Callable[[str], bool]:
+    if rule.regex:
+        regex_match = re.compile(rule.regex).match
+        return lambda name: regex_match(name) is not None
+
+    if rule.pattern:
+        glob_match = re.compile(fnmatch.translate(os.path.normcase(rule.pattern))).match
+        return lambda name: glob_match(os.path.normcase(name)) is not None
+
+    rule_exts = frozenset(e.lower() for e in rule.extensions)
+    return lambda name: path_suffix(name).lower() in rule_exts
+
+
+# Tracked rule sets time one evaluation in this many per rule.
+_SAMPLE_MASK = 15
+
+
+class CompiledRuleSet:
+    def __init__(self, cfg: Config, *, order: list[Rule] | None = None, track: bool = False) -> None:
+        self.rules = sorted_rules(cfg) if order is None else order
+        self._matchers = [compile_matcher(r) for r in self.rules]
+        self._index = RuleIndex(self.rules)
+        self.track = track
+        self.evaluations = [0] * len(self.rules)
+        self.hits = [0] * len(self.rules)
+        self.sampled_ns = [0] * len(self.rules)
+        self.samples = [0] * len(self.rules)
+
+    def select_position(self, name: str) -> int:
+        if self.track:
+            return self._select_tracked(name)
+
+        matchers = self._matchers
+        for pos in self._index.candidates(name):
+            if matchers[pos](name):
+                return pos
+        return -1
+
+    def _select_tracked(self, name: str) -> int:
+        matchers = self._matchers
+        evaluations = self.evaluations
+        for pos in self._index.candidates(name):
+            evaluations[pos] += 1
+            if evaluations[pos] & _SAMPLE_MASK:
+                matched = matchers[pos](name)
+            else:
+                start = time.perf_counter_ns()
+                matched = matchers[pos](name)
+                self.sampled_ns[pos] += time.perf_counter_ns() - start
+                self.samples[pos] += 1
+            if matched:
+                self.hits[pos] += 1
+                return pos
+        return -1
+
+    def select(self, name: str) -> Rule | None:
+        pos = self.select_position(name)
+        return None if pos < 0 else self.rules[pos]
+
+
+_COMPILED_CACHE_SIZE = 16
+_compiled_cache: list[tuple[Config, CompiledRuleSet]] = []
+
+
+def compile_rules(cfg: Config) -> CompiledRuleSet:
+    # Identity-keyed, most recent first; long-lived processes juggle a handful of configs.
+    for i, (cached_cfg, compiled) in enumerate(_compiled_cache):
+        if cached_cfg is cfg:
+            if i:
+                _compiled_cache.insert(0, _compiled_cache.pop(i))
+            return compiled
+
+    compiled = CompiledRuleSet(cfg)
+    _compiled_cache.insert(0, (cfg, compiled))
+    del _compiled_cache[_COMPILED_CACHE_SIZE:]
+    return compiled
+
+
 def select_rule(file_path: Path, cfg: Config) -> Rule | None:
-    for rule in sorted_rules(cfg):
-        if rule_matches_file(rule, file_path):
-            return rule
-    return None
+    return compile_rules(cfg).select(file_path.name)
 
 
 def resolve_destination_folder(rule: Rule | None, cfg: Config) -> tuple[str, str]:
@@ -45,3 +125,13 @@ def resolve_destination_folder(rule: Rule | None, cfg: Config) -> tuple[str, str
         folder_name = dest_key or cfg.destinations.get("other", "Other")
 
     return folder_name, rule_name
+
+
+def protected_destination_dirs(cfg: Config) -> set[Path]:
+    # Templated destinations are protected up to their last fixed component.
+    protected: set[Path] = set()
+    for folder in cfg.destinations.values():
+        prefix = static_prefix(folder)
+        if prefix:
+            protected.add(cfg.source_dir / prefix)
+    return protected
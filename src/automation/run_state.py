@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import json
+import os
+from pathlib import Path
+
+
+@dataclass(frozen=True)
+class DirFingerprint:
+    mtime_ns: int
+    ctime_ns: int
+    entries: int
+
+
+def fingerprint_dir(path: Path) -> DirFingerprint | None:
+    try:
+        st = os.stat(path)
+        # Counting names needs only getdents, no per-entry stat; it guards against coarse mtimes.
+        with os.scandir(path) as it:
+            entries = sum(1 for _ in it)
+    except OSError:
+        return None
+    return DirFingerprint(mtime_ns=st.st_mtime_ns, ctime_ns=st.st_ctime_ns, entries=entries)
+
+
+def fingerprint_file(path: Path) -> list[int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+class RunState:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._entries: dict[str, dict] = {}
+        if path.exists():
+            try:
+                self._entries = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, json.JSONDecodeError):
+                self._entries = {}
+
+    @staticmethod
+    def _key(config_path: Path) -> str:
+        return str(config_path.resolve())
+
+    def is_unchanged(self, config_path: Path) -> bool:
+        entry = self._entries.get(self._key(config_path))
+        if entry is None:
+            return False
+        if entry.get("config") != fingerprint_file(config_path):
+            return False
+
+        current = fingerprint_dir(Path(entry["source_dir"]))
+        return current is not None and [current.mtime_ns, current.ctime_ns, current.entries] == entry.get("dir")
+
+    @staticmethod
+    def snapshot(config_path: Path, source_dir: Path) -> dict | None:
+        current = fingerprint_dir(source_dir)
+        if current is None:
+            return None
+        return {
+            "config": fingerprint_file(config_path),
+            "source_dir": str(source_dir),
+            "dir": [current.mtime_ns, current.ctime_ns, current.entries],
+        }
+
+    def record(self, config_path: Path, snapshot: dict | None) -> None:
+        # Stores the fingerprint taken before the scan: files that arrived mid-run leave the directory
+        # different from it, so the next run still looks.
+        key = self._key(config_path)
+        if snapshot is None:
+            self._entries.pop(key, None)
+        else:
+            self._entries[key] = snapshot
+        self.save()
+
+    def forget(self, config_path: Path) -> None:
+        if self._entries.pop(self._key(config_path), None) is not None:
+            self.save()
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(self._entries, sort_keys=True), encoding="utf-8")
+        tmp.replace(self.path)
@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import logging
+from pathlib import Path
+import socket
+import time
+from typing import Callable
+
+from src.automation.cluster import DEFAULT_LEASE_SECONDS, ClusterNode
+from src.automation.compact_plan import CompactPlan
+from src.automation.file_sorter import execute_moves, plan_moves_compact, resume_moves
+from src.automation.ignore_rules import ignore_rules_for
+from src.automation.intent_journal import IntentJournal
+from src.automation.plan_store import load_plan, save_plan
+from src.automation.quarantine import Quarantine, on_other_device, quarantine_root
+from src.automation.retry import Retrier
+from src.automation.rule_stats import RuleStats
+from src.automation.rules_engine import protected_destination_dirs
+from src.automation.run_state import RunState, fingerprint_file
+from src.automation.settle_tracker import SettleTracker
+from src.automation.throttle import IOThrottle
+from src.config.config_loader import Config, load_config
+from src.utils.file_helpers import delete_empty_dirs
+
+
+@dataclass(frozen=True)
+class RunOptions:
+    dry_run: bool = False
+    ledger_path: Path | None = Path("logs/move_ledger.jsonl")
+    catalog_path: Path | None = Path("logs/history.sqlite3")
+    journal_path: Path | None = Path("logs/intent_journal.jsonl")
+    state_path: Path | None = None
+    delete_empty_dirs: bool = False
+    plan_processes: int = 0
+    max_bytes_per_sec: int | None = None
+    max_ops_per_sec: float | None = None
+    quarantine_path: Path | None = None
+    quarantine_max_bytes: int | None = None
+    quarantine_max_age_days: int | None = None
+    rule_stats_path: Path | None = None
+    settle_state_path: Path | None = None
+    cluster_dir: Path | None = None
+    cluster_node: str | None = None
+    cluster_lease_seconds: float = DEFAULT_LEASE_SECONDS
+    max_seconds: float | None = None
+    max_files: int | None = None
+    cursor_path: Path | None = None
+    durability: str = "none"
+
+
+@dataclass(frozen=True)
+class RunResult:
+    skipped: bool
+    planned: int = 0
+    deferred: int = 0
+    remaining: int = 0
+    failed: int = 0
+
+
+_config_cache: dict[str, tuple[list[int] | None, Config]] = {}
+
+
+def load_config_cached(config_path: Path) -> Config:
+    # Long-lived processes (scheduler, service) reuse the parsed config, and with it the compiled
+    # rule set, until the file changes on disk.
+    key = str(config_path.resolve())
+    stamp = fingerprint_file(config_path)
+    cached = _config_cache.get(key)
+    if cached is not None and stamp is not None and cached[0] == stamp:
+        return cached[1]
+
+    cfg = load_config(config_path)
+    _config_cache[key] = (stamp, cfg)
+    return cfg
+
+
+def cluster_node(options: RunOptions) -> ClusterNode | None:
+    if options.cluster_dir is None:
+        return None
+    node = ClusterNode(
+        options.cluster_dir,
+        options.cluster_node or socket.gethostname(),
+        lease_seconds=options.cluster_lease_seconds,
+    )
+    if not options.dry_run:
+        node.heartbeat()
+    return node
+
+
+def _past(deadline: float) -> Callable[[], bool]:
+    return lambda: time.monotonic() >= deadline
+
+
+def _load_cursor(cursor_path: Path, config_path: Path) -> CompactPlan | None:
+    try:
+        stored = load_plan(cursor_path)
+    except (OSError, ValueError) as e:
+        logging.warning("action=discard_cursor cursor=%s reason=%s", cursor_path, e)
+        return None
+    # A cursor only stands in for planning while the config that produced it is unchanged.
+    meta = stored.meta
+    if meta.get("config") != str(config_path.resolve()) or meta.get("stamp") != fingerprint_file(config_path):
+        logging.info("action=discard_cursor cursor=%s reason=config_changed", cursor_path)
+        return None
+    return stored.actions
+
+
+def _save_cursor(cursor_path: Path, remaining: CompactPlan, config_path: Path) -> None:
+    # Sources are re-checked when the cursor is executed, so skip fingerprinting millions of files here.
+    save_plan(
+        cursor_path,
+        remaining,
+        fingerprints=[None] * len(remaining),
+        meta={"config": str(config_path.resolve()), "stamp": fingerprint_file(config_path)},
+    )
+
+
+def run_config(
+    config_path: Path,
+    options: RunOptions,
+    *,
+    state: RunState | None = None,
+    planner: Callable[[Config], CompactPlan] | None = None,
+) -> RunResult:
+    started = time.monotonic()
+    throttle = IOThrottle(bytes_per_sec=options.max_bytes_per_sec, ops_per_sec=options.max_ops_per_sec)
+
+    node = cluster_node(options)
+
+    # Unattended runs finish an interrupted batch themselves rather than waiting for --resume.
+    if not options.dry_run and options.journal_path is not None and IntentJournal.exists(options.journal_path):
+        resume_moves(
+            options.journal_path,
+            ledger_path=options.ledger_path,
+            catalog_path=options.catalog_path,
+            throttle=throttle,
+            quarantine_path=options.quarantine_path,
+            claims=node,
+            durability=options.durability,
+        )
+
+    if state is None and options.state_path is not None and not options.dry_run:
+        state = RunState(options.state_path)
+    if state is not None and node is not None:
+        # A node fingerprints the whole inbox but moves only its shard, so an "unchanged" inbox can still
+        # hold files a dead peer never moved; those have to be taken over on the next run.
+        logging.warning("action=skip_unchanged_disabled reason=cluster_mode")
+        state = None
+
+    budgeted = options.max_seconds is not None or options.max_files is not None
+    cursor_path = None if options.dry_run else options.cursor_path
+    cursor = None
+    if cursor_path is not None and cursor_path.exists():
+        cursor = _load_cursor(cursor_path, config_path) if budgeted else None
+        if cursor is None:
+            cursor_path.unlink(missing_ok=True)
+
+    if state is not None and cursor is None and state.is_unchanged(config_path):
+        logging.info("action=skip_unchanged config=%s", config_path)
+        return RunResult(skipped=True)
+
+    cfg = load_config_cached(config_path)
+    quarantine = None
+    if options.quarantine_path is not None and not options.dry_run:
+        quarantine = quarantine_root(options.quarantine_path, cfg.source_dir)
+        if on_other_device(quarantine, cfg.source_dir):
+            logging.warning(
+                "action=quarantine_cross_device quarantine=%s source_dir=%s reason=every_stash_is_a_copy",
+                quarantine,
+                cfg.source_dir,
+            )
+    # A cursor was planned by an earlier run, so files that arrived since are not in it; recording nothing
+    # makes the next run scan again.
+    snapshot = None if state is None or cursor is not None else state.snapshot(config_path, cfg.source_dir)
+    settle = SettleTracker(options.settle_state_path)
+    if cursor is not None:
+        # The cursor is the unfinished tail of an earlier budgeted run, already sharded for this node.
+        actions = cursor
+        logging.info("action=resume_cursor cursor=%s remaining=%s", cursor_path, len(actions))
+    elif planner is not None:
+        actions = planner(cfg)
+    else:
+        rule_stats = None if options.rule_stats_path is None else RuleStats(options.rule_stats_path)
+        actions = plan_moves_compact(cfg, processes=options.plan_processes, rule_stats=rule_stats, settle=settle)
+        if rule_stats is not None:
+            rule_stats.save()
+        if cfg.settle_seconds > 0 and not options.dry_run:
+            settle.save()
+    if node is not None and cursor is None:
+        actions = node.shard(actions)
+
+    stop = None if options.max_seconds is None else _past(started + options.max_seconds)
+
+    batch = actions if options.max_files is None else actions.slice(0, options.max_files)
+    retrier = Retrier()
+    processed = execute_moves(
+        batch,
+        dry_run=options.dry_run,
+        ledger_path=None if options.dry_run else options.ledger_path,
+        catalog_path=None if options.dry_run else options.catalog_path,
+        throttle=throttle,
+        journal_path=options.journal_path,
+        quarantine_path=None if options.dry_run else options.quarantine_path,
+        claims=node,
+        stop=stop,
+        check_sources=cursor is not None,
+        retrier=retrier,
+        durability=options.durability,
+    )
+
+    # Moves still backing off when the budget ran out go to the front of the cursor instead of being waited on.
+    deferred = sorted(entry.item[0] for entry in retrier.drain())
+    if deferred and node is not None:
+        node.release([actions[i].src for i in deferred])
+    remaining = len(actions) - processed + len(deferred)
+    if remaining:
+        logging.info(
+            "action=budget_stop processed=%s remaining=%s retries_deferred=%s seconds=%.1f",
+            processed,
+            remaining,
+            len(deferred),
+            time.monotonic() - started,
+        )
+    if cursor_path is not None and budgeted:
+        if remaining:
+            tail = actions.slice(processed)
+            if deferred:
+                tail = actions.subset([*deferred, *range(processed, len(actions))])
+            _save_cursor(cursor_path, tail, config_path)
+        else:
+            cursor_path.unlink(missing_ok=True)
+
+    if options.delete_empty_dirs and node is not None:
+        # Other nodes may be about to move files into directories that are empty right now.
+        logging.warning("action=skip_delete_empty_dirs reason=cluster_mode")
+    elif options.delete_empty_dirs and not options.dry_run:
+        protected = protected_destination_dirs(cfg)
+        delete_empty_dirs(cfg.source_dir, protected=protected, ignore=ignore_rules_for(cfg.ignore))
+
+    if quarantine is not None:
+        if options.quarantine_max_bytes is not None or options.quarantine_max_age_days is not None:
+            Quarantine(quarantine).collect_garbage(
+                max_bytes=options.quarantine_max_bytes,
+                max_age_days=options.quarantine_max_age_days,
+            )
+
+    # Files still settling, left for the next budget or failed leave the directory unchanged, so recording
+    # it would skip them next time.
+    failed = retrier.failed_count
+    if state is not None and not options.dry_run and not settle.deferred and not remaining and not failed:
+        state.record(config_path, snapshot)
+
+    return RunResult(
+        skipped=False,
+        planned=len(actions),
+        deferred=settle.deferred,
+        remaining=remaining,
+        failed=failed,
+    )
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+import heapq
+import logging
+from pathlib import Path
+import random
+import time
+from typing import Callable
+
+import yaml
+
+from src.automation.file_sorter import DURABILITY_LEVELS
+from src.automation.runner import RunOptions
+
+
+@dataclass(frozen=True)
+class ScheduledJob:
+    config: Path
+    interval: float
+    jitter: float = 0.0
+    options: RunOptions = RunOptions()
+
+
+def _job_options(raw: dict, base: RunOptions, index: int) -> RunOptions:
+    # Each job journals (and keeps its cursor and rule stats) separately so one config never blocks, or skews the
+    # rule order of, the others.
+    journal = raw.get("journal_file")
+    if journal is None and base.journal_path is not None:
+        journal = base.journal_path.with_name(f"{base.journal_path.stem}.{index}{base.journal_path.suffix}")
+
+    cursor = raw.get("cursor_file")
+    if cursor is None and base.cursor_path is not None:
+        cursor = base.cursor_path.with_name(f"{base.cursor_path.stem}.{index}{base.cursor_path.suffix}")
+
+    rule_stats = raw.get("rule_stats_file")
+    if rule_stats is None and base.rule_stats_path is not None:
+        rule_stats = base.rule_stats_path.with_name(
+            f"{base.rule_stats_path.stem}.{index}{base.rule_stats_path.suffix}"
+        )
+
+    processes = int(raw.get("plan_processes", base.plan_processes))
+    if processes > 1 and base.rule_stats_path is not None:
+        raise ValueError(f"Schedule job {index}: plan_processes cannot be combined with --adaptive-rules")
+
+    return replace(
+        base,
+        dry_run=bool(raw.get("dry_run", base.dry_run)),
+        ledger_path=Path(raw["ledger_file"]) if raw.get("ledger_file") else base.ledger_path,
+        catalog_path=Path(raw["catalog_file"]) if raw.get("catalog_file") else base.catalog_path,
+        journal_path=Path(journal) if journal is not None else None,
+        delete_empty_dirs=bool(raw.get("delete_empty_dirs", base.delete_empty_dirs)),
+        plan_processes=processes,
+        max_seconds=float(raw["max_seconds"]) if raw.get("max_seconds") is not None else base.max_seconds,
+        max_files=int(raw["max_files"]) if raw.get("max_files") is not None else base.max_files,
+        cursor_path=Path(cursor) if cursor is not None else None,
+        rule_stats_path=Path(rule_stats) if rule_stats is not None else None,
+        durability=str(raw.get("durability", base.durability)),
+    )
+
+
+def load_schedule(path: Path, *, base: RunOptions = RunOptions()) -> list[ScheduledJob]:
+    if not path.exists():
+        raise FileNotFoundError(f"Schedule file not found: {path}")
+
+    data = yaml.safe_load(path.read_text(encoding="utf-8")) or {}
+    raw_jobs = data.get("jobs")
+    if not isinstance(raw_jobs, list) or not raw_jobs:
+        raise ValueError("Schedule must contain a non-empty 'jobs' list")
+
+    jobs: list[ScheduledJob] = []
+    for i, raw in enumerate(raw_jobs):
+        if not isinstance(raw, dict) or not raw.get("config"):
+            raise ValueError(f"Schedule job #{i + 1} must be a mapping with a 'config' path")
+
+        interval = float(raw.get("interval", 60))
+        jitter = float(raw.get("jitter", 0))
+        if interval <= 0:
+            raise ValueError(f"Schedule job #{i + 1} interval must be positive")
+        if jitter < 0:
+            raise ValueError(f"Schedule job #{i + 1} jitter must not be negative")
+        if raw.get("durability", base.durability) not in DURABILITY_LEVELS:
+            raise ValueError(f"Schedule job #{i + 1} durability must be one of: {', '.join(DURABILITY_LEVELS)}")
+
+        config = Path(raw["config"]).expanduser()
+        if not config.is_absolute():
+            config = (path.parent / config).resolve()
+
+        jobs.append(
+            ScheduledJob(config=config, interval=interval, jitter=jitter, options=_job_options(raw, base, i))
+        )
+    return jobs
+
+
+def run_schedule(
+    jobs: list[ScheduledJob],
+    run_job: Callable[[ScheduledJob], object],
+    *,
+    clock: Callable[[], float] = time.monotonic,
+    sleep: Callable[[float], None] = time.sleep,
+    rng: random.Random | None = None,
+    max_runs: int | None = None,
+) -> int:
+    rng = rng or random.Random()
+    start = clock()
+
+    # Initial jitter spreads the first runs out so jobs sharing an interval never fire in lockstep.
+    due: list[tuple[float, int]] = [(start + rng.uniform(0, job.jitter), i) for i, job in enumerate(jobs)]
+    heapq.heapify(due)
+
+    runs = 0
+    while due and (max_runs is None or runs < max_runs):
+        when, i = heapq.heappop(due)
+        wait = when - clock()
+        if wait > 0:
+            sleep(wait)
+
+        job = jobs[i]
+        try:
+            run_job(job)
+        except Exception:
+            logging.exception("action=schedule_error config=%s", job.config)
+        runs += 1
+
+        heapq.heappush(due, (clock() + job.interval + rng.uniform(0, job.jitter), i))
+    return runs
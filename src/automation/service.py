@@ -0,0 +1,459 @@
+from __future__ import annotations
+
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+import hashlib
+import hmac
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+import os
+from pathlib import Path
+import secrets
+import socketserver
+import threading
+import time
+from typing import Callable
+from urllib.parse import parse_qs, urlsplit
+
+from src.automation.compact_plan import CompactPlan
+from src.automation.file_sorter import plan_moves_compact
+from src.automation.run_state import DirFingerprint, fingerprint_dir, fingerprint_file
+from src.automation.runner import RunOptions, load_config_cached, run_config
+from src.automation.settle_tracker import SettleTracker
+from src.automation.undo_manager import undo_last_move
+from src.config.config_loader import Config
+
+DEFAULT_SERVICE_WORKERS = 2
+DEFAULT_MAX_QUEUE = 16
+_JOBS_KEPT = 100
+_MAX_BODY = 64 * 1024
+
+
+class ServiceBusy(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class ServiceOptions:
+    run: RunOptions = RunOptions()
+    default_config: Path | None = None
+    # Configs a request may name besides the default; anything else could point execute at any directory.
+    allowed_configs: tuple[Path, ...] = ()
+    workers: int = DEFAULT_SERVICE_WORKERS
+    max_queue: int = DEFAULT_MAX_QUEUE
+
+
+@dataclass
+class Job:
+    id: int
+    kind: str
+    config: str | None
+    state: str = "queued"
+    submitted: str = field(default_factory=lambda: datetime.now().isoformat(timespec="seconds"))
+    finished: str | None = None
+    result: dict | None = None
+    error: str | None = None
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "config": self.config,
+            "state": self.state,
+            "submitted": self.submitted,
+            "finished": self.finished,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+@dataclass(frozen=True)
+class WarmPlan:
+    cfg: Config
+    plan: CompactPlan
+    config_stamp: list[int] | None
+    source: DirFingerprint | None
+    rule_counts: dict[str, int]
+
+
+class WarmCache:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._plans: dict[str, WarmPlan] = {}
+        # Destination listings, keyed by directory and revalidated against its fingerprint.
+        self._snapshots: dict[str, tuple[DirFingerprint | None, frozenset[str]]] = {}
+        self._settle: dict[str, SettleTracker] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def plan(self, config_path: Path, *, processes: int = 0) -> tuple[WarmPlan, bool]:
+        key = str(config_path.resolve())
+        stamp = fingerprint_file(config_path)
+        with self._lock:
+            warm = self._plans.get(key)
+
+        if warm is not None and warm.config_stamp == stamp and fingerprint_dir(warm.cfg.source_dir) == warm.source:
+            with self._lock:
+                self.hits += 1
+            return warm, True
+
+        cfg = load_config_cached(config_path)
+        # Fingerprint before scanning: a change that races the scan makes the next request rescan.
+        source = fingerprint_dir(cfg.source_dir)
+        with self._lock:
+            settle = self._settle.setdefault(key, SettleTracker())
+        plan = plan_moves_compact(cfg, processes=processes, settle=settle)
+        counts = Counter(plan.rule_ids)
+        warm = WarmPlan(
+            cfg=cfg,
+            plan=plan,
+            config_stamp=stamp,
+            source=source,
+            rule_counts={plan.rule_names[r]: n for r, n in counts.items()},
+        )
+        with self._lock:
+            self.misses += 1
+            # Files still settling have to be looked at again even if the directory does not change.
+            if source is not None and not settle.deferred:
+                self._plans[key] = warm
+        return warm, False
+
+    def snapshot(self, directory: str) -> frozenset[str]:
+        current = fingerprint_dir(Path(directory))
+        with self._lock:
+            cached = self._snapshots.get(directory)
+        if cached is not None and current is not None and cached[0] == current:
+            return cached[1]
+
+        try:
+            with os.scandir(directory) as it:
+                names = frozenset(e.name for e in it)
+        except OSError:
+            names = frozenset()
+        with self._lock:
+            self._snapshots[directory] = (current, names)
+        return names
+
+    def conflicts(self, plan: CompactPlan) -> int:
+        snapshots = {d: self.snapshot(plan.dirs[d]) for d in set(plan.dst_dir_ids)}
+        return sum(1 for i in range(len(plan)) if plan.dst_name(i) in snapshots[plan.dst_dir_ids[i]])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "plans": len(self._plans),
+                "snapshots": len(self._snapshots),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def _per_config_path(base: Path | None, config_key: str) -> Path | None:
+    # Jobs for different configs may interleave, so each config gets its own journal and cursor files.
+    if base is None:
+        return None
+    digest = hashlib.sha1(config_key.encode("utf-8")).hexdigest()[:12]
+    return base.with_name(f"{base.stem}.{digest}{base.suffix}")
+
+
+class AutomationService:
+    def __init__(self, options: ServiceOptions = ServiceOptions()) -> None:
+        self.options = options
+        self.cache = WarmCache()
+        self.started = time.monotonic()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, options.workers), thread_name_prefix="pat-job")
+        self._lock = threading.Lock()
+        # Executes and undos share the ledger, so they run one at a time; plans only wait for a free worker.
+        self._mutate_lock = threading.Lock()
+        self._jobs: OrderedDict[int, Job] = OrderedDict()
+        self._outstanding = 0
+        self._next_id = 1
+
+    def _config_path(self, config: str | None) -> Path:
+        if config:
+            path = Path(config).expanduser().resolve()
+            allowed = {p.expanduser().resolve() for p in self.options.allowed_configs}
+            if self.options.default_config is not None:
+                allowed.add(self.options.default_config.expanduser().resolve())
+            if path not in allowed:
+                raise PermissionError(f"Config not allowed: {config} (start the service with --allow-config)")
+            return path
+        if self.options.default_config is None:
+            raise ValueError("'config' is required (the service was started without --config)")
+        return self.options.default_config
+
+    def _submit(self, kind: str, config: Path | None, fn: Callable[[], dict]) -> tuple[Job, Future]:
+        with self._lock:
+            if self._outstanding >= self.options.max_queue:
+                raise ServiceBusy(f"{self._outstanding} jobs already queued or running")
+            job = Job(id=self._next_id, kind=kind, config=None if config is None else str(config))
+            self._next_id += 1
+            self._outstanding += 1
+            self._jobs[job.id] = job
+            while len(self._jobs) > _JOBS_KEPT:
+                self._jobs.popitem(last=False)
+
+        def run() -> dict:
+            job.state = "running"
+            try:
+                job.result = fn()
+                job.state = "done"
+                return job.result
+            except Exception as e:
+                job.state = "failed"
+                job.error = f"{type(e).__name__}: {e}"
+                logging.exception("action=service_job_failed job=%s kind=%s", job.id, kind)
+                raise
+            finally:
+                job.finished = datetime.now().isoformat(timespec="seconds")
+                with self._lock:
+                    self._outstanding -= 1
+
+        return job, self._pool.submit(run)
+
+    def plan(self, config: str | None = None, *, limit: int = 100) -> dict:
+        config_path = self._config_path(config)
+
+        def work() -> dict:
+            warm, cached = self.cache.plan(config_path, processes=self.options.run.plan_processes)
+            return {
+                "config": str(config_path),
+                "cached": cached,
+                "count": len(warm.plan),
+                "conflicts": self.cache.conflicts(warm.plan),
+                "rules": warm.rule_counts,
+                "moves": warm.plan.to_rows(limit=max(0, limit)),
+            }
+
+        _job, future = self._submit("plan", config_path, work)
+        return future.result()
+
+    def execute(self, config: str | None = None, *, dry_run: bool = False) -> Job:
+        config_path = self._config_path(config)
+        options = replace(
+            self.options.run,
+            dry_run=dry_run or self.options.run.dry_run,
+            journal_path=_per_config_path(self.options.run.journal_path, str(config_path.resolve())),
+            cursor_path=_per_config_path(self.options.run.cursor_path, str(config_path.resolve())),
+        )
+
+        def work() -> dict:
+            with self._mutate_lock:
+                result = run_config(
+                    config_path,
+                    options,
+                    planner=lambda _cfg: self.cache.plan(config_path, processes=options.plan_processes)[0].plan,
+                )
+            return {
+                "skipped": result.skipped,
+                "planned": result.planned,
+                "remaining": result.remaining,
+                "failed": result.failed,
+                "dry_run": options.dry_run,
+            }
+
+        job, _future = self._submit("execute", config_path, work)
+        return job
+
+    def undo(self) -> dict:
+        ledger_path = self.options.run.ledger_path
+        if ledger_path is None:
+            raise ValueError("Undo needs a ledger file")
+
+        def work() -> dict:
+            with self._mutate_lock:
+                restored_to = undo_last_move(ledger_path, catalog_path=self.options.run.catalog_path)
+            logging.info("action=undo restored_to=%s", restored_to)
+            return {"restored_to": str(restored_to)}
+
+        _job, future = self._submit("undo", None, work)
+        return future.result()
+
+    def job(self, job_id: int) -> Job:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise FileNotFoundError(f"Unknown job: {job_id}")
+        return job
+
+    def status(self) -> dict:
+        with self._lock:
+            jobs = [j.to_dict() for j in list(self._jobs.values())[-20:]]
+            outstanding = self._outstanding
+        return {
+            "uptime_seconds": round(time.monotonic() - self.started, 3),
+            "workers": self.options.workers,
+            "outstanding": outstanding,
+            "max_queue": self.options.max_queue,
+            "cache": self.cache.stats(),
+            "jobs": jobs,
+        }
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "PersonalAutomationTool"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def service(self) -> AutomationService:
+        return self.server.service  # type: ignore[attr-defined]
+
+    def log_message(self, format: str, *args) -> None:  # noqa: A002
+        logging.debug("action=http " + format, *args)
+
+    def _send(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload, sort_keys=True).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> dict:
+        # Browsers cannot send application/json cross-origin without a preflight, which this server never
+        # answers, so requiring it keeps web pages from driving a localhost listener.
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > _MAX_BODY:
+            self.close_connection = True
+            raise ValueError("Request body too large")
+        raw = self.rfile.read(length) if length else b"{}"
+        if self.headers.get_content_type() != "application/json":
+            raise ValueError("Content-Type must be application/json")
+        data = json.loads(raw or b"{}")
+        if not isinstance(data, dict):
+            raise ValueError("Request body must be a JSON object")
+        return data
+
+    def _dispatch(self, handler: Callable[[], tuple[int, dict]]) -> None:
+        token = self.server.token  # type: ignore[attr-defined]
+        if token is not None:
+            given = self.headers.get("Authorization", "")
+            if not hmac.compare_digest(given.encode("utf-8"), f"Bearer {token}".encode("utf-8")):
+                self.close_connection = True
+                self._send(401, {"error": "Missing or wrong bearer token"})
+                return
+        try:
+            status, payload = handler()
+        except ServiceBusy as e:
+            status, payload = 503, {"error": str(e)}
+        except FileNotFoundError as e:
+            status, payload = 404, {"error": str(e)}
+        except PermissionError as e:
+            status, payload = 403, {"error": str(e)}
+        except (ValueError, json.JSONDecodeError) as e:
+            status, payload = 400, {"error": str(e)}
+        except Exception as e:
+            status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+        self._send(status, payload)
+
+    def do_GET(self) -> None:  # noqa: N802
+        url = urlsplit(self.path)
+
+        def handle() -> tuple[int, dict]:
+            if url.path == "/status":
+                return 200, self.service.status()
+            if url.path.startswith("/jobs/"):
+                return 200, self.service.job(int(url.path[len("/jobs/"):])).to_dict()
+            raise FileNotFoundError(f"No such endpoint: {url.path}")
+
+        self._dispatch(handle)
+
+    def do_POST(self) -> None:  # noqa: N802
+        url = urlsplit(self.path)
+
+        def handle() -> tuple[int, dict]:
+            body = self._read_json()
+            if url.path == "/plan":
+                limit = int(body.get("limit", parse_qs(url.query).get("limit", ["100"])[0]))
+                return 200, self.service.plan(body.get("config"), limit=limit)
+            if url.path == "/execute":
+                job = self.service.execute(body.get("config"), dry_run=bool(body.get("dry_run", False)))
+                return 202, job.to_dict()
+            if url.path == "/undo":
+                return 200, self.service.undo()
+            raise FileNotFoundError(f"No such endpoint: {url.path}")
+
+        self._dispatch(handle)
+
+
+class _TCPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def load_token(path: Path) -> str:
+    # Created on first use and readable only by its owner, like the Unix socket.
+    try:
+        token = path.read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        token = ""
+    if token:
+        return token
+    path.parent.mkdir(parents=True, exist_ok=True)
+    token = secrets.token_urlsafe(32)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token + "\n")
+    logging.info("action=service_token_created path=%s", path)
+    return token
+
+
+def make_server(
+    service: AutomationService,
+    *,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    socket_path: Path | None = None,
+    token: str | None = None,
+) -> socketserver.BaseServer:
+    if socket_path is not None:
+        if socket_path.exists():
+            socket_path.unlink()
+        socket_path.parent.mkdir(parents=True, exist_ok=True)
+        server: socketserver.BaseServer = _UnixServer(str(socket_path), _Handler)
+        os.chmod(socket_path, 0o600)
+    else:
+        # Any local user or process can reach a TCP port, so it only answers requests carrying the token.
+        if not token:
+            raise ValueError("An HTTP listener needs a token (or use a Unix socket)")
+        server = _TCPServer((host, port), _Handler)
+    server.service = service  # type: ignore[attr-defined]
+    server.token = token  # type: ignore[attr-defined]
+    return server
+
+
+def serve(
+    options: ServiceOptions,
+    *,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    socket_path: Path | None = None,
+    token_path: Path | None = None,
+) -> None:
+    token = None
+    if socket_path is None:
+        if token_path is None:
+            raise ValueError("An HTTP listener needs a token file (or use a Unix socket)")
+        token = load_token(token_path)
+    service = AutomationService(options)
+    server = make_server(service, host=host, port=port, socket_path=socket_path, token=token)
+    where = socket_path if socket_path is not None else f"http://{host}:{server.server_address[1]}"
+    logging.info("action=serve listen=%s workers=%s", where, options.workers)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if socket_path is not None:
+            socket_path.unlink(missing_ok=True)
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+import time
+from typing import Callable
+
+
+class SettleTracker:
+    def __init__(self, path: Path | None = None, *, clock: Callable[[], float] = time.time) -> None:
+        self.path = path
+        self.clock = clock
+        self.deferred = 0
+        # source_dir -> name -> [size, mtime_ns, since]; only files that were still settling are kept.
+        self._seen: dict[str, dict[str, list]] = {}
+        if path is not None and path.exists():
+            try:
+                self._seen = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                self._seen = {}
+
+    def settled(self, source: Path, stats: list[tuple[str, int, int]], settle_seconds: float) -> list[str]:
+        # A file is stable once neither its size nor its mtime has changed for settle_seconds. Its
+        # mtime already says when it was last written, so most files pass on first sight, and only
+        # recently written ones are remembered until a later scan sees them unchanged.
+        now = self.clock()
+        previous = self._seen.get(str(source), {})
+        pending: dict[str, list] = {}
+        ready: list[str] = []
+        for name, size, mtime_ns in stats:
+            seen = previous.get(name)
+            if seen is not None and seen[0] == size and seen[1] == mtime_ns:
+                since = seen[2]
+            elif seen is not None:
+                since = now
+            else:
+                since = min(now, mtime_ns / 1e9)
+
+            if now - since >= settle_seconds:
+                ready.append(name)
+            else:
+                pending[name] = [size, mtime_ns, since]
+
+        if pending:
+            self._seen[str(source)] = pending
+        else:
+            self._seen.pop(str(source), None)
+        self.deferred = len(pending)
+        return ready
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(self._seen, sort_keys=True), encoding="utf-8")
+        tmp.replace(self.path)
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import errno
+import os
+from pathlib import Path
+import shutil
+import time
+from typing import Callable
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class TokenBucket:
+    def __init__(
+        self,
+        rate: float,
+        *,
+        burst: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        if rate <= 0:
+            raise ValueError(f"rate must be positive (got {rate})")
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else rate)
+        self._tokens = self.burst
+        self._clock = clock
+        self._sleep = sleep
+        self._last = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, amount: float) -> float:
+        self._refill()
+        self._tokens -= amount
+        if self._tokens >= 0:
+            return 0.0
+
+        # Requests larger than the burst size go into debt instead of blocking forever.
+        wait = -self._tokens / self.rate
+        self._sleep(wait)
+        self._refill()
+        return wait
+
+
+class IOThrottle:
+    def __init__(
+        self,
+        *,
+        bytes_per_sec: float | None = None,
+        ops_per_sec: float | None = None,
+        target_latency: float = 0.1,
+        min_factor: float = 0.05,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.bytes_per_sec = bytes_per_sec
+        self.ops_per_sec = ops_per_sec
+        self.target_latency = target_latency
+        self.min_factor = min_factor
+        self.factor = 1.0
+        self.throttled_seconds = 0.0
+        self.ops = 0
+        self.bytes = 0
+        self._latency_ewma: float | None = None
+        self._bytes_bucket = (
+            None if not bytes_per_sec else TokenBucket(bytes_per_sec, clock=clock, sleep=sleep)
+        )
+        self._ops_bucket = None if not ops_per_sec else TokenBucket(ops_per_sec, clock=clock, sleep=sleep)
+
+    @property
+    def enabled(self) -> bool:
+        return self._bytes_bucket is not None or self._ops_bucket is not None
+
+    def acquire_op(self) -> None:
+        self.ops += 1
+        if self._ops_bucket is not None:
+            self.throttled_seconds += self._ops_bucket.acquire(1)
+
+    def acquire_bytes(self, nbytes: int) -> None:
+        self.bytes += nbytes
+        if self._bytes_bucket is not None:
+            self.throttled_seconds += self._bytes_bucket.acquire(nbytes)
+
+    def observe_latency(self, seconds: float) -> None:
+        if self._latency_ewma is None:
+            self._latency_ewma = seconds
+        else:
+            self._latency_ewma = 0.8 * self._latency_ewma + 0.2 * seconds
+
+        # AIMD: back off quickly when the device is slow, recover gradually once it is fast again.
+        if self._latency_ewma > self.target_latency:
+            self.factor = max(self.min_factor, self.factor * 0.7)
+        elif self._latency_ewma < self.target_latency / 2:
+            self.factor = min(1.0, self.factor + 0.05)
+        else:
+            return
+
+        if self._bytes_bucket is not None and self.bytes_per_sec:
+            self._bytes_bucket.rate = self.bytes_per_sec * self.factor
+        if self._ops_bucket is not None and self.ops_per_sec:
+            self._ops_bucket.rate = self.ops_per_sec * self.factor
+
+
+def _throttled_copy(src: Path, dst: Path, throttle: IOThrottle) -> None:
+    with src.open("rb") as fsrc, dst.open("wb") as fdst:
+        while True:
+            chunk = fsrc.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            throttle.acquire_bytes(len(chunk))
+            started = time.monotonic()
+            fdst.write(chunk)
+            throttle.observe_latency(time.monotonic() - started)
+    shutil.copystat(src, dst)
+
+
+def throttled_move(src: Path, dst: Path, throttle: IOThrottle) -> None:
+    throttle.acquire_op()
+    started = time.monotonic()
+    try:
+        os.rename(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    else:
+        throttle.observe_latency(time.monotonic() - started)
+        return
+
+    if src.is_symlink():
+        shutil.move(str(src), str(dst))
+        return
+
+    try:
+        _throttled_copy(src, dst, throttle)
+    except BaseException:
+        dst.unlink(missing_ok=True)
+        raise
+    src.unlink()
@@ -1,10 +1,19 @@
 from __future__ import annotations
 
 import json
+import logging
+import os
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 
+from src.automation.archiver import extract_member
+from src.automation.fs_backend import OS_FILESYSTEM, FileSystem, OSFileSystem
+from src.automation.history_catalog import HistoryCatalog
+from src.automation.quarantine import Quarantine
+
+_SOURCE_PRESERVING_ACTIONS = ("hardlink", "symlink", "reflink", "copy")
+
 
 @dataclass(frozen=True)
 class LedgerEntry:
@@ -13,6 +22,10 @@ class LedgerEntry:
     ts: str
     rule_name: str
     duplicate_strategy: str
+    action: str = "move"
+    member: str | None = None
+    quarantine: str | None = None
+    entry_id: str | None = None
 
 
 def append_ledger_entry(ledger_path: Path, entry: LedgerEntry) -> None:
@@ -21,15 +34,24 @@ def append_ledger_entry(ledger_path: Path, entry: LedgerEntry) -> None:
         f.write(json.dumps(entry.__dict__, sort_keys=True) + "\n")
 
 
-def _read_last_nonempty_line(path: Path) -> str | None:
-    if not path.exists():
-        return None
+def append_ledger_entries(ledger_path: Path, entries: list[LedgerEntry], *, fsync: bool = False) -> None:
+    ledger_path.parent.mkdir(parents=True, exist_ok=True)
+    with ledger_path.open("a", encoding="utf-8") as f:
+        f.write("".join(json.dumps(e.__dict__, sort_keys=True) + "\n" for e in entries))
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def _read_last_nonempty_lines(path: Path, count: int) -> list[str]:
+    if not path.exists() or count <= 0:
+        return []
 
     with path.open("rb") as f:
         f.seek(0, 2)
         end = f.tell()
         if end == 0:
-            return None
+            return []
 
         buf = b""
         pos = end
@@ -38,35 +60,111 @@ def _read_last_nonempty_line(path: Path) -> str | None:
             pos -= step
             f.seek(pos)
             buf = f.read(step) + buf
-            if b"\n" in buf:
+            if buf.count(b"\n") > count:
                 break
 
-    lines = buf.splitlines()
-    for raw in reversed(lines):
+    if pos > 0:
+        # The first fragment may start mid-line.
+        buf = buf.split(b"\n", 1)[1]
+
+    lines: list[str] = []
+    for raw in reversed(buf.splitlines()):
         line = raw.decode("utf-8").strip()
         if line:
-            return line
-    return None
+            lines.append(line)
+            if len(lines) == count:
+                break
+    lines.reverse()
+    return lines
+
 
+def _read_last_nonempty_line(path: Path) -> str | None:
+    lines = _read_last_nonempty_lines(path, 1)
+    return lines[0] if lines else None
+
+
+def is_undo_marker(payload: dict) -> bool:
+    return payload.get("type") == "undo"
+
+
+def read_recent_ledger_entries(ledger_path: Path, count: int) -> list[dict]:
+    entries = (json.loads(line) for line in _read_last_nonempty_lines(ledger_path, count))
+    return [e for e in entries if not is_undo_marker(e)]
 
-def undo_last_move(ledger_path: Path) -> Path:
+
+def undo_last_move(
+    ledger_path: Path,
+    *,
+    catalog_path: Path | None = None,
+    fs: FileSystem = OS_FILESYSTEM,
+) -> Path:
     line = _read_last_nonempty_line(ledger_path)
     if line is None:
         raise FileNotFoundError(f"No undo information found at: {ledger_path}")
 
     payload = json.loads(line)
+    if is_undo_marker(payload):
+        # Replaying the entry again would move the file that the first undo put back at dst.
+        raise ValueError(f"The last ledger entry was already undone at {payload['ts']}")
     src = Path(payload["src"])
     dst = Path(payload["dst"])
+    action = payload.get("action", "move")
 
-    if not dst.exists():
+    if not fs.exists(dst) and not fs.is_symlink(dst):
         raise FileNotFoundError(f"Cannot undo because destination file is missing: {dst}")
 
+    if action in _SOURCE_PRESERVING_ACTIONS:
+        # The source was never moved, so undoing only removes the link or clone.
+        fs.unlink(dst)
+        _restore_quarantined(payload, dst, fs)
+        _mark_undone(ledger_path, catalog_path, payload)
+        return src
+
     target_src = src
-    if target_src.exists():
+    if fs.exists(target_src):
         stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         target_src = src.with_name(f"{src.stem}_undo_{stamp}{src.suffix}")
 
-    target_src.parent.mkdir(parents=True, exist_ok=True)
-    dst.replace(target_src)
+    fs.mkdir(target_src.parent)
+    if action == "archive":
+        if not isinstance(fs, OSFileSystem):
+            raise ValueError("Undoing archive actions needs the OS filesystem backend")
+        extract_member(dst, payload["member"], target_src)
+    else:
+        fs.rename(dst, target_src)
+        _restore_quarantined(payload, dst, fs)
 
+    _mark_undone(ledger_path, catalog_path, payload)
     return target_src
+
+
+def _restore_quarantined(payload: dict, dst: Path, fs: FileSystem) -> None:
+    quarantined = payload.get("quarantine")
+    if not quarantined:
+        return
+
+    path = Path(quarantined)
+    if not fs.exists(path):
+        logging.warning("action=undo_quarantine_missing dst=%s quarantine=%s", dst, path)
+        return
+    Quarantine.restore(path, dst, fs=fs)
+    logging.info("action=undo_quarantine dst=%s quarantine=%s", dst, path)
+
+
+def _mark_undone(ledger_path: Path, catalog_path: Path | None, payload: dict) -> None:
+    ts = datetime.now().isoformat(timespec="seconds")
+    marker = {
+        "type": "undo",
+        "ts": ts,
+        "src": payload["src"],
+        "dst": payload["dst"],
+        "entry_ts": payload["ts"],
+        "entry_id": payload.get("entry_id"),
+    }
+    with ledger_path.open("a", encoding="utf-8") as f:
+        f.write(json.dumps(marker, sort_keys=True) + "\n")
+    if catalog_path is not None:
+        with HistoryCatalog(catalog_path) as catalog:
+            catalog.mark_undone(
+                payload["src"], payload["dst"], ts=ts, entry_id=payload.get("entry_id"), entry_ts=payload["ts"]
+            )
@@ -6,6 +6,45 @@ import re
 
 import yaml
 
+from src.automation.dest_template import is_template, template_fields
+from src.automation.ignore_rules import IgnoreRules
+
+
+_SIZE_UNITS = {
+    "": 1,
+    "b": 1,
+    "k": 1024,
+    "kb": 1024,
+    "m": 1024**2,
+    "mb": 1024**2,
+    "g": 1024**3,
+    "gb": 1024**3,
+    "t": 1024**4,
+    "tb": 1024**4,
+}
+
+
+def parse_size(value: str | int) -> int:
+    if isinstance(value, int):
+        return value
+
+    raw = str(value).strip().lower().replace(" ", "")
+    digits = raw.rstrip("kmgtb")
+    unit = raw[len(digits):]
+    if unit not in _SIZE_UNITS or not digits:
+        raise ValueError(f"Invalid size: {value}")
+    try:
+        number = float(digits)
+    except ValueError:
+        raise ValueError(f"Invalid size: {value}") from None
+    return int(number * _SIZE_UNITS[unit])
+
+
+VALID_ACTIONS = ("move", "archive", "hardlink", "symlink", "reflink")
+VALID_REFLINK_FALLBACKS = ("copy", "hardlink", "symlink", "skip", "error")
+VALID_ARCHIVE_FORMATS = ("tar", "tar.gz", "zip")
+DEFAULT_ARCHIVE_VOLUME_SIZE = 1024**3
+
 
 @dataclass(frozen=True)
 class Rule:
@@ -16,6 +55,10 @@ class Rule:
     regex: str | None
     priority: int
     duplicate_strategy: str
+    action: str = "move"
+    archive_format: str = "tar.gz"
+    archive_volume_size: int = DEFAULT_ARCHIVE_VOLUME_SIZE
+    reflink_fallback: str = "copy"
 
 
 @dataclass(frozen=True)
@@ -24,6 +67,8 @@ class Config:
     destinations: dict[str, str]
     rules: list[Rule]
     default_duplicate_strategy: str
+    ignore: tuple[str, ...] = ()
+    settle_seconds: float = 0.0
 
 
 def validate_config(cfg: Config) -> None:
@@ -33,6 +78,14 @@ def validate_config(cfg: Config) -> None:
     if not isinstance(cfg.destinations, dict):
         raise ValueError("destinations must be a mapping")
 
+    for folder in cfg.destinations.values():
+        if is_template(folder):
+            template_fields(folder)
+
+    IgnoreRules(cfg.ignore)
+    if cfg.settle_seconds < 0:
+        raise ValueError(f"settle_seconds must not be negative (got {cfg.settle_seconds})")
+
     if not cfg.default_duplicate_strategy:
         raise ValueError("default_duplicate_strategy must be set")
 
@@ -71,6 +124,22 @@ def validate_config(cfg: Config) -> None:
             )
         if r.regex is not None:
             re.compile(r.regex)
+        if r.action not in VALID_ACTIONS:
+            raise ValueError(
+                f"rule.action must be one of: {', '.join(VALID_ACTIONS)} (got {r.action} in rule {r.name})"
+            )
+        if r.archive_format not in VALID_ARCHIVE_FORMATS:
+            raise ValueError(
+                f"rule.archive_format must be one of: {', '.join(VALID_ARCHIVE_FORMATS)} "
+                f"(got {r.archive_format} in rule {r.name})"
+            )
+        if r.reflink_fallback not in VALID_REFLINK_FALLBACKS:
+            raise ValueError(
+                f"rule.reflink_fallback must be one of: {', '.join(VALID_REFLINK_FALLBACKS)} "
+                f"(got {r.reflink_fallback} in rule {r.name})"
+            )
+        if r.archive_volume_size <= 0:
+            raise ValueError(f"rule.archive_volume_size must be positive (got {r.archive_volume_size})")
 
 
 def load_config(path: Path) -> Config:
@@ -95,6 +164,19 @@ def load_config(path: Path) -> Config:
 
     default_duplicate_strategy = str(data.get("duplicate_strategy", "skip"))
 
+    ignore_raw = data.get("ignore")
+    if ignore_raw is None:
+        ignore_raw = []
+    if not isinstance(ignore_raw, list):
+        raise ValueError("ignore must be a list of patterns")
+    ignore = tuple(str(p) for p in ignore_raw)
+
+    settle_raw = data.get("settle_seconds", 0)
+    try:
+        settle_seconds = float(settle_raw)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid settle_seconds: {settle_raw}") from None
+
     rules_raw = data.get("rules")
     if rules_raw is None:
         rules_raw = []
@@ -133,6 +215,16 @@ def load_config(path: Path) -> Config:
         duplicate_strategy_raw = r.get("duplicate_strategy", default_duplicate_strategy)
         duplicate_strategy = str(duplicate_strategy_raw)
 
+        action = str(r.get("action", "move"))
+        archive_format = str(r.get("archive_format", "tar.gz"))
+        reflink_fallback = str(r.get("reflink_fallback", "copy"))
+        try:
+            archive_volume_size = parse_size(r.get("archive_volume_size", DEFAULT_ARCHIVE_VOLUME_SIZE))
+        except ValueError:
+            raise ValueError(
+                f"Invalid archive_volume_size for rule {name}: {r.get('archive_volume_size')}"
+            ) from None
+
         rules.append(
             Rule(
                 name=name,
@@ -142,6 +234,10 @@ def load_config(path: Path) -> Config:
                 regex=regex,
                 priority=priority,
                 duplicate_strategy=duplicate_strategy,
+                action=action,
+                archive_format=archive_format,
+                archive_volume_size=archive_volume_size,
+                reflink_fallback=reflink_fallback,
             )
         )
 
@@ -150,6 +246,8 @@ def load_config(path: Path) -> Config:
         destinations=destinations,
         rules=rules,
         default_duplicate_strategy=default_duplicate_strategy,
+        ignore=ignore,
+        settle_seconds=settle_seconds,
     )
     validate_config(cfg)
     return cfg
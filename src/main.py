@@ -4,13 +4,36 @@ import argparse
 import logging
 from pathlib import Path
 
+from src.automation.cluster import DEFAULT_LEASE_SECONDS
+from src.automation.file_sorter import DURABILITY_LEVELS, resume_moves
+from src.automation.history_catalog import HistoryCatalog
+from src.automation.intent_journal import IntentJournal
+from src.automation.plan_store import load_plan, save_plan, verify_plan
+from src.automation.quarantine import SOURCE_QUARANTINE
+from src.automation.rule_stats import RuleStats, explain_order
+from src.automation.rules_engine import sorted_rules
+from src.automation.runner import RunOptions, cluster_node, run_config
+from src.automation.scheduler import load_schedule, run_schedule
+from src.automation.service import DEFAULT_MAX_QUEUE, DEFAULT_SERVICE_WORKERS, ServiceOptions, serve
+from src.automation.throttle import IOThrottle
 from src.automation.undo_manager import undo_last_move
-from src.config_loader import load_config
-from src.utils import delete_empty_dirs, execute_moves, plan_moves, setup_logging
+from src.config_loader import Config, load_config
+from src.utils import execute_moves, parse_size, plan_moves_compact, setup_logging
 
 
-def main() -> int:
+def main(argv: list[str] | None = None) -> int:
     parser = argparse.ArgumentParser(description="Personal Automation Tool (file organizer)")
+    parser.add_argument(
+        "command",
+        nargs="?",
+        choices=["run", "history", "schedule", "serve"],
+        default="run",
+        help=(
+            "run: organize files (default); history: query the move catalog; "
+            "schedule: run the configs in --schedule-file repeatedly from one process; "
+            "serve: answer plan/execute/undo/status requests over HTTP or a Unix socket"
+        ),
+    )
     parser.add_argument("--config", help="Path to YAML config")
     parser.add_argument("--dry-run", action="store_true", help="Log planned moves without moving files")
     parser.add_argument(
@@ -28,6 +51,186 @@ def main() -> int:
         action="store_true",
         help="Undo the last recorded move from the ledger file",
     )
+    parser.add_argument(
+        "--plan-processes",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Evaluate rules for scanned files on a pool of N worker processes (default: serial)",
+    )
+    parser.add_argument(
+        "--save-plan",
+        metavar="FILE",
+        help="Write the planned moves (with source fingerprints) to FILE instead of executing them",
+    )
+    parser.add_argument(
+        "--apply-plan",
+        metavar="FILE",
+        help="Execute a plan saved with --save-plan, skipping entries whose source changed since",
+    )
+    parser.add_argument(
+        "--max-bytes-per-sec",
+        type=parse_size,
+        help="Limit bytes copied per second for cross-device moves (e.g. 50MB)",
+    )
+    parser.add_argument(
+        "--max-ops-per-sec",
+        type=float,
+        help="Limit file operations (renames/moves) per second",
+    )
+    parser.add_argument(
+        "--journal-file",
+        default="logs/intent_journal.jsonl",
+        help="Write-ahead intent journal used to resume interrupted runs (default: logs/intent_journal.jsonl)",
+    )
+    parser.add_argument(
+        "--durability",
+        choices=DURABILITY_LEVELS,
+        default="none",
+        help="When moves are fsynced: none, once per batch before the ledger is written, or after every move",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume the run recorded in the intent journal instead of planning a new one",
+    )
+    parser.add_argument(
+        "--catalog-file",
+        default="logs/history.sqlite3",
+        help="Path to the indexed move history catalog (default: logs/history.sqlite3)",
+    )
+    parser.add_argument(
+        "--quarantine-dir",
+        help=(
+            "Where files replaced by duplicate_strategy: overwrite are kept for undo. Relative paths are taken "
+            "from the source directory, so stashing stays a rename (default: .quarantine)"
+        ),
+    )
+    parser.add_argument(
+        "--no-quarantine",
+        action="store_true",
+        help="Delete files replaced by duplicate_strategy: overwrite instead of quarantining them",
+    )
+    parser.add_argument(
+        "--quarantine-max-size",
+        type=parse_size,
+        help="After each run, delete the oldest quarantined files until the quarantine fits in this size",
+    )
+    parser.add_argument(
+        "--quarantine-max-age-days",
+        type=int,
+        help="After each run, delete quarantined files older than this many days",
+    )
+    parser.add_argument(
+        "--adaptive-rules",
+        action="store_true",
+        help="Reorder provably non-overlapping rules of equal priority by observed hit rate and cost",
+    )
+    parser.add_argument(
+        "--rule-stats-file",
+        default="logs/rule_stats.json",
+        help="Per-rule hit counts and costs used by --adaptive-rules (default: logs/rule_stats.json)",
+    )
+    parser.add_argument(
+        "--explain",
+        action="store_true",
+        help="Print the effective rule evaluation order with its recorded stats and exit",
+    )
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        help="Stop at the first batch boundary after this many seconds and keep the rest for the next run",
+    )
+    parser.add_argument(
+        "--max-files",
+        type=int,
+        help="Process at most this many planned files and keep the rest for the next run",
+    )
+    parser.add_argument(
+        "--cursor-file",
+        default="logs/run_cursor.plan",
+        help="Where a budgeted run keeps its unfinished plan (default: logs/run_cursor.plan)",
+    )
+    parser.add_argument(
+        "--settle-state-file",
+        default="logs/settle_state.json",
+        help="Tracks files still inside the config's settle_seconds window (default: logs/settle_state.json)",
+    )
+    parser.add_argument(
+        "--cluster-dir",
+        help="Shared directory for cluster leases; nodes using the same one split the inbox between them",
+    )
+    parser.add_argument("--node-id", help="Cluster node name (default: the host name)")
+    parser.add_argument(
+        "--lease-seconds",
+        type=float,
+        default=DEFAULT_LEASE_SECONDS,
+        help=f"Cluster membership and per-file claim lease (default: {DEFAULT_LEASE_SECONDS:.0f})",
+    )
+    parser.add_argument(
+        "--skip-unchanged",
+        action="store_true",
+        help="Skip planning when the config and source directory are unchanged since the last run",
+    )
+    parser.add_argument(
+        "--state-file",
+        default="logs/run_state.json",
+        help="Where --skip-unchanged keeps source directory fingerprints (default: logs/run_state.json)",
+    )
+    parser.add_argument(
+        "--schedule-file",
+        help="schedule: YAML file listing jobs (config, interval, jitter) to run",
+    )
+    parser.add_argument(
+        "--listen",
+        default="127.0.0.1:8765",
+        metavar="HOST:PORT",
+        help="serve: HTTP address to listen on (default: 127.0.0.1:8765)",
+    )
+    parser.add_argument("--socket", metavar="PATH", help="serve: listen on a Unix socket instead of HTTP")
+    parser.add_argument(
+        "--service-token-file",
+        default="logs/service.token",
+        help=(
+            "serve: bearer token HTTP clients must send, created with mode 0600 if missing "
+            "(default: logs/service.token)"
+        ),
+    )
+    parser.add_argument(
+        "--allow-config",
+        action="append",
+        default=[],
+        metavar="PATH",
+        help="serve: a config requests may name besides --config (repeatable)",
+    )
+    parser.add_argument(
+        "--service-workers",
+        type=int,
+        default=DEFAULT_SERVICE_WORKERS,
+        help=f"serve: worker threads for plan/execute/undo jobs (default: {DEFAULT_SERVICE_WORKERS})",
+    )
+    parser.add_argument(
+        "--service-queue",
+        type=int,
+        default=DEFAULT_MAX_QUEUE,
+        help=f"serve: jobs allowed to queue before requests are refused (default: {DEFAULT_MAX_QUEUE})",
+    )
+    parser.add_argument("--name", help="history: filter by source or destination filename")
+    parser.add_argument("--rule", help="history: filter by rule name")
+    parser.add_argument("--destination", help="history: filter by destination directory")
+    parser.add_argument("--since", help="history: only include moves at or after this date/time (ISO format)")
+    parser.add_argument("--until", help="history: only include moves before this date/time (ISO format)")
+    parser.add_argument("--limit", type=int, default=50, help="history: maximum number of moves to print")
+    parser.add_argument(
+        "--daily",
+        action="store_true",
+        help="history: print daily per-rule move counts and byte totals instead of moves",
+    )
+    parser.add_argument(
+        "--import-ledger",
+        action="store_true",
+        help="history: import the ledger file into the catalog before querying",
+    )
     parser.add_argument(
         "--log-level",
         default="INFO",
@@ -38,34 +241,171 @@ def main() -> int:
         default="logs/automation.log",
         help="Path to log file (default: logs/automation.log)",
     )
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     setup_logging(Path(args.log_file), level=args.log_level)
 
     ledger_path = Path(args.ledger_file)
+    catalog_path = Path(args.catalog_file)
+    journal_path = Path(args.journal_file)
+    if args.no_quarantine:
+        quarantine_path = None
+    elif args.quarantine_dir:
+        quarantine_path = Path(args.quarantine_dir)
+    else:
+        quarantine_path = SOURCE_QUARANTINE
+    throttle = IOThrottle(bytes_per_sec=args.max_bytes_per_sec, ops_per_sec=args.max_ops_per_sec)
+
+    if args.command == "history":
+        return _print_history(args, catalog_path=catalog_path, ledger_path=ledger_path)
+
+    if args.adaptive_rules and args.plan_processes > 1:
+        parser.error("--adaptive-rules cannot be combined with --plan-processes")
+
+    options = RunOptions(
+        dry_run=args.dry_run,
+        ledger_path=ledger_path,
+        catalog_path=catalog_path,
+        journal_path=journal_path,
+        state_path=Path(args.state_file) if args.skip_unchanged else None,
+        delete_empty_dirs=args.delete_empty_dirs,
+        plan_processes=args.plan_processes,
+        max_bytes_per_sec=args.max_bytes_per_sec,
+        max_ops_per_sec=args.max_ops_per_sec,
+        quarantine_path=quarantine_path,
+        quarantine_max_bytes=args.quarantine_max_size,
+        quarantine_max_age_days=args.quarantine_max_age_days,
+        rule_stats_path=Path(args.rule_stats_file) if args.adaptive_rules else None,
+        settle_state_path=Path(args.settle_state_file),
+        max_seconds=args.max_seconds,
+        max_files=args.max_files,
+        cursor_path=Path(args.cursor_file),
+        durability=args.durability,
+        cluster_dir=Path(args.cluster_dir) if args.cluster_dir else None,
+        cluster_node=args.node_id,
+        cluster_lease_seconds=args.lease_seconds,
+    )
+
+    if args.command == "schedule":
+        if not args.schedule_file:
+            parser.error("--schedule-file is required for the schedule command")
+        jobs = load_schedule(Path(args.schedule_file), base=options)
+        logging.info("action=schedule_start jobs=%s", len(jobs))
+        run_schedule(jobs, lambda job: run_config(job.config, job.options))
+        return 0
+
+    if args.command == "serve":
+        host, _, port = args.listen.rpartition(":")
+        if not host or not port.isdigit():
+            parser.error("--listen must be HOST:PORT")
+        service_options = ServiceOptions(
+            run=options,
+            default_config=Path(args.config) if args.config else None,
+            allowed_configs=tuple(Path(p) for p in args.allow_config),
+            workers=args.service_workers,
+            max_queue=args.service_queue,
+        )
+        serve(
+            service_options,
+            host=host,
+            port=int(port),
+            socket_path=Path(args.socket) if args.socket else None,
+            token_path=Path(args.service_token_file),
+        )
+        return 0
+
+    if args.explain:
+        if not args.config:
+            parser.error("--config is required for --explain")
+        return _print_rule_order(load_config(Path(args.config)), Path(args.rule_stats_file))
 
     if args.undo_last:
-        restored_to = undo_last_move(ledger_path)
+        restored_to = undo_last_move(ledger_path, catalog_path=catalog_path)
         logging.info("action=undo restored_to=%s", restored_to)
         return 0
 
+    if args.resume:
+        resume_moves(
+            journal_path,
+            ledger_path=ledger_path,
+            catalog_path=catalog_path,
+            throttle=throttle,
+            quarantine_path=quarantine_path,
+            claims=cluster_node(options),
+            durability=args.durability,
+        )
+        return 0
+
+    if not args.dry_run and IntentJournal.exists(journal_path):
+        parser.error(f"an interrupted run was found in {journal_path}; rerun with --resume to finish it first")
+
+    if args.apply_plan:
+        plan = load_plan(Path(args.apply_plan))
+        actions, stale = verify_plan(plan)
+        for a in stale:
+            logging.info("action=skip_changed rule=%s src=%s", a.rule_name, a.src)
+        logging.info("action=apply_plan plan=%s valid=%s changed=%s", args.apply_plan, len(actions), len(stale))
+        execute_moves(
+            actions,
+            dry_run=args.dry_run,
+            ledger_path=None if args.dry_run else ledger_path,
+            catalog_path=None if args.dry_run else catalog_path,
+            throttle=throttle,
+            journal_path=journal_path,
+            quarantine_path=None if args.dry_run else quarantine_path,
+            claims=cluster_node(options),
+            durability=args.durability,
+        )
+        return 0
+
     if not args.config:
-        parser.error("--config is required unless --undo-last is provided")
+        parser.error("--config is required unless --undo-last or --apply-plan is provided")
 
     config_path = Path(args.config)
-    cfg = load_config(config_path)
 
-    actions = plan_moves(cfg)
-    execute_moves(
-        actions,
-        dry_run=args.dry_run,
-        ledger_path=None if args.dry_run else ledger_path,
-    )
+    if args.save_plan:
+        cfg = load_config(config_path)
+        actions = plan_moves_compact(cfg, processes=args.plan_processes)
+        saved = save_plan(Path(args.save_plan), actions)
+        logging.info("action=save_plan plan=%s moves=%s", args.save_plan, saved)
+        return 0
+
+    run_config(config_path, options)
+    return 0
+
+
+def _print_rule_order(cfg: Config, stats_path: Path) -> int:
+    for pos, entry in enumerate(explain_order(sorted_rules(cfg), RuleStats(stats_path))):
+        s = entry.stat
+        print(
+            f"{pos}\tpriority={entry.rule.priority}\t{entry.rule.name}\tconfig_position={entry.config_position}"
+            f"\tevaluations={s.evaluations}\thits={s.hits}\thit_rate={s.hit_rate:.3f}\tcost_ns={s.cost_ns:.0f}"
+        )
+    return 0
+
+
+def _print_history(args: argparse.Namespace, *, catalog_path: Path, ledger_path: Path) -> int:
+    with HistoryCatalog(catalog_path) as catalog:
+        if args.import_ledger:
+            imported = catalog.import_ledger(ledger_path)
+            logging.info("action=history_import ledger=%s moves=%s", ledger_path, imported)
 
-    if args.delete_empty_dirs and not args.dry_run:
-        protected = {cfg.source_dir / name for name in cfg.destinations.values()}
-        delete_empty_dirs(cfg.source_dir, protected=protected)
+        if args.daily:
+            for stat in catalog.daily_rule_stats(rule_name=args.rule, since=args.since, until=args.until):
+                print(f"{stat.day}\t{stat.rule_name}\tmoves={stat.moves}\tbytes={stat.bytes}")
+            return 0
 
+        records = catalog.find_moves(
+            name=args.name,
+            rule_name=args.rule,
+            destination=args.destination,
+            since=args.since,
+            until=args.until,
+            limit=args.limit,
+        )
+        for r in records:
+            status = f"\tundone={r.undone_ts}" if r.undone_ts else ""
+            print(f"{r.ts}\t{r.rule_name}\t{r.src} -> {r.dst}\tbytes={r.bytes}{status}")
     return 0
 
 
@@ -1,13 +1,18 @@
 from __future__ import annotations
 
-from src.automation.file_sorter import MoveAction, execute_moves, plan_moves
+from src.automation.compact_plan import CompactPlan
+from src.automation.file_sorter import MoveAction, execute_moves, plan_moves, plan_moves_compact
+from src.config.config_loader import parse_size
 from src.logging.log_manager import setup_logging
 from src.utils.file_helpers import delete_empty_dirs
 
 __all__ = [
+    "CompactPlan",
     "MoveAction",
     "delete_empty_dirs",
     "execute_moves",
+    "parse_size",
     "plan_moves",
+    "plan_moves_compact",
     "setup_logging",
 ]
@@ -2,24 +2,42 @@ from __future__ import annotations
 
 from pathlib import Path
 
-
-def delete_empty_dirs(root: Path, *, protected: set[Path] | None = None) -> None:
-    if not root.exists() or not root.is_dir():
+from src.automation.fs_backend import OS_FILESYSTEM, FileSystem
+from src.automation.ignore_rules import IgnoreRules
+
+
+def delete_empty_dirs(
+    root: Path,
+    *,
+    protected: set[Path] | None = None,
+    ignore: IgnoreRules | None = None,
+    fs: FileSystem = OS_FILESYSTEM,
+) -> None:
+    if not fs.is_dir(root):
         return
 
     protected = protected or set()
-
-    for p in sorted(root.rglob("*"), key=lambda x: len(x.parts), reverse=True):
-        if not p.is_dir() or p == root:
-            continue
-
-        if p in protected:
+    _delete_empty_children(root, "", protected, ignore, fs)
+
+
+def _delete_empty_children(
+    directory: Path,
+    rel: str,
+    protected: set[Path],
+    ignore: IgnoreRules | None,
+    fs: FileSystem,
+) -> bool:
+    # Post-order walk: a directory is removed once everything below it has been. Protected and
+    # ignored directories are never descended into, matching the old rglob filter on their parents.
+    empty = True
+    for name, is_dir in fs.list_dir(directory):
+        p = directory / name
+        child_rel = f"{rel}/{name}" if rel else name
+        if not is_dir or p in protected or (ignore is not None and ignore.is_ignored(child_rel, is_dir=True)):
+            empty = False
             continue
-
-        if any(parent in protected for parent in p.parents):
-            continue
-
-        try:
-            next(p.iterdir())
-        except StopIteration:
-            p.rmdir()
+        if _delete_empty_children(p, child_rel, protected, ignore, fs):
+            fs.rmdir(p)
+        else:
+            empty = False
+    return empty
@@ -5,11 +5,18 @@ from pathlib import Path
 
 import streamlit as st
 
+from src.automation.history_catalog import HistoryCatalog
+from src.automation.ignore_rules import ignore_rules_for
+from src.automation.inbox_analytics import Bucket, inbox_analytics
+from src.automation.quarantine import SOURCE_QUARANTINE
+from src.automation.rules_engine import protected_destination_dirs
+from src.automation.runner import load_config_cached
 from src.automation.undo_manager import undo_last_move
-from src.config_loader import load_config
-from src.utils import delete_empty_dirs, execute_moves, plan_moves
+from src.utils import delete_empty_dirs, execute_moves, plan_moves_compact
 
 
+_MAX_TABLE_ROWS = 5000
+
 THEME_TOKENS = {
     "dark": {
         "bg": "#0f1115",
@@ -229,6 +236,87 @@ def _load_config_from_ui() -> Path:
     return Path(config_path)
 
 
+def _render_history(catalog_file: Path) -> None:
+    st.subheader("Move history")
+    st.caption("Search the indexed catalog of executed moves.")
+
+    if not catalog_file.exists():
+        st.info("No history catalog yet. Execute a run to start recording moves.")
+        return
+
+    col_a, col_b, col_c = st.columns(3)
+    name = col_a.text_input("Filename", value="").strip() or None
+    rule = col_b.text_input("Rule", value="").strip() or None
+    since = col_c.text_input("Since (YYYY-MM-DD)", value="").strip() or None
+
+    with HistoryCatalog(catalog_file) as catalog:
+        records = catalog.find_moves(name=name, rule_name=rule, since=since, limit=200)
+        daily = catalog.daily_rule_stats(rule_name=rule, since=since)
+
+    st.dataframe(
+        [
+            {
+                "ts": r.ts,
+                "rule": r.rule_name,
+                "src": r.src,
+                "dst": r.dst,
+                "bytes": r.bytes,
+                "undone": r.undone_ts or "",
+            }
+            for r in records
+        ],
+        use_container_width=True,
+    )
+
+    st.subheader("Daily totals per rule")
+    st.dataframe(
+        [{"day": d.day, "rule": d.rule_name, "moves": d.moves, "bytes": d.bytes} for d in daily],
+        use_container_width=True,
+    )
+
+
+def _bucket_rows(buckets: list[Bucket], label: str) -> list[dict]:
+    return [{label: b.label, "files": b.files, "MB": round(b.bytes / 1024**2, 2)} for b in buckets]
+
+
+def _render_analytics(cfg_path: Path) -> None:
+    st.subheader("Inbox analytics")
+    st.caption("Computed from one directory scan and reused until the source directory changes.")
+
+    try:
+        stats = inbox_analytics(load_config_cached(cfg_path))
+    except Exception as e:
+        st.error(str(e))
+        return
+
+    metric_a, metric_b = st.columns(2)
+    metric_a.metric("Files in inbox", stats.files)
+    metric_b.metric("Total size (MB)", round(stats.bytes / 1024**2, 2))
+
+    col_a, col_b = st.columns(2)
+    with col_a:
+        st.markdown("#### Size distribution")
+        st.bar_chart(_bucket_rows(stats.size_histogram, "size"), x="size", y="files")
+    with col_b:
+        st.markdown("#### Age distribution")
+        st.bar_chart(_bucket_rows(stats.age_histogram, "age"), x="age", y="files")
+
+    col_c, col_d = st.columns(2)
+    with col_c:
+        st.markdown("#### Top extensions by size")
+        st.dataframe(_bucket_rows(stats.top_extensions, "extension"), use_container_width=True)
+    with col_d:
+        st.markdown("#### Projected size per destination")
+        st.dataframe(_bucket_rows(stats.destinations, "destination"), use_container_width=True)
+
+    st.markdown("#### Unmatched extensions")
+    if stats.unmatched_extensions:
+        st.caption("Files no rule matches; frequent extensions here are candidates for new rules.")
+        st.dataframe(_bucket_rows(stats.unmatched_extensions, "extension"), use_container_width=True)
+    else:
+        st.caption("Every file in the inbox matches a rule.")
+
+
 def main() -> None:
     st.set_page_config(page_title="Personal Automation Tool", layout="wide")
     if "theme" not in st.session_state:
@@ -252,6 +340,13 @@ def main() -> None:
         dry_run = st.checkbox("Dry run", value=True)
         delete_empty = st.checkbox("Delete empty directories after moves", value=False)
         ledger_file = Path(st.text_input("Ledger file", value="logs/move_ledger.jsonl"))
+        catalog_file = Path(st.text_input("History catalog", value="logs/history.sqlite3"))
+        # Matches the CLI default: overwritten files are stashed so undo can bring them back.
+        quarantine_dir = st.text_input(
+            "Quarantine directory",
+            value=str(SOURCE_QUARANTINE),
+            help="Relative paths live under the source directory. Leave empty to delete overwritten files.",
+        )
         st.caption("Executed runs are logged for fast undo support.")
 
     st.markdown(
@@ -276,7 +371,6 @@ def main() -> None:
     st.markdown('<div class="section-spacer"></div>', unsafe_allow_html=True)
 
     actions = st.session_state.get("_actions")
-    cfg = st.session_state.get("_cfg")
     planned_count = len(actions) if actions else 0
 
     metric_a, metric_b, metric_c = st.columns(3)
@@ -286,6 +380,34 @@ def main() -> None:
 
     st.markdown('<div class="section-spacer"></div>', unsafe_allow_html=True)
 
+    run_tab, analytics_tab, history_tab = st.tabs(["Run", "Analytics", "History"])
+    with history_tab:
+        _render_history(catalog_file)
+    with analytics_tab:
+        _render_analytics(cfg_path)
+    with run_tab:
+        _render_run(
+            cfg_path=cfg_path,
+            dry_run=dry_run,
+            delete_empty=delete_empty,
+            ledger_file=ledger_file,
+            catalog_file=catalog_file,
+            quarantine_path=Path(quarantine_dir) if quarantine_dir else None,
+        )
+
+
+def _render_run(
+    *,
+    cfg_path: Path,
+    dry_run: bool,
+    delete_empty: bool,
+    ledger_file: Path,
+    catalog_file: Path,
+    quarantine_path: Path | None,
+) -> None:
+    actions = st.session_state.get("_actions")
+    cfg = st.session_state.get("_cfg")
+
     st.subheader("Action center")
     st.caption("Preview your automation plan or roll back the last execution.")
     col_a, col_b = st.columns(2)
@@ -293,8 +415,8 @@ def main() -> None:
     with col_a:
         if st.button("Plan", type="primary"):
             try:
-                cfg = load_config(cfg_path)
-                actions = plan_moves(cfg)
+                cfg = load_config_cached(cfg_path)
+                actions = plan_moves_compact(cfg)
                 st.session_state["_cfg"] = cfg
                 st.session_state["_actions"] = actions
                 st.success(f"Planned {len(actions)} file actions")
@@ -304,23 +426,17 @@ def main() -> None:
     with col_b:
         if st.button("Undo last move"):
             try:
-                restored_to = undo_last_move(ledger_file)
+                restored_to = undo_last_move(ledger_file, catalog_path=catalog_file)
                 st.success(f"Restored to: {restored_to}")
             except Exception as e:
                 st.error(str(e))
 
     if actions:
         st.subheader("Planned actions")
-        rows = [
-            {
-                "src": str(a.src),
-                "dst": str(a.dst),
-                "rule": a.rule_name,
-                "duplicate_strategy": a.duplicate_strategy,
-            }
-            for a in actions
-        ]
+        rows = actions.to_rows(limit=_MAX_TABLE_ROWS)
         st.dataframe(rows, use_container_width=True)
+        if len(actions) > len(rows):
+            st.caption(f"Showing the first {len(rows)} of {len(actions)} planned actions.")
 
         st.markdown('<div class="section-spacer"></div>', unsafe_allow_html=True)
 
@@ -339,11 +455,13 @@ def main() -> None:
                     actions,
                     dry_run=dry_run,
                     ledger_path=None if dry_run else ledger_file,
+                    catalog_path=None if dry_run else catalog_file,
+                    quarantine_path=quarantine_path,
                 )
 
                 if delete_empty and not dry_run:
-                    protected = {cfg.source_dir / name for name in cfg.destinations.values()}
-                    delete_empty_dirs(cfg.source_dir, protected=protected)
+                    protected = protected_destination_dirs(cfg)
+                    delete_empty_dirs(cfg.source_dir, protected=protected, ignore=ignore_rules_for(cfg.ignore))
 
                 st.success("Done")
             except Exception as e:
@@ -0,0 +1,180 @@
+import json
+from pathlib import Path
+import shutil
+import tarfile
+import zipfile
+
+import pytest
+
+from src.automation import file_sorter
+from src.automation.archiver import write_volume
+from src.automation.file_sorter import resume_moves
+from src.automation.undo_manager import undo_last_move
+from src.config_loader import load_config
+from src.utils import execute_moves, plan_moves_compact
+
+
+def _write_config(tmp_path: Path, inbox: Path, archive_format: str) -> Path:
+    cfg_path = tmp_path / "rules.yaml"
+    cfg_path.write_text(
+        """
+source_dir: {src}
+
+destinations:
+  cold: Cold
+  other: Other
+
+rules:
+  - name: cold
+    extensions: ['.log']
+    destination: cold
+    action: archive
+    archive_format: {fmt}
+    archive_volume_size: 2KB
+""".format(src=str(inbox), fmt=archive_format),
+        encoding="utf-8",
+    )
+    return cfg_path
+
+
+@pytest.mark.parametrize("archive_format", ["tar.gz", "zip"])
+def test_archive_rule_streams_files_into_rolling_volumes(tmp_path: Path, archive_format: str):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    for i in range(5):
+        (inbox / f"app{i}.log").write_bytes(bytes([65 + i]) * 1000)
+    (inbox / "keep.txt").write_text("x", encoding="utf-8")
+
+    cfg = load_config(_write_config(tmp_path, inbox, archive_format))
+    ledger = tmp_path / "ledger.jsonl"
+    execute_moves(plan_moves_compact(cfg), dry_run=False, ledger_path=ledger)
+
+    volumes = sorted((inbox / "Cold").iterdir())
+    assert len(volumes) == 3
+    assert not list(inbox.glob("*.log"))
+
+    members: list[str] = []
+    for v in volumes:
+        if archive_format == "zip":
+            with zipfile.ZipFile(v) as zf:
+                members.extend(zf.namelist())
+        else:
+            with tarfile.open(v) as tf:
+                members.extend(tf.getnames())
+    assert sorted(members) == [f"app{i}.log" for i in range(5)]
+
+    entries = [json.loads(line) for line in ledger.read_text(encoding="utf-8").splitlines()]
+    archived = [e for e in entries if e["action"] == "archive"]
+    assert sorted(e["member"] for e in archived) == [f"app{i}.log" for i in range(5)]
+
+    restored = undo_last_move(ledger)
+    assert restored.parent == inbox
+    assert restored.read_bytes() == bytes([65 + int(restored.stem[-1])]) * 1000
+
+
+def test_archive_dry_run_leaves_files(tmp_path: Path):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    (inbox / "a.log").write_text("x", encoding="utf-8")
+
+    cfg = load_config(_write_config(tmp_path, inbox, "tar"))
+    execute_moves(plan_moves_compact(cfg), dry_run=True)
+
+    assert (inbox / "a.log").exists()
+    assert not (inbox / "Cold").exists()
+
+
+def test_invalid_rule_action_is_rejected(tmp_path: Path):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    cfg_path = _write_config(tmp_path, inbox, "tar")
+    cfg_path.write_text(cfg_path.read_text(encoding="utf-8").replace("action: archive", "action: shred"))
+
+    with pytest.raises(ValueError, match="rule.action"):
+        load_config(cfg_path)
+
+
+def test_archive_groups_sharing_a_directory_get_distinct_volumes(tmp_path: Path):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    for i in range(3):
+        (inbox / f"app{i}.log").write_bytes(b"L" * 1000)
+        (inbox / f"trace{i}.out").write_bytes(b"T" * 1000)
+    cfg_path = _write_config(tmp_path, inbox, "zip")
+    cfg_path.write_text(
+        cfg_path.read_text(encoding="utf-8")
+        + """
+  - name: traces
+    extensions: ['.out']
+    destination: cold
+    action: archive
+    archive_format: zip
+    archive_volume_size: 1MB
+""",
+        encoding="utf-8",
+    )
+
+    execute_moves(plan_moves_compact(load_config(cfg_path)), dry_run=False)
+
+    members: list[str] = []
+    for v in (inbox / "Cold").iterdir():
+        with zipfile.ZipFile(v) as zf:
+            members.extend(zf.namelist())
+    assert sorted(members) == sorted([f"app{i}.log" for i in range(3)] + [f"trace{i}.out" for i in range(3)])
+
+
+def test_crash_while_writing_archives_is_resumed(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    for i in range(5):
+        (inbox / f"app{i}.log").write_bytes(bytes([65 + i]) * 1000)
+    cfg = load_config(_write_config(tmp_path, inbox, "tar"))
+    ledger = tmp_path / "ledger.jsonl"
+    journal = tmp_path / "journal.jsonl"
+    saved = tmp_path / "saved"
+    saved.mkdir()
+
+    def killed_after_writing(jobs, *, on_volume_done):
+        for path, fmt, members in jobs:
+            shutil.copy2(write_volume(path, fmt, members), saved / path.name)
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(file_sorter, "write_volumes", killed_after_writing)
+    with pytest.raises(KeyboardInterrupt):
+        execute_moves(plan_moves_compact(cfg), dry_run=False, ledger_path=ledger, journal_path=journal)
+    monkeypatch.undo()
+    # A killed process never gets to clean up, so its finished volumes are still there.
+    for v in saved.iterdir():
+        shutil.copy2(v, inbox / "Cold" / v.name)
+
+    resume_moves(journal, ledger_path=ledger)
+
+    assert not list(inbox.glob("*.log"))
+    assert len(list((inbox / "Cold").iterdir())) == 3
+    entries = [json.loads(line) for line in ledger.read_text(encoding="utf-8").splitlines()]
+    assert sorted(e["member"] for e in entries) == [f"app{i}.log" for i in range(5)]
+    assert not journal.exists()
+
+
+def test_archive_failure_before_any_volume_is_resumed_from_scratch(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    for i in range(3):
+        (inbox / f"app{i}.log").write_bytes(b"x" * 1000)
+    cfg = load_config(_write_config(tmp_path, inbox, "zip"))
+    journal = tmp_path / "journal.jsonl"
+
+    def disk_error(jobs, *, on_volume_done):
+        raise OSError("I/O error")
+
+    monkeypatch.setattr(file_sorter, "write_volumes", disk_error)
+    with pytest.raises(OSError):
+        execute_moves(plan_moves_compact(cfg), dry_run=False, journal_path=journal)
+    monkeypatch.undo()
+    # Reserved names are given back.
+    assert list((inbox / "Cold").iterdir()) == []
+
+    resume_moves(journal)
+
+    assert not list(inbox.glob("*.log"))
+    assert len(list((inbox / "Cold").iterdir())) == 2
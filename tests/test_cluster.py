@@ -0,0 +1,208 @@
+import json
+from pathlib import Path
+import threading
+
+from src.automation.cluster import ClusterNode, owner
+from src.automation.runner import RunOptions, run_config
+from src.config_loader import load_config
+from src.utils import execute_moves, plan_moves_compact
+
+
+def _write_config(tmp_path: Path, files: int) -> Path:
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    for i in range(files):
+        (inbox / f"f{i:03d}.txt").write_text(str(i), encoding="utf-8")
+    cfg_path = tmp_path / "rules.yaml"
+    cfg_path.write_text(
+        f"""
+source_dir: {inbox}
+
+destinations:
+  docs: Docs
+  other: Other
+
+rules:
+  - name: docs
+    extensions: ['.txt']
+    destination: docs
+""",
+        encoding="utf-8",
+    )
+    return cfg_path
+
+
+def _ledger_sources(path: Path) -> list[str]:
+    if not path.exists():
+        return []
+    return [json.loads(line)["src"] for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_rendezvous_owner_only_reassigns_the_leaving_node() -> None:
+    names = [f"file{i}.pdf" for i in range(3000)]
+    before = {n: owner(n, ["a", "b", "c"]) for n in names}
+    after = {n: owner(n, ["a", "b"]) for n in names}
+
+    assert all(after[n] == before[n] for n in names if before[n] != "c")
+    shares = [sum(1 for n in names if before[n] == node) for node in "abc"]
+    assert min(shares) > 800
+
+
+def test_nodes_split_the_inbox_and_move_every_file_once(tmp_path: Path) -> None:
+    cfg_path = _write_config(tmp_path, 120)
+    lease_dir = tmp_path / "cluster"
+    for node in ["a", "b", "c"]:
+        ClusterNode(lease_dir, node).heartbeat()
+
+    def run(node: str) -> None:
+        run_config(
+            cfg_path,
+            RunOptions(
+                ledger_path=tmp_path / f"ledger.{node}.jsonl",
+                catalog_path=None,
+                journal_path=tmp_path / f"journal.{node}.jsonl",
+                cluster_dir=lease_dir,
+                cluster_node=node,
+            ),
+        )
+
+    threads = [threading.Thread(target=run, args=(node,)) for node in ["a", "b", "c"]]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    moved = [_ledger_sources(tmp_path / f"ledger.{node}.jsonl") for node in ["a", "b", "c"]]
+    assert all(moved)
+    assert sorted(src for per_node in moved for src in per_node) == sorted(
+        str(tmp_path / "inbox" / f"f{i:03d}.txt") for i in range(120)
+    )
+    assert len(list((tmp_path / "inbox" / "Docs").iterdir())) == 120
+    assert list((lease_dir / "claims").iterdir()) == []
+
+
+def test_claims_stop_double_moves_when_membership_views_disagree(tmp_path: Path) -> None:
+    cfg = load_config(_write_config(tmp_path, 200))
+    plan = plan_moves_compact(cfg)
+
+    # Each node thinks it is alone, so both try the whole inbox.
+    def run(node: str) -> None:
+        execute_moves(
+            plan,
+            dry_run=False,
+            ledger_path=tmp_path / f"ledger.{node}.jsonl",
+            batch_size=7,
+            claims=ClusterNode(tmp_path / "cluster", node),
+        )
+
+    threads = [threading.Thread(target=run, args=(node,)) for node in ["a", "b"]]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    moved = _ledger_sources(tmp_path / "ledger.a.jsonl") + _ledger_sources(tmp_path / "ledger.b.jsonl")
+    assert len(moved) == len(set(moved)) == 200
+
+
+def test_expired_leases_drop_members_and_claims_can_be_taken_over(tmp_path: Path) -> None:
+    clock = _Clock()
+    a = ClusterNode(tmp_path, "a", lease_seconds=30, clock=clock)
+    b = ClusterNode(tmp_path, "b", lease_seconds=30, clock=clock)
+    a.heartbeat()
+    b.heartbeat()
+    assert a.members() == b.members() == ["a", "b"]
+
+    src = Path("/inbox/report.pdf")
+    assert a.acquire(src)
+    assert a.acquire(src)
+    assert not b.acquire(src)
+
+    clock.now += 31
+    assert b.members() == ["b"]
+    assert b.acquire(src)
+    assert not a.acquire(src)
+
+    b.release([src])
+    assert a.acquire(src)
+
+
+def test_surviving_node_takes_over_a_dead_peers_files_with_skip_unchanged(tmp_path: Path) -> None:
+    cfg_path = _write_config(tmp_path, 20)
+    lease_dir = tmp_path / "cluster"
+    ClusterNode(lease_dir, "a").heartbeat()
+    ClusterNode(lease_dir, "b").heartbeat()
+    options = RunOptions(
+        ledger_path=None,
+        catalog_path=None,
+        journal_path=None,
+        state_path=tmp_path / "state.json",
+        cluster_dir=lease_dir,
+        cluster_node="a",
+    )
+
+    run_config(cfg_path, options)
+    assert 0 < len(list((tmp_path / "inbox" / "Docs").iterdir())) < 20
+
+    # b dies without moving its shard and its lease runs out.
+    (lease_dir / "members" / "b.json").write_text(json.dumps({"node": "b", "expires": 0}), encoding="utf-8")
+    result = run_config(cfg_path, options)
+
+    assert not result.skipped
+    assert len(list((tmp_path / "inbox" / "Docs").iterdir())) == 20
+
+
+def test_claims_hold_across_hosts_that_mount_the_inbox_at_different_paths(tmp_path: Path) -> None:
+    cfg_path = _write_config(tmp_path, 3)
+    mount = tmp_path / "mnt"
+    mount.mkdir()
+    (mount / "inbox").symlink_to(tmp_path / "inbox")
+    cfg_b_path = tmp_path / "rules_b.yaml"
+    cfg_b_path.write_text(
+        cfg_path.read_text(encoding="utf-8").replace(str(tmp_path / "inbox"), str(mount / "inbox")),
+        encoding="utf-8",
+    )
+    plan_a = plan_moves_compact(load_config(cfg_path))
+    plan_b = plan_moves_compact(load_config(cfg_b_path))
+    assert plan_a[0].src != plan_b[0].src
+
+    a = ClusterNode(tmp_path / "cluster", "a")
+    b = ClusterNode(tmp_path / "cluster", "b")
+    assert a.acquire(plan_a[0].src)
+    assert not b.acquire(plan_b[0].src)
+
+    # b sees the whole inbox as claimed by a, so none of its moves go ahead.
+    for move in plan_a:
+        a.acquire(move.src)
+    execute_moves(plan_b, dry_run=False, ledger_path=tmp_path / "ledger.b.jsonl", claims=b)
+    assert _ledger_sources(tmp_path / "ledger.b.jsonl") == []
+    assert sorted(p.name for p in (tmp_path / "inbox").glob("*.txt")) == ["f000.txt", "f001.txt", "f002.txt"]
+
+
+def test_keepalive_renews_held_claims_and_drops_expired_ones(tmp_path: Path) -> None:
+    clock = _Clock()
+    a = ClusterNode(tmp_path, "a", lease_seconds=30, clock=clock)
+    b = ClusterNode(tmp_path, "b", lease_seconds=30, clock=clock)
+    kept, lost = Path("/inbox/kept.pdf"), Path("/inbox/lost.pdf")
+    assert a.acquire(kept)
+
+    for _ in range(4):
+        clock.now += 20
+        a.keepalive()
+    assert a.holds(kept)
+    assert not b.acquire(kept)
+
+    # A stall longer than the lease: whatever expired meanwhile may already be someone else's.
+    assert a.acquire(lost)
+    clock.now += 31
+    assert b.acquire(lost)
+    a.keepalive()
+    assert a.held == set()
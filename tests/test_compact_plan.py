@@ -0,0 +1,86 @@
+from pathlib import Path
+import tracemalloc
+
+from src.automation.compact_plan import CompactPlan
+from src.config_loader import load_config
+from src.utils import MoveAction, execute_moves, plan_moves, plan_moves_compact
+
+
+def test_compact_plan_matches_regular_plan_and_executes(tmp_path: Path):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    for name in ["a.pdf", "b.png", "c.bin"]:
+        (inbox / name).write_text("x", encoding="utf-8")
+
+    cfg_path = tmp_path / "rules.yaml"
+    cfg_path.write_text(
+        """
+source_dir: {src}
+
+destinations:
+  docs: Docs
+  other: Other
+
+rules:
+  - name: docs
+    extensions: ['.pdf']
+    destination: docs
+""".format(src=str(inbox)),
+        encoding="utf-8",
+    )
+    cfg = load_config(cfg_path)
+
+    regular = [(a.src, a.dst, a.rule_name, a.duplicate_strategy) for a in plan_moves(cfg)]
+    compact = plan_moves_compact(cfg)
+    assert [(a.src, a.dst, a.rule_name, a.duplicate_strategy) for a in compact] == regular
+    assert [r["dst"] for r in compact.to_rows()] == [str(r[1]) for r in regular]
+
+    execute_moves(compact, dry_run=False)
+    assert (inbox / "Docs" / "a.pdf").exists()
+    assert (inbox / "Other" / "c.bin").exists()
+
+
+def test_compact_plan_uses_an_order_of_magnitude_less_memory():
+    count = 20_000
+    src_dir = "/data/inbox"
+    dst_dir = "/data/inbox/Documents"
+
+    tracemalloc.start()
+    actions = [
+        MoveAction(
+            src=Path(src_dir) / f"file_{i:07d}.pdf",
+            dst=Path(dst_dir) / f"file_{i:07d}.pdf",
+            rule_name="documents",
+            duplicate_strategy="skip",
+        )
+        for i in range(count)
+    ]
+    for a in actions:
+        str(a.src), str(a.dst)
+    regular_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del actions
+
+    tracemalloc.start()
+    plan = CompactPlan()
+    for i in range(count):
+        plan.append(src_dir, f"file_{i:07d}.pdf", dst_dir, "documents", "skip")
+    compact_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    assert len(plan) == count
+    assert plan[count - 1].dst == Path(dst_dir) / f"file_{count - 1:07d}.pdf"
+    assert compact_bytes * 10 < regular_bytes
+
+
+def test_slice_keeps_names_and_renamed_destinations():
+    plan = CompactPlan()
+    for i in range(6):
+        plan.append("/in", f"f{i}.txt", "/in/Docs", "docs", "skip", dst_name=f"g{i}.txt" if i == 4 else None)
+
+    tail = plan.slice(3)
+    assert [str(a.src) for a in tail] == ["/in/f3.txt", "/in/f4.txt", "/in/f5.txt"]
+    assert tail.dst_name(1) == "g4.txt"
+    assert tail.to_rows() == plan.to_rows()[3:]
+    assert len(plan.slice(2, 2)) == 0
+    assert plan.slice(0, 100).to_rows() == plan.to_rows()
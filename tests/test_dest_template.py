@@ -0,0 +1,117 @@
+from datetime import datetime
+import os
+from pathlib import Path
+
+import pytest
+
+from src.automation.dest_template import DestinationTemplate, static_prefix, template_fields
+from src.automation.fs_backend import OSFileSystem
+from src.automation.rules_engine import protected_destination_dirs
+from src.config_loader import load_config
+from src.utils import delete_empty_dirs, execute_moves, plan_moves, plan_moves_compact
+
+
+def test_render_template_components() -> None:
+    template = DestinationTemplate("Images/{mtime:%Y}/{mtime:%m}")
+    mtime = datetime(2024, 3, 9, 12, 0).timestamp()
+    assert template.needs_mtime
+    assert template.render("a.jpg", int(mtime * 1e9)) == os.path.join("Images", "2024", "03")
+
+    by_letter = DestinationTemplate("Docs/{name[0]}/{ext}")
+    assert not by_letter.needs_mtime
+    assert by_letter.render("Report.PDF") == os.path.join("Docs", "R", "pdf")
+    assert by_letter.render("..hidden") == os.path.join("Docs", "_", "hidden")
+    assert static_prefix("Docs/{name[0]}/{ext}") == "Docs"
+
+
+def test_template_fields_reject_unknown_fields() -> None:
+    assert template_fields("A/{stem}-{mtime:%Y}") == {"stem", "mtime"}
+    with pytest.raises(ValueError):
+        template_fields("A/{name.__class__}")
+    with pytest.raises(ValueError):
+        template_fields("A/{size}")
+
+
+@pytest.mark.parametrize("folder", ["A/{name[-1]}", "A/{stem[x]}", "A/{mtime[0]}", "A/{stem:%Y}"])
+def test_templates_that_can_never_render_are_rejected_at_load(folder: str) -> None:
+    with pytest.raises(ValueError, match="Invalid destination template"):
+        template_fields(folder)
+    # Out-of-range indexes depend on the file name and still render as "_".
+    assert DestinationTemplate("A/{name[40]}").render("a.txt") == os.path.join("A", "_")
+
+
+def test_templated_destinations_fan_out_and_stay_protected(tmp_path: Path) -> None:
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    for name, year in [("a.jpg", 2023), ("b.jpg", 2024), ("c.jpg", 2024)]:
+        p = inbox / name
+        p.write_bytes(b"x")
+        ts = datetime(year, 6, 1).timestamp()
+        os.utime(p, (ts, ts))
+
+    cfg_path = tmp_path / "rules.yaml"
+    cfg_path.write_text(
+        f"""
+source_dir: {inbox}
+
+destinations:
+  images: "Images/{{mtime:%Y}}"
+  other: Other
+
+rules:
+  - name: images
+    extensions: ['.jpg']
+    destination: images
+""",
+        encoding="utf-8",
+    )
+    cfg = load_config(cfg_path)
+
+    plan = plan_moves_compact(cfg)
+    assert sorted({os.path.basename(d) for d in plan.dirs} - {"inbox"}) == ["2023", "2024"]
+
+    execute_moves(plan, dry_run=False)
+    assert (inbox / "Images" / "2023" / "a.jpg").exists()
+    assert (inbox / "Images" / "2024" / "c.jpg").exists()
+
+    protected = protected_destination_dirs(cfg)
+    assert protected == {inbox / "Images", inbox / "Other"}
+    delete_empty_dirs(inbox, protected=protected)
+    assert (inbox / "Images" / "2024" / "b.jpg").exists()
+
+
+class _VanishingFileSystem(OSFileSystem):
+    def stat(self, path: Path) -> os.stat_result:
+        # Simulates another cluster node taking the file between the scan and the template's mtime lookup.
+        if path.name == "b.jpg" and path.exists():
+            path.unlink()
+        return super().stat(path)
+
+
+def test_files_that_vanish_before_their_template_renders_are_skipped(tmp_path: Path) -> None:
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    for name in ["a.jpg", "b.jpg"]:
+        (inbox / name).write_bytes(b"x")
+
+    cfg_path = tmp_path / "rules.yaml"
+    cfg_path.write_text(
+        f"""
+source_dir: {inbox}
+
+destinations:
+  images: "Images/{{mtime:%Y}}"
+  other: Other
+
+rules:
+  - name: images
+    extensions: ['.jpg']
+    destination: images
+""",
+        encoding="utf-8",
+    )
+    cfg = load_config(cfg_path)
+
+    assert [a.src.name for a in plan_moves(cfg, fs=_VanishingFileSystem())] == ["a.jpg"]
+    (inbox / "b.jpg").write_bytes(b"x")
+    assert [m.src.name for m in plan_moves_compact(cfg, fs=_VanishingFileSystem())] == ["a.jpg"]
@@ -0,0 +1,183 @@
+import errno
+import json
+from pathlib import Path
+
+import pytest
+
+from src.automation.fs_backend import MemoryFileSystem, OSFileSystem
+from src.config.config_loader import Config, Rule
+from src.config_loader import load_config
+from src.utils import execute_moves, plan_moves_compact
+
+
+def _config(source: Path = Path("/inbox")) -> Config:
+    return Config(
+        source_dir=source,
+        destinations={"docs": "Docs", "other": "Other"},
+        rules=[
+            Rule(
+                name="docs",
+                extensions=[".txt"],
+                pattern=None,
+                regex=None,
+                priority=0,
+                destination="docs",
+                duplicate_strategy="skip",
+            )
+        ],
+        default_duplicate_strategy="skip",
+    )
+
+
+def _ledger_lines(ledger: Path) -> int:
+    return len(ledger.read_text(encoding="utf-8").splitlines()) if ledger.exists() else 0
+
+
+class _RecordingFileSystem(MemoryFileSystem):
+    # Notes how much of the ledger was on disk whenever a directory was synced.
+    def __init__(self, ledger: Path, *, same_device: bool = True) -> None:
+        super().__init__()
+        self.ledger = ledger
+        self.dir_syncs: list[tuple[str, int]] = []
+        self.file_syncs: list[str] = []
+        self._same = same_device
+
+    def fsync_dir(self, directory: Path) -> None:
+        super().fsync_dir(directory)
+        self.dir_syncs.append((str(directory), _ledger_lines(self.ledger)))
+
+    def fsync(self, path: Path) -> None:
+        super().fsync(path)
+        self.file_syncs.append(str(path))
+
+    def same_device(self, a: Path, b: Path) -> bool:
+        return self._same
+
+
+def _inbox(fs: MemoryFileSystem, count: int) -> None:
+    fs.mkdir(Path("/inbox"))
+    for i in range(count):
+        fs.write_file(f"/inbox/f{i:05d}.{'txt' if i % 2 else 'bin'}", b"x")
+
+
+def test_batch_durability_syncs_each_directory_once_per_batch_before_the_ledger(tmp_path: Path) -> None:
+    ledger = tmp_path / "ledger.jsonl"
+    fs = _RecordingFileSystem(ledger)
+    _inbox(fs, 1200)
+
+    execute_moves(plan_moves_compact(_config(), fs=fs), dry_run=False, fs=fs, ledger_path=ledger, durability="batch")
+
+    dirs = ["/inbox", "/inbox/Docs", "/inbox/Other"]
+    assert fs.dir_syncs == [(d, done) for done in (0, 500, 1000) for d in dirs]
+    assert fs.file_syncs == []
+    assert _ledger_lines(ledger) == 1200
+
+
+def test_strict_durability_syncs_after_every_move(tmp_path: Path) -> None:
+    ledger = tmp_path / "ledger.jsonl"
+    fs = _RecordingFileSystem(ledger)
+    _inbox(fs, 6)
+
+    execute_moves(plan_moves_compact(_config(), fs=fs), dry_run=False, fs=fs, ledger_path=ledger, durability="strict")
+
+    assert [done for _d, done in fs.dir_syncs] == [0, 0, 1, 1, 2, 2, 3, 3, 4, 4, 5, 5]
+    assert _ledger_lines(ledger) == 6
+
+
+def test_cross_device_moves_sync_file_data_and_none_skips_syncing(tmp_path: Path) -> None:
+    ledger = tmp_path / "ledger.jsonl"
+    fs = _RecordingFileSystem(ledger, same_device=False)
+    _inbox(fs, 4)
+    execute_moves(plan_moves_compact(_config(), fs=fs), dry_run=False, fs=fs, ledger_path=ledger, durability="batch")
+    assert sorted(fs.file_syncs) == [
+        "/inbox/Docs/f00001.txt",
+        "/inbox/Docs/f00003.txt",
+        "/inbox/Other/f00000.bin",
+        "/inbox/Other/f00002.bin",
+    ]
+
+    fs = _RecordingFileSystem(tmp_path / "other.jsonl")
+    _inbox(fs, 4)
+    execute_moves(plan_moves_compact(_config(), fs=fs), dry_run=False, fs=fs, ledger_path=fs.ledger)
+    assert fs.dir_syncs == [] and fs.file_syncs == []
+    assert _ledger_lines(fs.ledger) == 4
+
+
+def test_moves_before_a_failure_are_still_ledgered(tmp_path: Path) -> None:
+    ledger = tmp_path / "ledger.jsonl"
+    fs = MemoryFileSystem()
+    _inbox(fs, 10)
+    plan = plan_moves_compact(_config(), fs=fs)
+    moved = 0
+    real_move = fs.move
+
+    def fail_on_fourth(src: Path, dst: Path, **kwargs: object) -> None:
+        nonlocal moved
+        if moved == 3:
+            raise OSError(errno.ENOSPC, "No space left on device", str(dst))
+        real_move(src, dst, **kwargs)
+        moved += 1
+
+    fs.move = fail_on_fourth  # type: ignore[method-assign]
+    with pytest.raises(OSError):
+        execute_moves(plan, dry_run=False, fs=fs, ledger_path=ledger, durability="batch")
+
+    entries = [json.loads(line) for line in ledger.read_text(encoding="utf-8").splitlines()]
+    assert len(entries) == 3
+    assert all(not fs.exists(Path(e["src"])) and fs.exists(Path(e["dst"])) for e in entries)
+
+
+def test_batch_durability_runs_on_disk_and_rejects_unknown_levels(tmp_path: Path) -> None:
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    (inbox / "a.txt").write_text("a", encoding="utf-8")
+    ledger = tmp_path / "ledger.jsonl"
+
+    execute_moves(plan_moves_compact(_config(inbox)), dry_run=False, ledger_path=ledger, durability="batch")
+    assert (inbox / "Docs" / "a.txt").exists()
+    assert _ledger_lines(ledger) == 1
+
+    with pytest.raises(ValueError, match="durability"):
+        execute_moves([], dry_run=False, durability="paranoid")
+
+
+class _ArchiveSyncRecorder(OSFileSystem):
+    def __init__(self, inbox: Path) -> None:
+        self.inbox = inbox
+        self.synced_volumes: list[tuple[str, int]] = []
+
+    def fsync(self, path: Path) -> None:
+        super().fsync(path)
+        if path.is_file():
+            self.synced_volumes.append((path.name, len(list(self.inbox.glob("*.log")))))
+
+
+@pytest.mark.parametrize("durability", ["batch", "strict"])
+def test_archive_volumes_are_synced_before_their_sources_are_removed(tmp_path: Path, durability: str) -> None:
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    for i in range(4):
+        (inbox / f"app{i}.log").write_bytes(b"x" * 1000)
+    cfg_path = tmp_path / "rules.yaml"
+    cfg_path.write_text(
+        f"""
+source_dir: {inbox}
+destinations:
+  cold: Cold
+rules:
+  - name: cold
+    extensions: ['.log']
+    destination: cold
+    action: archive
+    archive_format: tar
+    archive_volume_size: 1MB
+""",
+        encoding="utf-8",
+    )
+    fs = _ArchiveSyncRecorder(inbox)
+
+    execute_moves(plan_moves_compact(load_config(cfg_path)), dry_run=False, fs=fs, durability=durability)
+
+    [volume] = list((inbox / "Cold").iterdir())
+    assert fs.synced_volumes == [(volume.name, 4)]
+    assert not list(inbox.glob("*.log"))
@@ -0,0 +1,90 @@
+from pathlib import Path
+
+import pytest
+
+from src.automation.fs_backend import FileSystem, MemoryFileSystem
+from src.automation.undo_manager import undo_last_move
+from src.config.config_loader import Config, Rule
+from src.utils import delete_empty_dirs, execute_moves, plan_moves_compact
+
+
+def _config(duplicate_strategy: str = "skip") -> Config:
+    return Config(
+        source_dir=Path("/inbox"),
+        destinations={"docs": "Docs", "other": "Other"},
+        rules=[
+            Rule(
+                name="docs",
+                extensions=[".txt"],
+                pattern=None,
+                regex=None,
+                priority=0,
+                destination="docs",
+                duplicate_strategy=duplicate_strategy,
+            )
+        ],
+        default_duplicate_strategy="skip",
+    )
+
+
+def test_memory_backend_runs_plan_execute_undo_and_cleanup(tmp_path: Path) -> None:
+    fs = MemoryFileSystem()
+    fs.mkdir(Path("/inbox/empty/nested"))
+    fs.mkdir(Path("/inbox/Docs"))
+    fs.write_file("/inbox/b.jpg", b"img")
+    fs.write_file("/inbox/a.txt", b"new")
+    fs.write_file("/inbox/Docs/a.txt", b"old")
+    fs.reset_counts()
+
+    cfg = _config("overwrite")
+    ledger = tmp_path / "ledger.jsonl"
+    execute_moves(
+        plan_moves_compact(cfg, fs=fs),
+        dry_run=False,
+        ledger_path=ledger,
+        quarantine_path=Path("/quarantine"),
+        fs=fs,
+    )
+
+    assert fs.read_bytes("/inbox/Docs/a.txt") == b"new"
+    assert fs.read_bytes("/inbox/Other/b.jpg") == b"img"
+    assert fs.op_counts["scandir"] == 1
+    assert fs.op_counts["rename"] == 3  # two moves plus the quarantined target
+
+    delete_empty_dirs(Path("/inbox"), protected={Path("/inbox/Docs"), Path("/inbox/Other")}, fs=fs)
+    assert not fs.exists(Path("/inbox/empty"))
+    assert fs.exists(Path("/inbox/Docs"))
+
+    undo_last_move(ledger, fs=fs)
+    assert fs.read_bytes("/inbox/a.txt") == b"new"
+    assert fs.read_bytes("/inbox/Docs/a.txt") == b"old"
+
+
+def test_memory_backend_counts_ops_and_latency_at_scale() -> None:
+    fs = MemoryFileSystem(latency={"rename": 0.002, "*": 0.0005})
+    fs.mkdir(Path("/inbox"))
+    count = 20_000
+    for i in range(count):
+        fs.write_file(f"/inbox/f{i:05d}.{'txt' if i % 2 else 'bin'}")
+    fs.reset_counts()
+
+    plan = plan_moves_compact(_config(), fs=fs)
+    execute_moves(plan, dry_run=False, fs=fs)
+
+    assert len(plan) == count
+    assert fs.op_counts["rename"] == count
+    assert fs.op_counts["scandir"] == 1
+    # One existence check per destination, and target directories are created once up front.
+    assert fs.op_counts["stat"] == count + 1
+    assert fs.op_counts["mkdir"] == 2
+    assert fs.latency_seconds == pytest.approx(count * 0.002 + (count + 4) * 0.0005)
+    assert len(fs.scandir_files(Path("/inbox/Docs"))) == count // 2
+
+
+def test_backends_must_implement_every_primitive() -> None:
+    class Partial(FileSystem):
+        def scandir_files(self, directory: Path) -> list[str]:
+            return []
+
+    with pytest.raises(TypeError, match="abstract"):
+        Partial()
@@ -0,0 +1,177 @@
+from datetime import datetime
+import json
+from pathlib import Path
+import sqlite3
+
+from src.automation import file_sorter
+
+from src.automation.history_catalog import HistoryCatalog
+from src.automation.undo_manager import undo_last_move
+from src.config_loader import load_config
+from src.utils import execute_moves, plan_moves
+
+
+def _write_config(tmp_path: Path, inbox: Path) -> Path:
+    cfg_path = tmp_path / "rules.yaml"
+    cfg_path.write_text(
+        """
+source_dir: {src}
+
+destinations:
+  docs: Docs
+  images: Images
+  other: Other
+
+rules:
+  - name: docs
+    extensions: ['.pdf']
+    destination: docs
+  - name: images
+    extensions: ['.png']
+    destination: images
+""".format(src=str(inbox)),
+        encoding="utf-8",
+    )
+    return cfg_path
+
+
+def test_execute_moves_records_history_and_daily_rollups(tmp_path: Path):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    (inbox / "invoice_2291.pdf").write_text("12345", encoding="utf-8")
+    (inbox / "b.pdf").write_text("123", encoding="utf-8")
+    (inbox / "c.png").write_text("1", encoding="utf-8")
+
+    cfg = load_config(_write_config(tmp_path, inbox))
+    catalog_path = tmp_path / "history.sqlite3"
+    execute_moves(plan_moves(cfg), dry_run=False, catalog_path=catalog_path)
+
+    with HistoryCatalog(catalog_path) as catalog:
+        found = catalog.find_moves(name="invoice_2291.pdf")
+        assert len(found) == 1
+        assert Path(found[0].dst) == inbox / "Docs" / "invoice_2291.pdf"
+        assert found[0].bytes == 5
+
+        stats = {s.rule_name: (s.moves, s.bytes) for s in catalog.daily_rule_stats()}
+        assert stats == {"docs": (2, 8), "images": (1, 1)}
+
+
+def test_undo_marks_catalog_entry_and_updates_rollup(tmp_path: Path):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    (inbox / "a.pdf").write_text("xx", encoding="utf-8")
+
+    cfg = load_config(_write_config(tmp_path, inbox))
+    ledger = tmp_path / "ledger.jsonl"
+    catalog_path = tmp_path / "history.sqlite3"
+    execute_moves(plan_moves(cfg), dry_run=False, ledger_path=ledger, catalog_path=catalog_path)
+
+    undo_last_move(ledger, catalog_path=catalog_path)
+
+    with HistoryCatalog(catalog_path) as catalog:
+        assert catalog.find_moves(name="a.pdf", include_undone=False) == []
+        assert catalog.find_moves(name="a.pdf")[0].undone_ts is not None
+        assert [(s.moves, s.bytes) for s in catalog.daily_rule_stats(rule_name="docs")] == [(0, 0)]
+
+
+def test_importing_a_ledger_twice_adds_nothing(tmp_path: Path):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    (inbox / "a.pdf").write_text("xx", encoding="utf-8")
+    (inbox / "b.png").write_text("y", encoding="utf-8")
+
+    cfg = load_config(_write_config(tmp_path, inbox))
+    ledger = tmp_path / "ledger.jsonl"
+    catalog_path = tmp_path / "history.sqlite3"
+    execute_moves(plan_moves(cfg), dry_run=False, ledger_path=ledger, catalog_path=catalog_path)
+
+    with HistoryCatalog(catalog_path) as catalog:
+        # The run already recorded every ledger entry.
+        assert catalog.import_ledger(ledger) == 0
+        assert catalog.import_ledger(ledger) == 0
+        assert len(catalog.find_moves()) == 2
+        stats = {s.rule_name: (s.moves, s.bytes) for s in catalog.daily_rule_stats()}
+        assert stats == {"docs": (1, 2), "images": (1, 1)}
+
+    fresh_path = tmp_path / "fresh.sqlite3"
+    with HistoryCatalog(fresh_path) as fresh:
+        assert fresh.import_ledger(ledger) == 2
+        assert fresh.import_ledger(ledger) == 0
+        assert sum(s.moves for s in fresh.daily_rule_stats()) == 2
+
+    # Ledgers written before entries had ids import by count, so real repeats within one second are kept.
+    legacy = tmp_path / "legacy.jsonl"
+    lines = []
+    for line in ledger.read_text(encoding="utf-8").splitlines():
+        payload = json.loads(line)
+        del payload["entry_id"]
+        lines.append(json.dumps(payload))
+    legacy.write_text("\n".join(lines + lines[:1]) + "\n", encoding="utf-8")
+    with HistoryCatalog(tmp_path / "legacy.sqlite3") as catalog:
+        assert catalog.import_ledger(legacy) == 3
+        assert catalog.import_ledger(legacy) == 0
+        assert len(catalog.find_moves()) == 3
+
+    # Catalogs created with the old (ts, src, dst) unique index get the entry id column and lose that index.
+    conn = sqlite3.connect(str(tmp_path / "legacy.sqlite3"))
+    with conn:
+        conn.execute("DROP INDEX idx_moves_entry_id")
+        conn.execute("ALTER TABLE moves DROP COLUMN entry_id")
+        conn.execute("DELETE FROM moves WHERE id = (SELECT MAX(id) FROM moves)")
+        conn.execute("CREATE UNIQUE INDEX idx_moves_entry ON moves(ts, src, dst)")
+    conn.close()
+    with HistoryCatalog(tmp_path / "legacy.sqlite3") as catalog:
+        assert catalog.import_ledger(legacy) == 1
+        assert catalog.import_ledger(legacy) == 0
+        assert len(catalog.find_moves()) == 3
+
+
+def test_importing_a_ledger_applies_its_undo_markers(tmp_path: Path):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    (inbox / "a.pdf").write_text("xx", encoding="utf-8")
+
+    cfg = load_config(_write_config(tmp_path, inbox))
+    ledger = tmp_path / "ledger.jsonl"
+    execute_moves(plan_moves(cfg), dry_run=False, ledger_path=ledger)
+    undo_last_move(ledger)
+
+    with HistoryCatalog(tmp_path / "history.sqlite3") as catalog:
+        assert catalog.import_ledger(ledger) == 1
+        assert catalog.import_ledger(ledger) == 0
+        assert catalog.find_moves(name="a.pdf", include_undone=False) == []
+        assert [(s.moves, s.bytes) for s in catalog.daily_rule_stats(rule_name="docs")] == [(0, 0)]
+
+
+class _FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2026, 1, 2, 3, 4, 5)
+
+
+def test_a_move_repeated_within_the_same_second_is_recorded(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(file_sorter, "datetime", _FrozenDatetime)
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    (inbox / "a.pdf").write_text("xx", encoding="utf-8")
+
+    cfg = load_config(_write_config(tmp_path, inbox))
+    ledger = tmp_path / "ledger.jsonl"
+    catalog_path = tmp_path / "history.sqlite3"
+    execute_moves(plan_moves(cfg), dry_run=False, ledger_path=ledger, catalog_path=catalog_path)
+    undo_last_move(ledger, catalog_path=catalog_path)
+    execute_moves(plan_moves(cfg), dry_run=False, ledger_path=ledger, catalog_path=catalog_path)
+
+    with HistoryCatalog(catalog_path) as catalog:
+        moves = catalog.find_moves(name="a.pdf")
+        assert len(moves) == 2
+        assert moves[0].ts == moves[1].ts
+        assert [m.undone_ts is None for m in moves] == [True, False]
+        assert [(s.moves, s.bytes) for s in catalog.daily_rule_stats(rule_name="docs")] == [(1, 2)]
+        assert catalog.import_ledger(ledger) == 0
+        assert [(s.moves, s.bytes) for s in catalog.daily_rule_stats(rule_name="docs")] == [(1, 2)]
+
+    with HistoryCatalog(tmp_path / "fresh.sqlite3") as fresh:
+        assert fresh.import_ledger(ledger) == 2
+        assert [m.undone_ts is None for m in fresh.find_moves(name="a.pdf")] == [True, False]
+        assert [s.moves for s in fresh.daily_rule_stats(rule_name="docs")] == [1]
@@ -0,0 +1,90 @@
+import os
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.automation import inbox_analytics as analytics  # noqa: E402
+from src.automation.inbox_analytics import compute_analytics, inbox_analytics, scan_columns  # noqa: E402
+from src.config_loader import load_config  # noqa: E402
+
+NOW = 1_800_000_000.0
+
+
+def _make_inbox(tmp_path: Path) -> Path:
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    (inbox / "Docs").mkdir()
+    files = {
+        "a.pdf": (500, 0.5),
+        "b.PDF": (200_000, 3),
+        "c.jpg": (5 * 1024**2, 40),
+        "d.xyz": (10, 400),
+        "e.xyz": (20, 2),
+        "README": (30, 2),
+    }
+    for name, (size, age_days) in files.items():
+        p = inbox / name
+        p.write_bytes(b"x" * size)
+        mtime = NOW - age_days * 86400
+        os.utime(p, (mtime, mtime))
+
+    cfg_path = tmp_path / "rules.yaml"
+    cfg_path.write_text(
+        f"""
+source_dir: {inbox}
+
+destinations:
+  docs: Docs
+  images: Images
+  other: Other
+
+rules:
+  - name: docs
+    extensions: ['.pdf']
+    destination: docs
+  - name: images
+    extensions: ['.jpg']
+    destination: images
+""",
+        encoding="utf-8",
+    )
+    return cfg_path
+
+
+def test_compute_analytics_aggregates_columns(tmp_path: Path) -> None:
+    cfg = load_config(_make_inbox(tmp_path))
+    columns = scan_columns(cfg.source_dir)
+    stats = compute_analytics(cfg, columns, now=NOW)
+
+    assert stats.files == 6
+    assert stats.bytes == 500 + 200_000 + 5 * 1024**2 + 60
+    assert [b.files for b in stats.size_histogram] == [4, 0, 1, 1, 0, 0, 0]
+    assert [b.files for b in stats.age_histogram] == [1, 3, 0, 1, 0, 1]
+
+    assert [(b.label, b.files) for b in stats.top_extensions[:2]] == [(".jpg", 1), (".pdf", 2)]
+    assert [(b.label, b.files, b.bytes) for b in stats.unmatched_extensions] == [
+        (".xyz", 2, 30),
+        ("(none)", 1, 30),
+    ]
+    assert {b.label: b.bytes for b in stats.destinations} == {
+        "Images": 5 * 1024**2,
+        "Docs": 200_500,
+        "Other": 60,
+    }
+
+
+def test_inbox_analytics_is_cached_until_directory_changes(tmp_path: Path, monkeypatch) -> None:
+    cfg = load_config(_make_inbox(tmp_path))
+    first = inbox_analytics(cfg)
+
+    def fail(_source_dir):
+        raise AssertionError("unchanged directory should not be rescanned")
+
+    monkeypatch.setattr(analytics, "scan_columns", fail)
+    assert inbox_analytics(cfg) is first
+
+    monkeypatch.undo()
+    (cfg.source_dir / "f.jpg").write_bytes(b"y")
+    assert inbox_analytics(cfg).files == 7
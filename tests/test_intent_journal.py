@@ -0,0 +1,194 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from src.automation import file_sorter
+from src.automation.compact_plan import CompactPlan
+from src.automation.file_sorter import resume_moves
+from src.automation.fs_backend import MemoryFileSystem
+from src.automation.intent_journal import IntentJournal
+from src.automation.retry import Retrier
+from src.config.config_loader import Config, Rule
+from src.config_loader import load_config
+from src.utils import execute_moves, plan_moves_compact
+
+
+def _make_inbox(tmp_path: Path, count: int) -> Path:
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    for i in range(count):
+        (inbox / f"f{i:02d}.txt").write_text(str(i), encoding="utf-8")
+
+    cfg_path = tmp_path / "rules.yaml"
+    cfg_path.write_text(
+        """
+source_dir: {src}
+
+destinations:
+  docs: Docs
+  other: Other
+
+rules:
+  - name: docs
+    extensions: ['.txt']
+    destination: docs
+""".format(src=str(inbox)),
+        encoding="utf-8",
+    )
+    return cfg_path
+
+
+def test_resume_finishes_interrupted_run_and_ledgers_in_flight_move(tmp_path: Path, monkeypatch):
+    cfg = load_config(_make_inbox(tmp_path, 10))
+    inbox = cfg.source_dir
+    ledger = tmp_path / "ledger.jsonl"
+    journal = tmp_path / "journal.jsonl"
+
+    real_append = file_sorter.append_ledger_entry
+    calls = {"n": 0}
+
+    def crashing_append(path, entry):
+        calls["n"] += 1
+        if calls["n"] == 6:
+            raise KeyboardInterrupt("killed")
+        real_append(path, entry)
+
+    monkeypatch.setattr(file_sorter, "append_ledger_entry", crashing_append)
+    with pytest.raises(KeyboardInterrupt):
+        execute_moves(plan_moves_compact(cfg), dry_run=False, ledger_path=ledger, journal_path=journal, batch_size=4)
+    monkeypatch.setattr(file_sorter, "append_ledger_entry", real_append)
+
+    assert IntentJournal.exists(journal)
+    state = IntentJournal.load(journal)
+    assert state.done == {0}
+    assert state.in_flight is not None and state.in_flight[0] == 1
+
+    # Files arriving after the interrupted run was planned must not be picked up by the resume.
+    (inbox / "late.txt").write_text("late", encoding="utf-8")
+
+    resume_moves(journal, ledger_path=ledger)
+
+    assert not IntentJournal.exists(journal)
+    assert sorted(p.name for p in (inbox / "Docs").iterdir()) == [f"f{i:02d}.txt" for i in range(10)]
+    assert (inbox / "late.txt").exists()
+
+    entries = [json.loads(line) for line in ledger.read_text(encoding="utf-8").splitlines()]
+    assert sorted(Path(e["src"]).name for e in entries) == [f"f{i:02d}.txt" for i in range(10)]
+
+
+def test_completed_run_removes_journal(tmp_path: Path):
+    cfg = load_config(_make_inbox(tmp_path, 3))
+    journal = tmp_path / "journal.jsonl"
+
+    execute_moves(plan_moves_compact(cfg), dry_run=False, journal_path=journal)
+
+    assert not journal.exists()
+    assert not IntentJournal.exists(journal)
+
+
+def _memory_plan(fs: MemoryFileSystem) -> CompactPlan:
+    cfg = Config(
+        source_dir=Path("/inbox"),
+        destinations={"docs": "Docs"},
+        rules=[
+            Rule(
+                name="docs",
+                extensions=[".txt"],
+                pattern=None,
+                regex=None,
+                priority=0,
+                destination="docs",
+                duplicate_strategy="rename",
+            )
+        ],
+        default_duplicate_strategy="rename",
+    )
+    return plan_moves_compact(cfg, fs=fs)
+
+
+def test_resume_only_replaces_a_destination_it_can_prove_is_its_own_partial_copy(tmp_path: Path) -> None:
+    fs = MemoryFileSystem()
+    fs.mkdir(Path("/inbox/Docs"))
+    fs.write_file("/inbox/a.txt", b"mine-mine")
+    fs.write_file("/inbox/b.txt", b"mine-mine")
+    plan = _memory_plan(fs)
+    journal_path = tmp_path / "journal.jsonl"
+    journal = IntentJournal.start(journal_path, plan)
+    journal.record_intent(0, [(0, "/inbox/Docs/a.txt"), (1, "/inbox/Docs/b.txt")])
+    journal.close()
+    # a.txt: the crash cut our copy short. b.txt: someone else saved a file under that name since.
+    fs.write_file("/inbox/Docs/a.txt", b"mine")
+    fs.write_file("/inbox/Docs/b.txt", b"theirs, and longer")
+
+    resume_moves(journal_path, ledger_path=None, fs=fs)
+
+    assert fs.read_bytes("/inbox/Docs/a.txt") == b"mine-mine"
+    assert fs.read_bytes("/inbox/Docs/b.txt") == b"theirs, and longer"
+    [renamed] = set(fs.scandir_files(Path("/inbox/Docs"))) - {"a.txt", "b.txt"}
+    assert renamed.startswith("b_") and fs.read_bytes(f"/inbox/Docs/{renamed}") == b"mine-mine"
+
+
+def test_resume_runs_retries_queued_by_batches_already_marked_done(tmp_path: Path) -> None:
+    fs = MemoryFileSystem(faults={"rename": 1.0})
+    fs.mkdir(Path("/inbox"))
+    fs.write_file("/inbox/a.txt", b"a")
+    journal_path = tmp_path / "journal.jsonl"
+
+    def killed_while_backing_off(seconds: float) -> None:
+        raise KeyboardInterrupt("killed")
+
+    with pytest.raises(KeyboardInterrupt):
+        execute_moves(
+            _memory_plan(fs),
+            dry_run=False,
+            fs=fs,
+            journal_path=journal_path,
+            retrier=Retrier(sleep=killed_while_backing_off),
+        )
+    state = IntentJournal.load(journal_path)
+    assert state.done == {0} and state.in_flight is None
+    assert state.retries == [(0, "/inbox/Docs/a.txt")]
+
+    fs.faults.clear()
+    resume_moves(journal_path, ledger_path=None, fs=fs)
+
+    assert fs.read_bytes("/inbox/Docs/a.txt") == b"a"
+    assert not IntentJournal.exists(journal_path)
+
+
+def test_resume_quarantines_a_file_a_link_overwrite_had_not_stashed_yet(tmp_path: Path) -> None:
+    fs = MemoryFileSystem()
+    fs.mkdir(Path("/inbox/Docs"))
+    fs.write_file("/inbox/Docs/a.txt", b"precious")
+    fs.write_file("/inbox/a.txt", b"new")
+    cfg = Config(
+        source_dir=Path("/inbox"),
+        destinations={"docs": "Docs"},
+        rules=[
+            Rule(
+                name="docs",
+                extensions=[".txt"],
+                pattern=None,
+                regex=None,
+                priority=0,
+                destination="docs",
+                duplicate_strategy="overwrite",
+                action="hardlink",
+            )
+        ],
+        default_duplicate_strategy="overwrite",
+    )
+    journal_path = tmp_path / "journal.jsonl"
+    # Killed after the intent was journaled, before the existing file was stashed.
+    journal = IntentJournal.start(journal_path, plan_moves_compact(cfg, fs=fs))
+    journal.record_intent(0, [(0, "/inbox/Docs/a.txt")])
+    journal.close()
+    ledger = tmp_path / "ledger.jsonl"
+
+    resume_moves(journal_path, ledger_path=ledger, quarantine_path=Path("/q"), fs=fs)
+
+    assert fs.samefile(Path("/inbox/a.txt"), Path("/inbox/Docs/a.txt"))
+    entry = json.loads(ledger.read_text(encoding="utf-8").splitlines()[-1])
+    assert entry["quarantine"] is not None
+    assert fs.read_bytes(entry["quarantine"]) == b"precious"
@@ -0,0 +1,96 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from src.automation import linker
+from src.automation.undo_manager import undo_last_move
+from src.config_loader import load_config
+from src.utils import execute_moves, plan_moves_compact
+
+
+def _config(tmp_path: Path, inbox: Path, action: str, extra: str = "") -> Path:
+    cfg_path = tmp_path / "rules.yaml"
+    cfg_path.write_text(
+        """
+source_dir: {src}
+duplicate_strategy: rename
+
+destinations:
+  view: View
+  other: Other
+
+rules:
+  - name: view
+    extensions: ['.txt']
+    destination: view
+    action: {action}
+{extra}
+""".format(src=str(inbox), action=action, extra=extra),
+        encoding="utf-8",
+    )
+    return cfg_path
+
+
+@pytest.mark.parametrize("action", ["hardlink", "symlink"])
+def test_link_actions_keep_source_and_undo_removes_link(tmp_path: Path, action: str):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    (inbox / "a.txt").write_text("data", encoding="utf-8")
+
+    cfg = load_config(_config(tmp_path, inbox, action))
+    ledger = tmp_path / "ledger.jsonl"
+    execute_moves(plan_moves_compact(cfg), dry_run=False, ledger_path=ledger)
+
+    linked = inbox / "View" / "a.txt"
+    assert (inbox / "a.txt").exists()
+    assert os.path.samefile(inbox / "a.txt", linked)
+    assert linked.is_symlink() == (action == "symlink")
+
+    # A second run must not create another copy even with the rename strategy.
+    execute_moves(plan_moves_compact(cfg), dry_run=False, ledger_path=ledger)
+    assert [p.name for p in (inbox / "View").iterdir()] == ["a.txt"]
+
+    entry = json.loads(ledger.read_text(encoding="utf-8").splitlines()[-1])
+    assert entry["action"] == action
+
+    assert undo_last_move(ledger) == inbox / "a.txt"
+    assert not linked.exists()
+    assert (inbox / "a.txt").read_text(encoding="utf-8") == "data"
+
+
+def test_reflink_falls_back_to_configured_option(tmp_path: Path, monkeypatch):
+    def unsupported(src, dst):
+        raise linker.ReflinkUnsupported(95, "not supported")
+
+    monkeypatch.setattr(linker, "reflink", unsupported)
+
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    (inbox / "a.txt").write_text("data", encoding="utf-8")
+    (inbox / "b.txt").write_text("data", encoding="utf-8")
+
+    ledger = tmp_path / "ledger.jsonl"
+    cfg = load_config(_config(tmp_path, inbox, "reflink", "    reflink_fallback: hardlink"))
+    execute_moves(plan_moves_compact(cfg), dry_run=False, ledger_path=ledger)
+
+    assert os.path.samefile(inbox / "a.txt", inbox / "View" / "a.txt")
+    actions = {json.loads(line)["action"] for line in ledger.read_text(encoding="utf-8").splitlines()}
+    assert actions == {"hardlink"}
+
+
+def test_reflink_skip_fallback_leaves_no_destination(tmp_path: Path, monkeypatch):
+    def unsupported(src, dst):
+        raise linker.ReflinkUnsupported(95, "not supported")
+
+    monkeypatch.setattr(linker, "reflink", unsupported)
+
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    (inbox / "a.txt").write_text("data", encoding="utf-8")
+
+    cfg = load_config(_config(tmp_path, inbox, "reflink", "    reflink_fallback: skip"))
+    execute_moves(plan_moves_compact(cfg), dry_run=False)
+
+    assert not (inbox / "View" / "a.txt").exists()
@@ -0,0 +1,25 @@
+from pathlib import Path
+
+from src.automation.parallel_planner import select_rules_parallel
+from src.automation.rules_engine import compile_rules
+from src.config_loader import Config, Rule
+
+
+def test_parallel_selection_matches_serial_order():
+    rules = [
+        Rule(f"r{i}", "other", [], None, rf"^x{i % 50}_.*\.(dat|bin)$", i % 4, "skip")
+        for i in range(100)
+    ]
+    rules.append(Rule("docs", "other", [".pdf"], None, None, 0, "skip"))
+    cfg = Config(
+        source_dir=Path("."),
+        destinations={"other": "Other"},
+        rules=rules,
+        default_duplicate_strategy="skip",
+    )
+    names = [f"x{i % 60}_{i}.{('dat', 'bin', 'pdf')[i % 3]}" for i in range(1000)]
+
+    serial = [compile_rules(cfg).select(n) for n in names]
+    parallel = select_rules_parallel(cfg, names, processes=2, batch_size=64)
+
+    assert parallel == serial
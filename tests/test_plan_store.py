@@ -0,0 +1,65 @@
+import os
+from pathlib import Path
+
+from src.automation.plan_store import load_plan, save_plan, verify_plan
+from src.config_loader import load_config
+from src.utils import execute_moves, plan_moves
+
+
+def _make_inbox(tmp_path: Path) -> Path:
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    (inbox / "a.txt").write_text("a", encoding="utf-8")
+    (inbox / "b.txt").write_text("b", encoding="utf-8")
+    (inbox / "c.png").write_text("c", encoding="utf-8")
+
+    cfg_path = tmp_path / "rules.yaml"
+    cfg_path.write_text(
+        """
+source_dir: {src}
+duplicate_strategy: rename
+
+destinations:
+  docs: Docs
+  other: Other
+
+rules:
+  - name: docs
+    extensions: ['.txt']
+    destination: docs
+""".format(src=str(inbox)),
+        encoding="utf-8",
+    )
+    return cfg_path
+
+
+def test_saved_plan_round_trips(tmp_path: Path):
+    cfg = load_config(_make_inbox(tmp_path))
+    actions = plan_moves(cfg)
+
+    plan_file = tmp_path / "plan.bin"
+    assert save_plan(plan_file, actions) == 3
+
+    stored = load_plan(plan_file)
+    loaded = [(a.src, a.dst, a.rule_name, a.duplicate_strategy) for a in stored.actions]
+    expected = [(a.src, a.dst, a.rule_name, a.duplicate_strategy) for a in actions]
+    assert loaded == expected
+    assert all(stored.fingerprint(i) is not None for i in range(len(stored.actions)))
+
+
+def test_apply_plan_skips_changed_sources(tmp_path: Path):
+    cfg = load_config(_make_inbox(tmp_path))
+    inbox = cfg.source_dir
+    plan_file = tmp_path / "plan.bin"
+    save_plan(plan_file, plan_moves(cfg))
+
+    (inbox / "b.txt").write_text("changed content", encoding="utf-8")
+    os.remove(inbox / "c.png")
+
+    valid, stale = verify_plan(load_plan(plan_file))
+    assert [a.src.name for a in valid] == ["a.txt"]
+    assert sorted(a.src.name for a in stale) == ["b.txt", "c.png"]
+
+    execute_moves(valid, dry_run=False)
+    assert (inbox / "Docs" / "a.txt").exists()
+    assert (inbox / "b.txt").exists()
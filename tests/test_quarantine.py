@@ -0,0 +1,131 @@
+from datetime import date
+import json
+import logging
+import os
+from pathlib import Path
+
+import pytest
+
+from src.automation import runner
+from src.automation.quarantine import SOURCE_QUARANTINE, Quarantine
+from src.automation.runner import RunOptions, run_config
+from src.automation.undo_manager import undo_last_move
+from src.config_loader import load_config
+from src.utils import execute_moves, plan_moves_compact
+
+
+def test_overwrite_quarantines_target_and_undo_restores_it(tmp_path: Path) -> None:
+    inbox = tmp_path / "inbox"
+    (inbox / "Docs").mkdir(parents=True)
+    (inbox / "report.txt").write_text("new", encoding="utf-8")
+    old = inbox / "Docs" / "report.txt"
+    old.write_text("old", encoding="utf-8")
+    old_inode = old.stat().st_ino
+
+    cfg_path = tmp_path / "rules.yaml"
+    cfg_path.write_text(
+        f"""
+source_dir: {inbox}
+
+destinations:
+  docs: Docs
+  other: Other
+
+rules:
+  - name: docs
+    extensions: ['.txt']
+    destination: docs
+    duplicate_strategy: overwrite
+""",
+        encoding="utf-8",
+    )
+    ledger = tmp_path / "ledger.jsonl"
+    quarantine_dir = tmp_path / "quarantine"
+
+    execute_moves(
+        plan_moves_compact(load_config(cfg_path)),
+        dry_run=False,
+        ledger_path=ledger,
+        quarantine_path=quarantine_dir,
+    )
+
+    assert old.read_text(encoding="utf-8") == "new"
+    entry = json.loads(ledger.read_text(encoding="utf-8").splitlines()[-1])
+    stashed = Path(entry["quarantine"])
+    # Renamed, not copied: the quarantined file is the original inode.
+    assert stashed.stat().st_ino == old_inode
+    assert stashed.read_text(encoding="utf-8") == "old"
+
+    undo_last_move(ledger)
+
+    assert (inbox / "report.txt").read_text(encoding="utf-8") == "new"
+    assert old.read_text(encoding="utf-8") == "old"
+    assert not stashed.exists()
+
+    # A second undo must not replay the same entry and move the restored file back out of Docs/.
+    with pytest.raises(ValueError, match="already undone"):
+        undo_last_move(ledger)
+    assert old.read_text(encoding="utf-8") == "old"
+    assert sorted(p.name for p in old.parent.iterdir()) == ["report.txt"]
+    assert sorted(p.name for p in inbox.iterdir() if p.is_file()) == ["report.txt"]
+
+
+def test_collect_garbage_by_age_then_size(tmp_path: Path) -> None:
+    q = Quarantine(tmp_path / "quarantine")
+    stashed = []
+    for i, day in enumerate([date(2026, 1, 1), date(2026, 1, 9), date(2026, 1, 10)]):
+        f = tmp_path / f"f{i}.bin"
+        f.write_bytes(b"x" * 100)
+        stashed.append(q.stash(f, today=day))
+    extra = tmp_path / "f3.bin"
+    extra.write_bytes(b"y" * 100)
+    stashed.append(q.stash(extra, today=date(2026, 1, 10)))
+
+    removed, freed = q.collect_garbage(max_age_days=7, today=date(2026, 1, 10))
+    assert (removed, freed) == (1, 100)
+    assert not stashed[0].parent.exists()
+
+    removed, freed = q.collect_garbage(max_bytes=150, today=date(2026, 1, 10))
+    assert (removed, freed) == (2, 200)
+    remaining = [p for p in stashed if p.exists()]
+    assert len(remaining) == 1 and remaining[0].parent.name == "20260110"
+    assert not stashed[1].parent.exists()
+    assert sorted(os.listdir(q.root)) == ["20260110"]
+
+
+def test_default_quarantine_lives_in_the_source_dir_and_other_devices_are_flagged(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+) -> None:
+    inbox = tmp_path / "inbox"
+    (inbox / "Docs").mkdir(parents=True)
+    (inbox / "report.txt").write_text("new", encoding="utf-8")
+    old = inbox / "Docs" / "report.txt"
+    old.write_text("old", encoding="utf-8")
+    old_inode = old.stat().st_ino
+    cfg_path = tmp_path / "rules.yaml"
+    cfg_path.write_text(
+        f"""
+source_dir: {inbox}
+destinations:
+  docs: Docs
+rules:
+  - name: docs
+    extensions: ['.txt']
+    destination: docs
+    duplicate_strategy: overwrite
+""",
+        encoding="utf-8",
+    )
+    options = RunOptions(ledger_path=None, catalog_path=None, journal_path=None, quarantine_path=SOURCE_QUARANTINE)
+
+    with caplog.at_level(logging.WARNING):
+        run_config(cfg_path, options)
+
+    [stashed] = (inbox / ".quarantine").glob("*/*")
+    assert stashed.stat().st_ino == old_inode
+    assert "action=quarantine_cross_device" not in caplog.text
+
+    monkeypatch.setattr(runner, "on_other_device", lambda root, source_dir: True)
+    with caplog.at_level(logging.WARNING):
+        run_config(cfg_path, options)
+    assert "action=quarantine_cross_device" in caplog.text
@@ -0,0 +1,189 @@
+import errno
+import json
+import logging
+import os
+from pathlib import Path
+
+import pytest
+
+from src.automation.fs_backend import MemoryFileSystem
+from src.automation.retry import Retrier, RetryPolicy
+from src.automation.undo_manager import undo_last_move
+from src.config.config_loader import Config, Rule
+from src.utils import execute_moves, plan_moves_compact
+
+
+def _config(duplicate_strategy: str = "rename") -> Config:
+    return Config(
+        source_dir=Path("/inbox"),
+        destinations={"docs": "Docs", "other": "Other"},
+        rules=[
+            Rule(
+                name="docs",
+                extensions=[".txt"],
+                pattern=None,
+                regex=None,
+                priority=0,
+                destination="docs",
+                duplicate_strategy=duplicate_strategy,
+            )
+        ],
+        default_duplicate_strategy="rename",
+    )
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.backoff_waits = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+    def backoff(self, seconds: float) -> None:
+        self.backoff_waits += seconds
+        self.sleep(seconds)
+
+
+def _inbox(fs: MemoryFileSystem, count: int) -> None:
+    fs.mkdir(Path("/inbox"))
+    for i in range(count):
+        fs.write_file(f"/inbox/f{i:05d}.{'txt' if i % 2 else 'bin'}", b"x")
+
+
+def test_transient_failures_are_retried_while_healthy_files_keep_moving() -> None:
+    clock = _Clock()
+    # Every rename costs a millisecond of simulated time, so backoffs expire while later batches run.
+    fs = MemoryFileSystem(latency={"rename": 0.001}, sleep=clock.sleep, faults={"rename": 0.1}, seed=7)
+    count = 5000
+    _inbox(fs, count)
+    fs.reset_counts()
+    retrier = Retrier(clock=clock, sleep=clock.backoff)
+
+    execute_moves(plan_moves_compact(_config(), fs=fs), dry_run=False, fs=fs, retrier=retrier)
+
+    injected = fs.faults_injected["rename"]
+    assert injected > count // 20
+    assert fs.op_counts["rename"] == count + injected
+    assert retrier.failed_count == 0
+    assert retrier.retries["EBUSY"] == injected
+    assert len(fs.scandir_files(Path("/inbox/Docs"))) == count // 2
+    assert len(fs.scandir_files(Path("/inbox/Other"))) == count // 2
+    assert fs.scandir_files(Path("/inbox")) == []
+
+    # Throughput under a 10% failure rate: only the last few retries wait on an idle queue, the rest ride
+    # along with later batches. Backing off in place would have cost half a second per failure.
+    assert clock.now == pytest.approx(fs.latency_seconds + clock.backoff_waits)
+    assert clock.backoff_waits < 8.0 < injected * 0.5
+
+
+def test_failures_are_grouped_by_errno_without_aborting_the_batch(
+    tmp_path: Path, caplog: pytest.LogCaptureFixture
+) -> None:
+    fs = MemoryFileSystem(faults={"rename": 1.0}, fault_errnos=(errno.EBUSY, errno.EACCES), seed=1)
+    _inbox(fs, 200)
+    clock = _Clock()
+    retrier = Retrier({errno.EBUSY: RetryPolicy(attempts=3, base_delay=0.1)}, clock=clock, sleep=clock.sleep)
+    journal = tmp_path / "journal.jsonl"
+
+    with caplog.at_level(logging.INFO):
+        execute_moves(
+            plan_moves_compact(_config(), fs=fs),
+            dry_run=False,
+            fs=fs,
+            retrier=retrier,
+            journal_path=journal,
+        )
+
+    assert set(retrier.failures) == {"EBUSY", "EACCES"}
+    assert retrier.failed_count == 200
+    assert retrier.retries["EACCES"] == 0
+    assert len(fs.scandir_files(Path("/inbox"))) == 200
+    assert fs.scandir_files(Path("/inbox/Docs")) == []
+    assert not journal.exists()
+
+    summary = [r.getMessage() for r in caplog.records if "action=failure_summary" in r.getMessage()]
+    assert len(summary) == 2
+    assert any("errno=EACCES" in line and "failed=" in line for line in summary)
+
+
+def test_retry_reresolves_a_name_taken_while_backing_off() -> None:
+    fs = MemoryFileSystem(faults={"rename": 1.0})
+    fs.mkdir(Path("/inbox/Docs"))
+    fs.write_file("/inbox/a.txt", b"mine")
+    clock = _Clock()
+
+    def storage_recovers(seconds: float) -> None:
+        fs.write_file("/inbox/Docs/a.txt", b"theirs")
+        fs.faults.clear()
+        clock.sleep(seconds)
+
+    retrier = Retrier(clock=clock, sleep=storage_recovers)
+    execute_moves(plan_moves_compact(_config(), fs=fs), dry_run=False, fs=fs, retrier=retrier)
+
+    names = fs.scandir_files(Path("/inbox/Docs"))
+    assert sorted(fs.read_bytes(f"/inbox/Docs/{n}") for n in names) == [b"mine", b"theirs"]
+    assert fs.read_bytes("/inbox/Docs/a.txt") == b"theirs"
+    assert retrier.recovered["EBUSY"] == 1
+
+
+def test_fatal_errors_still_abort_the_run(tmp_path: Path) -> None:
+    fs = MemoryFileSystem(faults={"rename": 1.0}, fault_errnos=(errno.ENOSPC,))
+    _inbox(fs, 10)
+    journal = tmp_path / "journal.jsonl"
+
+    with pytest.raises(OSError) as exc:
+        execute_moves(plan_moves_compact(_config(), fs=fs), dry_run=False, fs=fs, journal_path=journal)
+
+    assert exc.value.errno == errno.ENOSPC
+    # Left behind for --resume once there is space again.
+    assert journal.exists()
+
+
+def _overwrite_inbox(tmp_path: Path, failures: int, retrier: Retrier) -> tuple[MemoryFileSystem, Path]:
+    fs = MemoryFileSystem()
+    fs.mkdir(Path("/inbox/Docs"))
+    fs.write_file("/inbox/a.txt", b"new")
+    fs.write_file("/inbox/Docs/a.txt", b"old")
+    plan = plan_moves_compact(_config("overwrite"), fs=fs)
+
+    real_move = fs.move
+    left = [failures]
+
+    def flaky_move(src: Path, dst: Path, **kwargs: object) -> None:
+        if left[0]:
+            left[0] -= 1
+            raise OSError(errno.EBUSY, os.strerror(errno.EBUSY), str(src))
+        real_move(src, dst, **kwargs)
+
+    fs.move = flaky_move  # type: ignore[method-assign]
+    ledger = tmp_path / "ledger.jsonl"
+    execute_moves(plan, dry_run=False, fs=fs, ledger_path=ledger, quarantine_path=Path("/q"), retrier=retrier)
+    fs.move = real_move  # type: ignore[method-assign]
+    return fs, ledger
+
+
+def test_retried_overwrite_keeps_its_quarantined_file_undoable(tmp_path: Path) -> None:
+    clock = _Clock()
+    fs, ledger = _overwrite_inbox(tmp_path, 1, Retrier(clock=clock, sleep=clock.sleep))
+
+    assert fs.read_bytes("/inbox/Docs/a.txt") == b"new"
+    entry = json.loads(ledger.read_text(encoding="utf-8").splitlines()[-1])
+    assert entry["quarantine"] is not None
+    assert fs.read_bytes(entry["quarantine"]) == b"old"
+
+    undo_last_move(ledger, fs=fs)
+    assert fs.read_bytes("/inbox/a.txt") == b"new"
+    assert fs.read_bytes("/inbox/Docs/a.txt") == b"old"
+
+
+def test_failed_overwrite_puts_the_stashed_file_back(tmp_path: Path) -> None:
+    fs, ledger = _overwrite_inbox(tmp_path, 1, Retrier(policies={}))
+
+    assert fs.read_bytes("/inbox/a.txt") == b"new"
+    assert fs.read_bytes("/inbox/Docs/a.txt") == b"old"
+    assert not ledger.exists()
+    assert all(fs.scandir_files(Path("/q") / day) == [] for day, _is_dir in fs.list_dir(Path("/q")))
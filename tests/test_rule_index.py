@@ -0,0 +1,85 @@
+import random
+from pathlib import Path
+
+from src.automation.rule_index import RuleIndex, glob_literals, regex_literals
+from src.automation.rules_engine import CompiledRuleSet, rule_matches_file, sorted_rules
+from src.config_loader import Config, Rule
+
+
+def _rule(name, *, extensions=(), pattern=None, regex=None, priority=0):
+    return Rule(
+        name=name,
+        destination="other",
+        extensions=list(extensions),
+        pattern=pattern,
+        regex=regex,
+        priority=priority,
+        duplicate_strategy="skip",
+    )
+
+
+def _config(rules):
+    return Config(
+        source_dir=Path("."),
+        destinations={"other": "Other"},
+        rules=rules,
+        default_duplicate_strategy="skip",
+    )
+
+
+def _linear_select(cfg, name):
+    for rule in sorted_rules(cfg):
+        if rule_matches_file(rule, Path(name)):
+            return rule
+    return None
+
+
+def test_regex_literals_are_conservative():
+    assert regex_literals(r"^ACME_\d+\.pdf$") == ("ACME_", ".pdf")
+    assert regex_literals(r"inv(oice)?_2024") == ("inv", "")
+    assert regex_literals(r"abc+d$") == ("ab", "d")
+    assert regex_literals(r"a{2}b\Z") == ("", "b")
+    assert regex_literals(r"foo|bar") == ("", "")
+    assert regex_literals(r"(?i)report\.pdf$") == ("", "")
+    assert regex_literals(r"[abc]x.pdf$") == ("", "pdf")
+
+
+def test_glob_literals():
+    assert glob_literals("report_*.pdf") == ("report_", ".pdf")
+    assert glob_literals("exact.txt") == ("exact.txt", "exact.txt")
+    assert glob_literals("*") == ("", "")
+
+
+def test_indexed_selection_matches_linear_scan():
+    rng = random.Random(1234)
+    rules = [
+        _rule("docs", extensions=[".pdf", ".TXT"]),
+        _rule("any_png", pattern="*.png", priority=1),
+        _rule("reports", pattern="report_*.pdf", priority=5),
+        _rule("anywhere", regex=r".*draft.*", priority=2),
+        _rule("alt", regex=r"(tmp|temp)_.*", priority=3),
+        _rule("newline", regex=r"nl\.log$", priority=4),
+        _rule("class", pattern="[ab]*.csv", priority=1),
+    ]
+    for i in range(200):
+        code = f"C{i:04d}"
+        rules.append(_rule(f"client_{code}", pattern=f"{code}_*", priority=rng.choice([0, 5, 10])))
+        rules.append(_rule(f"client_re_{code}", regex=rf"^{code}-\d+\.xml$", priority=rng.choice([0, 5, 10])))
+    cfg = _config(rules)
+    compiled = CompiledRuleSet(cfg)
+
+    stems = ["report_q1", "C0007_x", "C0150-12", "C0150-ab", "tmp_1", "draftnote", "a", "b1", "nl", "plain"]
+    exts = [".pdf", ".png", ".xml", ".csv", ".txt", ".TXT", ".log", ".log\n", "", "."]
+    for stem in stems:
+        for ext in exts:
+            name = stem + ext
+            assert compiled.select(name) is _linear_select(cfg, name), name
+
+
+def test_candidates_stay_small_for_large_rule_sets():
+    rules = [_rule(f"client_{i}", pattern=f"CL{i:05d}_*", priority=i % 3) for i in range(50_000)]
+    rules.append(_rule("docs", extensions=[".pdf"]))
+    index = RuleIndex(sorted_rules(_config(rules)))
+
+    assert len(list(index.candidates("CL04242_invoice.pdf"))) == 2
+    assert list(index.candidates("unrelated.bin")) == []
@@ -0,0 +1,129 @@
+import random
+from pathlib import Path
+
+import pytest
+
+from src.automation.rule_stats import RuleStats, adaptive_order, explain_order, rules_disjoint
+from src.automation.rules_engine import CompiledRuleSet, sorted_rules
+from src.config.config_loader import Config, Rule
+from src.main import main
+from src.utils import plan_moves_compact
+
+
+def _rule(name: str, *, extensions=(), pattern=None, regex=None, priority=0) -> Rule:
+    return Rule(
+        name=name,
+        destination="other",
+        extensions=list(extensions),
+        pattern=pattern,
+        regex=regex,
+        priority=priority,
+        duplicate_strategy="skip",
+    )
+
+
+def _config(rules: list[Rule], source_dir: Path = Path("/inbox")) -> Config:
+    return Config(
+        source_dir=source_dir,
+        destinations={"other": "Other"},
+        rules=rules,
+        default_duplicate_strategy="skip",
+    )
+
+
+def test_rules_disjoint_is_conservative() -> None:
+    pdf = _rule("pdf", extensions=[".pdf"])
+    assert rules_disjoint(pdf, _rule("jpg", extensions=[".JPG"]))
+    assert not rules_disjoint(pdf, _rule("both", extensions=[".PDF", ".doc"]))
+
+    assert rules_disjoint(pdf, _rule("logs", pattern="*.log"))
+    assert not rules_disjoint(pdf, _rule("reports", pattern="report_*.pdf"))
+    assert not rules_disjoint(pdf, _rule("any", pattern="report_*"))
+    assert rules_disjoint(pdf, _rule("csv", regex=r".*\.csv$"))
+
+    assert rules_disjoint(_rule("a", pattern="inv_*"), _rule("b", regex=r"scan_\d+"))
+    assert not rules_disjoint(_rule("a", pattern="inv_*"), _rule("b", regex=r"inv"))
+    assert rules_disjoint(_rule("a", pattern="*.tar.gz"), _rule("b", pattern="*.zip"))
+    assert not rules_disjoint(_rule("a", pattern="*.tar.gz"), _rule("b", pattern="*.gz"))
+
+
+def test_adaptive_order_moves_hot_rules_only_past_disjoint_ones(tmp_path: Path) -> None:
+    rare = _rule("rare", regex=r"^\d{8}_scan\.tiff$")
+    overlapping = _rule("all-jpg", regex=r".*\.jpg$")
+    hot = _rule("jpg", extensions=[".jpg"])
+    top = _rule("top", extensions=[".jpg"], priority=5)
+    rules = sorted_rules(_config([rare, overlapping, hot, top]))
+
+    stats = RuleStats(tmp_path / "stats.json")
+    stats.get(hot).evaluations, stats.get(hot).hits = 100, 90
+    stats.get(rare).evaluations, stats.get(rare).hits = 100, 1
+
+    # "jpg" may jump "rare" but never "all-jpg", and nothing crosses the priority tier.
+    assert [r.name for r in adaptive_order(rules, stats)] == ["top", "rare", "all-jpg", "jpg"]
+    stats.get(overlapping).evaluations, stats.get(overlapping).hits = 100, 80
+    assert [r.name for r in adaptive_order(rules, stats)] == ["top", "all-jpg", "jpg", "rare"]
+    assert [e.config_position for e in explain_order(rules, stats)] == [0, 2, 3, 1]
+
+
+def test_adaptive_order_never_changes_the_winner() -> None:
+    rng = random.Random(7)
+    exts = [".pdf", ".jpg", ".png", ".txt", ".log", ".gz"]
+    rules = [_rule(f"e{i}", extensions=rng.sample(exts, 2), priority=rng.randint(0, 1)) for i in range(6)]
+    rules += [
+        _rule("p1", pattern="report_*", priority=0),
+        _rule("p2", pattern="*.tar.gz", priority=1),
+        _rule("r1", regex=r"IMG_\d+\.jpg$", priority=0),
+        _rule("r2", regex=r".*_final\.pdf$", priority=1),
+    ]
+    cfg = _config(rules)
+    stats = RuleStats()
+    for r in rules:
+        stat = stats.get(r)
+        stat.evaluations = 100
+        stat.hits = rng.randint(0, 100)
+
+    baseline = CompiledRuleSet(cfg)
+    adaptive = CompiledRuleSet(cfg, order=adaptive_order(sorted_rules(cfg), stats))
+    stems = ["report_q1", "IMG_0042", "x_final", "notes", "a.tar"]
+    for _ in range(2000):
+        name = rng.choice(stems) + rng.choice(exts + [""])
+        assert baseline.select(name) is adaptive.select(name)
+
+
+def test_planning_records_and_persists_hits(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    for name in ["a.jpg", "b.jpg", "c.pdf"]:
+        (inbox / name).write_text("x", encoding="utf-8")
+    cfg = _config([_rule("jpg", extensions=[".jpg"]), _rule("pdf", extensions=[".pdf"])], inbox)
+
+    stats = RuleStats(tmp_path / "stats.json")
+    plan_moves_compact(cfg, rule_stats=stats)
+    stats.save()
+
+    reloaded = RuleStats(tmp_path / "stats.json")
+    assert (reloaded.get(cfg.rules[0]).hits, reloaded.get(cfg.rules[1]).hits) == (2, 1)
+    assert [r.name for r in adaptive_order(sorted_rules(cfg), reloaded)] == ["jpg", "pdf"]
+    # Parallel workers keep no statistics, so the combination is refused instead of recording nothing.
+    with pytest.raises(ValueError, match="parallel"):
+        plan_moves_compact(cfg, processes=2, rule_stats=stats)
+    with pytest.raises(SystemExit):
+        main(["--adaptive-rules", "--plan-processes", "2", "--log-file", str(tmp_path / "run.log")])
+    assert "cannot be combined with --plan-processes" in capsys.readouterr().err
+
+
+def test_unnamed_rules_sharing_a_destination_keep_separate_stats(tmp_path: Path) -> None:
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    for name in ["a.pdf", "b.pdf", "c.txt", "d.txt", "e.txt"]:
+        (inbox / name).write_text("x", encoding="utf-8")
+    # Both rules are named after their destination, as unnamed rules are.
+    pdf, txt = _rule("docs", extensions=[".pdf"]), _rule("docs", extensions=[".txt"])
+    cfg = _config([pdf, txt], inbox)
+
+    stats = RuleStats(tmp_path / "stats.json")
+    plan_moves_compact(cfg, rule_stats=stats)
+    stats.save()
+
+    reloaded = RuleStats(tmp_path / "stats.json")
+    assert [reloaded.get(r).hits for r in cfg.rules] == [2, 3]
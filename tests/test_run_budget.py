@@ -0,0 +1,137 @@
+import errno
+import os
+from pathlib import Path
+
+from src.automation import runner
+from src.automation.fs_backend import OSFileSystem
+from src.automation.plan_store import load_plan
+from src.automation.retry import Retrier
+from src.automation.runner import RunOptions, run_config
+from src.config_loader import load_config
+from src.utils import execute_moves, plan_moves_compact
+
+
+def _write_config(tmp_path: Path, files: int, dest: str = "Docs") -> Path:
+    inbox = tmp_path / "inbox"
+    inbox.mkdir(exist_ok=True)
+    for i in range(files):
+        (inbox / f"f{i:02d}.txt").write_text(str(i), encoding="utf-8")
+    cfg_path = tmp_path / "rules.yaml"
+    cfg_path.write_text(
+        f"""
+source_dir: {inbox}
+
+destinations:
+  docs: {dest}
+  other: Other
+
+rules:
+  - name: docs
+    extensions: ['.txt']
+    destination: docs
+""",
+        encoding="utf-8",
+    )
+    return cfg_path
+
+
+def _options(tmp_path: Path, **kwargs) -> RunOptions:
+    return RunOptions(
+        ledger_path=tmp_path / "ledger.jsonl",
+        catalog_path=None,
+        journal_path=tmp_path / "journal.jsonl",
+        cursor_path=tmp_path / "cursor.plan",
+        **kwargs,
+    )
+
+
+def _moved(tmp_path: Path, dest: str = "Docs") -> int:
+    folder = tmp_path / "inbox" / dest
+    return len(list(folder.iterdir())) if folder.exists() else 0
+
+
+def test_max_files_continues_from_the_cursor_without_replanning(tmp_path: Path, monkeypatch) -> None:
+    cfg_path = _write_config(tmp_path, 25)
+    options = _options(tmp_path, max_files=10)
+
+    first = run_config(cfg_path, options)
+    assert (first.planned, first.remaining, _moved(tmp_path)) == (25, 15, 10)
+    assert options.cursor_path.exists()
+
+    def no_planning(*args, **kwargs):
+        raise AssertionError("the cursor should replace planning")
+
+    monkeypatch.setattr(runner, "plan_moves_compact", no_planning)
+    # A file that disappears between runs is skipped rather than failing the batch.
+    (tmp_path / "inbox" / "f24.txt").unlink()
+
+    second = run_config(cfg_path, options)
+    assert (second.planned, second.remaining, _moved(tmp_path)) == (15, 5, 20)
+    third = run_config(cfg_path, options)
+    assert (third.planned, third.remaining, _moved(tmp_path)) == (5, 0, 24)
+    assert not options.cursor_path.exists()
+    assert not options.journal_path.exists()
+
+
+def test_cursor_is_discarded_when_the_config_changes(tmp_path: Path) -> None:
+    cfg_path = _write_config(tmp_path, 12)
+    options = _options(tmp_path, max_files=5)
+    run_config(cfg_path, options)
+
+    _write_config(tmp_path, 0, dest="Papers")
+    result = run_config(cfg_path, options)
+    assert (result.planned, result.remaining) == (7, 2)
+    assert (_moved(tmp_path), _moved(tmp_path, "Papers")) == (5, 5)
+
+
+def test_time_budget_stops_at_a_batch_boundary(tmp_path: Path) -> None:
+    cfg = load_config(_write_config(tmp_path, 10))
+    checks = []
+
+    def stop() -> bool:
+        checks.append(_moved(tmp_path))
+        return len(checks) == 2
+
+    processed = execute_moves(
+        plan_moves_compact(cfg),
+        dry_run=False,
+        journal_path=tmp_path / "journal.jsonl",
+        batch_size=3,
+        stop=stop,
+    )
+    assert processed == 6
+    assert checks == [3, 6]
+    assert _moved(tmp_path) == 6
+    assert not (tmp_path / "journal.jsonl").exists()
+
+
+def test_an_exhausted_time_budget_still_makes_progress(tmp_path: Path) -> None:
+    cfg_path = _write_config(tmp_path, 4)
+    result = run_config(cfg_path, _options(tmp_path, max_seconds=0))
+    assert result.remaining == 0
+    assert _moved(tmp_path) == 4
+
+
+def test_retries_pending_at_an_exhausted_budget_go_to_the_cursor(tmp_path: Path, monkeypatch) -> None:
+    cfg_path = _write_config(tmp_path, 4)
+    options = _options(tmp_path, max_seconds=0)
+    real_move = OSFileSystem.move
+
+    def busy_f01(self, src: Path, dst: Path, **kwargs) -> None:
+        if src.name == "f01.txt":
+            raise OSError(errno.EBUSY, os.strerror(errno.EBUSY), str(src))
+        real_move(self, src, dst, **kwargs)
+
+    def no_waiting(seconds: float) -> None:
+        raise AssertionError("an exhausted budget must not wait out a backoff")
+
+    monkeypatch.setattr(OSFileSystem, "move", busy_f01)
+    monkeypatch.setattr(runner, "Retrier", lambda: Retrier(sleep=no_waiting))
+    first = run_config(cfg_path, options)
+    assert (first.remaining, first.failed, _moved(tmp_path)) == (1, 0, 3)
+    assert [a.src.name for a in load_plan(options.cursor_path).actions] == ["f01.txt"]
+
+    monkeypatch.undo()
+    second = run_config(cfg_path, options)
+    assert (second.planned, second.remaining, _moved(tmp_path)) == (1, 0, 4)
+    assert not options.cursor_path.exists()
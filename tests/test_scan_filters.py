@@ -0,0 +1,136 @@
+import json
+import os
+from pathlib import Path
+import time
+
+import pytest
+
+from src.automation.ignore_rules import IgnoreRules, ignore_rules_for
+from src.automation.runner import RunOptions, run_config
+from src.automation.settle_tracker import SettleTracker
+from src.config_loader import load_config
+from src.utils import delete_empty_dirs, plan_moves_compact
+
+
+def _write_config(tmp_path: Path, extra: str = "") -> Path:
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    cfg_path = tmp_path / "rules.yaml"
+    cfg_path.write_text(
+        f"""
+source_dir: {inbox}
+{extra}
+destinations:
+  docs: Docs
+  other: Other
+
+rules:
+  - name: docs
+    extensions: ['.txt']
+    destination: docs
+""",
+        encoding="utf-8",
+    )
+    return cfg_path
+
+
+class _Clock:
+    def __init__(self, now: float) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_ignore_patterns_follow_gitignore_semantics() -> None:
+    rules = IgnoreRules(["# comment", "", "*.log", "!keep.log", "build/", "/top.txt", "docs/**/*.tmp"])
+
+    assert rules.is_ignored("a.log")
+    assert rules.is_ignored("nested/b.log")
+    assert not rules.is_ignored("keep.log")
+    assert rules.is_ignored("build", is_dir=True)
+    assert rules.is_ignored("src/build", is_dir=True)
+    assert not rules.is_ignored("build")
+    assert rules.is_ignored("top.txt")
+    assert not rules.is_ignored("sub/top.txt")
+    assert rules.is_ignored("docs/a/b/c.tmp")
+    assert rules.is_ignored("docs/c.tmp")
+    assert not rules.is_ignored("c.tmp")
+
+
+def test_invalid_ignore_pattern_is_rejected(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="ignore pattern"):
+        load_config(_write_config(tmp_path, "ignore: ['[z-a].txt']"))
+
+
+def test_plan_skips_partial_downloads_and_ignored_names(tmp_path: Path) -> None:
+    cfg = load_config(_write_config(tmp_path, "ignore: ['draft_*', '!*.part.txt', '!keep.part']"))
+    for name in ["a.txt", "b.crdownload", "c.part", "keep.part", "d.part.txt", "draft_1.txt"]:
+        (cfg.source_dir / name).write_text("x", encoding="utf-8")
+
+    planned = sorted(a.src.name for a in plan_moves_compact(cfg))
+    assert planned == ["a.txt", "d.part.txt", "keep.part"]
+
+
+def test_delete_empty_dirs_prunes_ignored_subtrees(tmp_path: Path) -> None:
+    root = tmp_path / "inbox"
+    (root / "node_modules" / "pkg" / "empty").mkdir(parents=True)
+    (root / "old" / "empty").mkdir(parents=True)
+
+    delete_empty_dirs(root, ignore=ignore_rules_for(["node_modules/"]))
+
+    assert (root / "node_modules" / "pkg" / "empty").is_dir()
+    assert not (root / "old").exists()
+
+
+def test_settle_tracker_waits_for_unchanged_stats(tmp_path: Path) -> None:
+    clock = _Clock(10_000.0)
+    tracker = SettleTracker(tmp_path / "settle.json", clock=clock)
+    source = tmp_path / "inbox"
+    fresh = ("new.txt", 10, int(9_999 * 1e9))
+    old = ("old.txt", 10, int(1_000 * 1e9))
+
+    assert tracker.settled(source, [fresh, old], 30) == ["old.txt"]
+    assert tracker.deferred == 1
+    tracker.save()
+
+    clock.now += 20
+    tracker = SettleTracker(tmp_path / "settle.json", clock=clock)
+    grown = ("new.txt", 20, fresh[2])
+    assert tracker.settled(source, [grown], 30) == []
+
+    clock.now += 29
+    assert tracker.settled(source, [grown], 30) == []
+    clock.now += 1
+    assert tracker.settled(source, [grown], 30) == ["new.txt"]
+    assert tracker.deferred == 0
+
+
+def test_unsettled_files_are_planned_on_a_later_unchanged_run(tmp_path: Path) -> None:
+    cfg_path = _write_config(tmp_path, "settle_seconds: 5")
+    inbox = tmp_path / "inbox"
+    (inbox / "old.txt").write_text("old", encoding="utf-8")
+    past = time.time() - 60
+    os.utime(inbox / "old.txt", (past, past))
+    (inbox / "new.txt").write_text("new", encoding="utf-8")
+    options = RunOptions(
+        ledger_path=None,
+        catalog_path=None,
+        journal_path=None,
+        state_path=tmp_path / "state.json",
+        settle_state_path=tmp_path / "settle.json",
+    )
+
+    first = run_config(cfg_path, options)
+    assert (first.planned, first.deferred) == (1, 1)
+    assert (inbox / "Docs" / "old.txt").exists()
+    assert (inbox / "new.txt").exists()
+
+    # Nothing in the directory changed, but the settling file must not be skipped as "unchanged".
+    # Move its first sighting back in time instead of waiting out the window.
+    settle = json.loads((tmp_path / "settle.json").read_text(encoding="utf-8"))
+    settle[str(inbox)]["new.txt"][2] -= 60
+    (tmp_path / "settle.json").write_text(json.dumps(settle), encoding="utf-8")
+    second = run_config(cfg_path, options)
+    assert not second.skipped
+    assert (inbox / "Docs" / "new.txt").exists()
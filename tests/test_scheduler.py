@@ -0,0 +1,133 @@
+from pathlib import Path
+import random
+
+from src.automation import runner
+from src.automation.run_state import RunState
+from src.automation.runner import RunOptions, run_config
+from src.automation.scheduler import ScheduledJob, load_schedule, run_schedule
+
+
+def _write_config(tmp_path: Path) -> Path:
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    cfg_path = tmp_path / "rules.yaml"
+    cfg_path.write_text(
+        f"""
+source_dir: {inbox}
+
+destinations:
+  docs: Docs
+  other: Other
+
+rules:
+  - name: docs
+    extensions: ['.txt']
+    destination: docs
+""",
+        encoding="utf-8",
+    )
+    return cfg_path
+
+
+def test_run_config_skips_until_source_dir_changes(tmp_path: Path, monkeypatch) -> None:
+    cfg_path = _write_config(tmp_path)
+    (tmp_path / "inbox" / "a.txt").write_text("a", encoding="utf-8")
+    options = RunOptions(
+        ledger_path=tmp_path / "ledger.jsonl",
+        catalog_path=None,
+        journal_path=tmp_path / "journal.jsonl",
+        state_path=tmp_path / "state.json",
+    )
+
+    first = run_config(cfg_path, options)
+    assert not first.skipped and first.planned == 1
+    assert (tmp_path / "inbox" / "Docs" / "a.txt").exists()
+    # The first run's own moves changed the directory after its fingerprint was taken.
+    settled = run_config(cfg_path, options)
+    assert not settled.skipped and settled.planned == 0
+
+    def fail(_cfg_path):
+        raise AssertionError("config should not be parsed for an unchanged directory")
+
+    monkeypatch.setattr(runner, "load_config_cached", fail)
+    assert run_config(cfg_path, options).skipped
+
+    monkeypatch.undo()
+    (tmp_path / "inbox" / "b.txt").write_text("b", encoding="utf-8")
+    second = run_config(cfg_path, options)
+    assert not second.skipped and second.planned == 1
+
+    RunState(options.state_path).forget(cfg_path)
+    assert not RunState(options.state_path).is_unchanged(cfg_path)
+
+
+def test_files_arriving_during_a_run_are_not_skipped_next_time(tmp_path: Path) -> None:
+    cfg_path = _write_config(tmp_path)
+    inbox = tmp_path / "inbox"
+    options = RunOptions(ledger_path=None, catalog_path=None, journal_path=None, state_path=tmp_path / "state.json")
+
+    def planner_racing_a_download(cfg):
+        plan = runner.plan_moves_compact(cfg)
+        (inbox / "late.txt").write_text("late", encoding="utf-8")
+        return plan
+
+    racing = run_config(cfg_path, options, planner=planner_racing_a_download)
+    assert not racing.skipped and racing.planned == 0
+    late = run_config(cfg_path, options)
+    assert not late.skipped and late.planned == 1
+    assert (inbox / "Docs" / "late.txt").exists()
+
+
+def test_load_schedule_resolves_paths_and_per_job_journals(tmp_path: Path) -> None:
+    schedule = tmp_path / "schedule.yaml"
+    schedule.write_text(
+        """
+jobs:
+  - config: a.yaml
+    interval: 30
+    jitter: 5
+  - config: b.yaml
+    interval: 600
+    dry_run: true
+""",
+        encoding="utf-8",
+    )
+
+    base = RunOptions(journal_path=Path("logs/intent_journal.jsonl"), rule_stats_path=Path("logs/rule_stats.json"))
+    jobs = load_schedule(schedule, base=base)
+
+    assert [j.config for j in jobs] == [(tmp_path / "a.yaml").resolve(), (tmp_path / "b.yaml").resolve()]
+    assert [j.interval for j in jobs] == [30.0, 600.0]
+    assert jobs[1].options.dry_run
+    assert jobs[0].options.journal_path != jobs[1].options.journal_path
+    assert jobs[0].options.rule_stats_path != jobs[1].options.rule_stats_path
+
+
+def test_run_schedule_orders_jobs_by_interval_and_survives_errors() -> None:
+    now = [0.0]
+
+    def sleep(seconds: float) -> None:
+        now[0] += seconds
+
+    ran: list[tuple[float, str]] = []
+
+    def run_job(job: ScheduledJob) -> None:
+        ran.append((now[0], job.config.name))
+        if job.config.name == "slow.yaml":
+            raise RuntimeError("boom")
+
+    jobs = [
+        ScheduledJob(config=Path("fast.yaml"), interval=10),
+        ScheduledJob(config=Path("slow.yaml"), interval=25),
+    ]
+    runs = run_schedule(jobs, run_job, clock=lambda: now[0], sleep=sleep, rng=random.Random(0), max_runs=6)
+
+    assert runs == 6
+    assert ran == [
+        (0.0, "fast.yaml"),
+        (0.0, "slow.yaml"),
+        (10.0, "fast.yaml"),
+        (20.0, "fast.yaml"),
+        (25.0, "slow.yaml"),
+        (30.0, "fast.yaml"),
+    ]
@@ -0,0 +1,182 @@
+import http.client
+import json
+from pathlib import Path
+import socket
+import threading
+import time
+
+import pytest
+
+from src.automation.runner import RunOptions
+from src.automation.service import AutomationService, ServiceOptions, load_token, make_server
+
+
+def _write_config(tmp_path: Path) -> Path:
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    (inbox / "a.txt").write_text("a", encoding="utf-8")
+    (inbox / "b.jpg").write_text("b", encoding="utf-8")
+    (inbox / "Docs").mkdir()
+    (inbox / "Docs" / "a.txt").write_text("old", encoding="utf-8")
+
+    cfg_path = tmp_path / "rules.yaml"
+    cfg_path.write_text(
+        f"""
+source_dir: {inbox}
+
+destinations:
+  docs: Docs
+  other: Other
+
+rules:
+  - name: docs
+    extensions: ['.txt']
+    destination: docs
+    duplicate_strategy: rename
+""",
+        encoding="utf-8",
+    )
+    return cfg_path
+
+
+def _service(tmp_path: Path, cfg_path: Path) -> AutomationService:
+    run = RunOptions(
+        ledger_path=tmp_path / "ledger.jsonl",
+        catalog_path=tmp_path / "history.sqlite3",
+        journal_path=tmp_path / "journal.jsonl",
+    )
+    return AutomationService(ServiceOptions(run=run, default_config=cfg_path))
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path: str) -> None:
+        super().__init__("localhost")
+        self._path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self._path)
+
+
+def _request(
+    conn: http.client.HTTPConnection,
+    method: str,
+    path: str,
+    body: dict | None = None,
+    *,
+    token: str | None = None,
+) -> tuple[int, dict]:
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    if token is not None:
+        headers["Authorization"] = f"Bearer {token}"
+    conn.request(method, path, body=None if body is None else json.dumps(body), headers=headers)
+    resp = conn.getresponse()
+    return resp.status, json.loads(resp.read())
+
+
+def test_plan_is_served_warm_until_source_changes(tmp_path: Path) -> None:
+    cfg_path = _write_config(tmp_path)
+    service = _service(tmp_path, cfg_path)
+    try:
+        cold = service.plan()
+        warm = service.plan()
+        assert (cold["cached"], warm["cached"]) == (False, True)
+        assert cold["count"] == 2 and cold["conflicts"] == 1
+        assert cold["rules"] == {"docs": 1, "fallback": 1}
+
+        (cfg_path.parent / "inbox" / "c.txt").write_text("c", encoding="utf-8")
+        changed = service.plan()
+        assert not changed["cached"] and changed["count"] == 3
+        assert service.status()["cache"]["hits"] == 1
+    finally:
+        service.close()
+
+
+def test_http_execute_then_undo(tmp_path: Path) -> None:
+    cfg_path = _write_config(tmp_path)
+    service = _service(tmp_path, cfg_path)
+    server = make_server(service, port=0, token="s3cret")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=10)
+    try:
+        status, job = _request(conn, "POST", "/execute", {}, token="s3cret")
+        assert status == 202
+        for _ in range(200):
+            status, job = _request(conn, "GET", f"/jobs/{job['id']}", token="s3cret")
+            if job["state"] in ("done", "failed"):
+                break
+            time.sleep(0.02)
+        assert job["state"] == "done" and job["result"]["planned"] == 2
+        assert (cfg_path.parent / "inbox" / "Other" / "b.jpg").exists()
+
+        status, undone = _request(conn, "POST", "/undo", {}, token="s3cret")
+        assert status == 200
+        assert Path(undone["restored_to"]).exists()
+
+        headers = {"Content-Type": "text/plain", "Authorization": "Bearer s3cret"}
+        conn.request("POST", "/execute", body="{}", headers=headers)
+        resp = conn.getresponse()
+        resp.read()
+        assert resp.status == 400
+
+        assert _request(conn, "GET", "/nope", token="s3cret")[0] == 404
+    finally:
+        conn.close()
+        server.shutdown()
+        server.server_close()
+        service.close()
+
+
+def test_http_requires_the_token_and_an_allowed_config(tmp_path: Path) -> None:
+    cfg_path = _write_config(tmp_path)
+    other = tmp_path / "other.yaml"
+    other.write_text(cfg_path.read_text(encoding="utf-8"), encoding="utf-8")
+    service = _service(tmp_path, cfg_path)
+    with pytest.raises(ValueError, match="token"):
+        make_server(service, port=0)
+
+    server = make_server(service, port=0, token=load_token(tmp_path / "service.token"))
+    token = (tmp_path / "service.token").read_text(encoding="utf-8").strip()
+    assert (tmp_path / "service.token").stat().st_mode & 0o777 == 0o600
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=10)
+    try:
+        assert _request(conn, "GET", "/status")[0] == 401
+        conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=10)
+        assert _request(conn, "GET", "/status", token="guess")[0] == 401
+        conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=10)
+        assert _request(conn, "POST", "/plan", {"config": str(cfg_path)}, token=token)[0] == 200
+        status, body = _request(conn, "POST", "/execute", {"config": str(other)}, token=token)
+        assert status == 403 and "not allowed" in body["error"]
+    finally:
+        conn.close()
+        server.shutdown()
+        server.server_close()
+        service.close()
+
+    allowed = AutomationService(ServiceOptions(default_config=cfg_path, allowed_configs=(other,)))
+    try:
+        assert allowed.plan(str(other))["count"] == 2
+    finally:
+        allowed.close()
+
+
+def test_unix_socket_status(tmp_path: Path) -> None:
+    cfg_path = _write_config(tmp_path)
+    service = _service(tmp_path, cfg_path)
+    sock_path = tmp_path / "pat.sock"
+    server = make_server(service, socket_path=sock_path)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    conn = _UnixConnection(str(sock_path))
+    try:
+        status, plan = _request(conn, "POST", "/plan", {"limit": 1})
+        assert status == 200 and len(plan["moves"]) == 1
+
+        status, body = _request(conn, "GET", "/status")
+        assert status == 200
+        assert [j["kind"] for j in body["jobs"]] == ["plan"]
+    finally:
+        conn.close()
+        server.shutdown()
+        server.server_close()
+        service.close()
@@ -0,0 +1,87 @@
+import errno
+import os
+from pathlib import Path
+
+import pytest
+
+from src.automation.throttle import IOThrottle, TokenBucket, throttled_move
+from src.utils import parse_size
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.slept = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept += seconds
+        self.now += seconds
+
+
+def test_token_bucket_limits_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(10, clock=clock, sleep=clock.sleep)
+
+    for _ in range(30):
+        bucket.acquire(1)
+
+    # 10 tokens of burst, then 20 more at 10/sec.
+    assert clock.slept == pytest.approx(2.0)
+
+
+def test_throttle_backs_off_on_high_latency_and_recovers():
+    clock = FakeClock()
+    throttle = IOThrottle(bytes_per_sec=1000, target_latency=0.1, clock=clock, sleep=clock.sleep)
+
+    for _ in range(5):
+        throttle.observe_latency(1.0)
+    assert throttle.factor < 0.5
+
+    for _ in range(200):
+        throttle.observe_latency(0.0)
+    assert throttle.factor == 1.0
+
+
+def test_cross_device_move_is_chunked_through_byte_bucket(tmp_path: Path, monkeypatch):
+    src = tmp_path / "big.bin"
+    src.write_bytes(b"x" * (3 * 1024 * 1024))
+    dst = tmp_path / "out" / "big.bin"
+    dst.parent.mkdir()
+
+    def fake_rename(a, b):
+        raise OSError(errno.EXDEV, "cross-device link")
+
+    monkeypatch.setattr(os, "rename", fake_rename)
+
+    clock = FakeClock()
+    throttle = IOThrottle(bytes_per_sec=1024 * 1024, ops_per_sec=100, clock=clock, sleep=clock.sleep)
+    throttled_move(src, dst, throttle)
+
+    assert not src.exists()
+    assert dst.stat().st_size == 3 * 1024 * 1024
+    assert throttle.bytes == 3 * 1024 * 1024
+    assert throttle.throttled_seconds == pytest.approx(2.0, rel=0.01)
+
+
+def test_same_device_rename_uses_only_ops_limit(tmp_path: Path):
+    src = tmp_path / "a.txt"
+    src.write_text("x" * 1000, encoding="utf-8")
+
+    clock = FakeClock()
+    throttle = IOThrottle(bytes_per_sec=1, ops_per_sec=100, clock=clock, sleep=clock.sleep)
+    throttled_move(src, tmp_path / "b.txt", throttle)
+
+    assert (tmp_path / "b.txt").exists()
+    assert throttle.bytes == 0
+    assert throttle.throttled_seconds == 0.0
+
+
+def test_parse_size():
+    assert parse_size("50MB") == 50 * 1024 * 1024
+    assert parse_size("1.5k") == 1536
+    assert parse_size(10) == 10
+    with pytest.raises(ValueError):
+        parse_size("ten")